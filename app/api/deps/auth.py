@@ -1,5 +1,6 @@
 from fastapi import Depends
-from app.services.auth_service import AuthService, security
+from app.services.auth_cache import get_cached_user
+from app.services.auth_service import security
 
 from fastapi.security import HTTPAuthorizationCredentials
 
@@ -8,5 +9,4 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
     """Get current authenticated user"""
-    print(credentials)
-    return AuthService.get_current_user(credentials)
+    return await get_cached_user(credentials.credentials)
@@ -9,11 +9,20 @@ from app.models import (
     AttendanceMarkRequest,
     AttendanceMarkResponse,
     AttendanceInternalMarkRequest,
+    AttendanceBatchMarkRequest,
+    AttendanceBatchMarkResponse,
+    AttendanceBatchMarkJobsResponse,
+    AttendanceMarkJobResponse,
 )
-from fastapi import HTTPException, Depends, status
+from typing import Union
+from fastapi import HTTPException, Depends, Header, Request, Response, status
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
 from app.services.attendance_service import AttendanceService
 from app.services.attendance_credentials_service import AttendanceCredentialsService
 from app.services.marking_service import MarkingService
+from app.services.attendance_marking_service import AttendanceMarkingService
+from app.services.marking_queue import MarkingJob, get_marking_queue
 from fastapi import APIRouter
 from app.exceptions import (
     NotFoundError,
@@ -31,8 +40,14 @@ logger = logging.getLogger(__name__)
 attendance_service = AttendanceService()
 credentials_service = AttendanceCredentialsService()
 marking_service = MarkingService()
+attendance_marking_service = AttendanceMarkingService(
+    credentials_service=credentials_service,
+    marking_service=marking_service,
+)
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 @router.put("", response_model=AttendanceResponse, response_model_by_alias=True)
 async def mark_attendance(
@@ -40,7 +55,7 @@ async def mark_attendance(
 ) -> AttendanceResponse:
     """Mark attendance (entry or exit)"""
     try:
-        result = attendance_service.process_attendance(
+        result = await attendance_service.process_attendance(
             request_body, current_user=current_user
         )
         logger.info(
@@ -66,7 +81,9 @@ async def get_attendance(
 ) -> AttendanceRequest:
     """Retrieve the stored attendance schedule for the authenticated user."""
     try:
-        result = attendance_service.get_attendance_schedule(current_user=current_user)
+        result = await attendance_service.get_attendance_schedule(
+            current_user=current_user
+        )
         logger.info(
             "Attendance schedule fetched for user %s", current_user.get("id", "unknown")
         )
@@ -132,7 +149,7 @@ async def save_attendance_credentials(
 ) -> AttendanceCredentialsResponse:
     """Persist attendance login credentials for the authenticated user."""
     try:
-        credentials_service.save_credentials(
+        await credentials_service.save_credentials(
             user_id=current_user.get("id"),
             company_id=request_body.company_id,
             user_id_number=request_body.user_id_number,
@@ -164,7 +181,7 @@ async def get_attendance_credentials(
 ) -> AttendanceCredentialsGetResponse:
     """Fetch stored attendance credentials metadata for the authenticated user."""
     try:
-        credentials = credentials_service.get_credentials(
+        credentials = await credentials_service.get_credentials_metadata(
             user_id=current_user.get("id")
         )
         if not credentials:
@@ -175,7 +192,7 @@ async def get_attendance_credentials(
         return AttendanceCredentialsGetResponse(
             company_id=credentials["company_id"],
             user_id_number=credentials["user_id_number"],
-            has_password=bool(credentials.get("password")),
+            has_password=credentials["has_password"],
         )
     except ValidationError as exc:
         raise HTTPException(
@@ -189,39 +206,52 @@ async def get_attendance_credentials(
 
 @router.post(
     "/mark",
-    response_model=AttendanceMarkResponse,
+    response_model=Union[AttendanceMarkJobResponse, AttendanceMarkResponse],
     response_model_by_alias=True,
 )
 async def mark_attendance_event(
     request_body: AttendanceMarkRequest,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user),
-) -> AttendanceMarkResponse:
-    """Execute the attendance marking flow."""
-    try:
-        credentials = credentials_service.get_credentials(
-            user_id=current_user.get("id")
-        )
-        if not credentials or not credentials.get("password"):
-            raise ValidationError("Attendance credentials are required")
+    prefer: str | None = Header(default=None),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+) -> Union[AttendanceMarkJobResponse, AttendanceMarkResponse]:
+    """Execute the attendance marking flow.
 
-        schedule = attendance_service.get_attendance_schedule(current_user=current_user)
-        location = schedule.location
-        if location is None:
-            raise ValidationError("Location data is required to mark attendance")
+    With `Prefer: respond-async` the mark is queued and `202 Accepted` is
+    returned right away; follow it with `GET /mark/{jobId}` or the
+    `/mark/{jobId}/events` stream.
 
-        marking_service.mark_attendance(
-            company_id=credentials["company_id"],
-            user_id_number=credentials["user_id_number"],
-            password=credentials["password"],
-            latitude=float(location.latitude),
-            longitude=float(location.longitude),
+    Marks are idempotent per event type and local day, or per
+    `Idempotency-Key` when one is sent: duplicates replay the first result.
+    """
+    user_id = current_user.get("id")
+    if prefer and "respond-async" in prefer and settings.marking_queue_enabled:
+        if not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Authenticated user context is required",
+            )
+        job = await get_marking_queue().enqueue(
+            user_id=user_id,
             event_type=request_body.event_type,
+            idempotency_key=idempotency_key,
+            deadline_seconds=request_body.deadline_seconds,
         )
+        response.status_code = status.HTTP_202_ACCEPTED
+        response.headers["Preference-Applied"] = "respond-async"
+        response.headers["Location"] = str(
+            request.url_for("get_mark_job", job_id=job.id)
+        )
+        return _job_response(job)
 
-        return AttendanceMarkResponse(
-            success=True,
-            message="Attendance marked",
+    try:
+        return await attendance_marking_service.mark_for_user(
+            user_id=user_id,
             event_type=request_body.event_type,
+            deadline_seconds=request_body.deadline_seconds,
+            idempotency_key=idempotency_key,
         )
     except ValidationError as exc:
         raise HTTPException(
@@ -237,41 +267,86 @@ async def mark_attendance_event(
         ) from exc
 
 
+@router.get(
+    "/mark/{job_id}",
+    response_model=AttendanceMarkJobResponse,
+    response_model_by_alias=True,
+)
+async def get_mark_job(
+    job_id: str, current_user: dict = Depends(get_current_user)
+) -> AttendanceMarkJobResponse:
+    """Return the state of a queued mark; `result` is set once it succeeds."""
+    return _job_response(await _get_own_job(job_id, current_user))
+
+
+@router.get("/mark/{job_id}/events")
+async def stream_mark_job(
+    job_id: str, current_user: dict = Depends(get_current_user)
+) -> StreamingResponse:
+    """Server-Sent Events stream of a queued mark's step transitions."""
+    await _get_own_job(job_id, current_user)
+
+    async def events():
+        async for job in get_marking_queue().watch(job_id):
+            payload = _job_response(job).model_dump_json(by_alias=True)
+            yield f"event: {job.status}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _get_own_job(job_id: str, current_user: dict) -> MarkingJob:
+    job = await get_marking_queue().get(job_id)
+    if job is None or job.user_id != current_user.get("id"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Marking job not found"
+        )
+    return job
+
+
+def _job_response(job: MarkingJob) -> AttendanceMarkJobResponse:
+    return AttendanceMarkJobResponse(
+        job_id=job.id,
+        status=job.status,
+        event_type=job.event_type,
+        step=job.step,
+        attempts=job.attempts,
+        detail=job.last_error,
+        result=job.result,
+    )
+
+
 @router.post(
     "/mark/internal",
-    response_model=AttendanceMarkResponse,
+    response_model=Union[AttendanceMarkJobResponse, AttendanceMarkResponse],
     response_model_by_alias=True,
     dependencies=[Depends(require_internal_key)],
 )
 async def mark_attendance_event_internal(
     request_body: AttendanceInternalMarkRequest,
-) -> AttendanceMarkResponse:
-    """Execute the attendance marking flow for scheduler calls."""
-    try:
-        credentials = credentials_service.get_credentials(user_id=request_body.user_id)
-        if not credentials or not credentials.get("password"):
-            raise ValidationError("Attendance credentials are required")
-
-        schedule = attendance_service.get_attendance_schedule_for_user(
-            user_id=request_body.user_id
-        )
-        location = schedule.location
-        if location is None:
-            raise ValidationError("Location data is required to mark attendance")
-
-        marking_service.mark_attendance(
-            company_id=credentials["company_id"],
-            user_id_number=credentials["user_id_number"],
-            password=credentials["password"],
-            latitude=float(location.latitude),
-            longitude=float(location.longitude),
+    response: Response,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+) -> Union[AttendanceMarkJobResponse, AttendanceMarkResponse]:
+    """Queue (or, with the queue disabled, run) a mark for scheduler calls."""
+    if settings.marking_queue_enabled:
+        job = await get_marking_queue().enqueue(
+            user_id=request_body.user_id,
             event_type=request_body.event_type,
+            idempotency_key=idempotency_key,
+            deadline_seconds=request_body.deadline_seconds,
         )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return _job_response(job)
 
-        return AttendanceMarkResponse(
-            success=True,
-            message="Attendance marked",
+    try:
+        return await attendance_marking_service.mark_for_user(
+            user_id=request_body.user_id,
             event_type=request_body.event_type,
+            deadline_seconds=request_body.deadline_seconds,
+            idempotency_key=idempotency_key,
         )
     except ValidationError as exc:
         raise HTTPException(
@@ -285,3 +360,61 @@ async def mark_attendance_event_internal(
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)
         ) from exc
+
+
+@router.post(
+    "/mark/internal/batch",
+    response_model=Union[AttendanceBatchMarkJobsResponse, AttendanceBatchMarkResponse],
+    response_model_by_alias=True,
+    dependencies=[Depends(require_internal_key)],
+)
+async def mark_attendance_events_internal(
+    request_body: AttendanceBatchMarkRequest,
+    response: Response,
+    accept: str | None = Header(default=None),
+    prefer: str | None = Header(default=None),
+):
+    """Mark many scheduler events with bounded concurrency.
+
+    With `Prefer: respond-async` every item is queued as a durable, retried
+    job and `202 Accepted` lists the job ids. Otherwise the marks run inline;
+    send `Accept: application/x-ndjson` to receive one JSON result per line as
+    each mark finishes instead of a single summary at the end.
+    """
+    if len(request_body.items) > settings.marking_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.marking_batch_max_items} items per batch",
+        )
+
+    if prefer and "respond-async" in prefer and settings.marking_queue_enabled:
+        jobs = await get_marking_queue().enqueue_many(request_body.items)
+        response.status_code = status.HTTP_202_ACCEPTED
+        response.headers["Preference-Applied"] = "respond-async"
+        return AttendanceBatchMarkJobsResponse(
+            jobs=[_job_response(job) for job in jobs]
+        )
+
+    try:
+        results = await attendance_marking_service.mark_batch(request_body.items)
+    except (NotFoundError, PersistenceError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)
+        ) from exc
+
+    if accept and NDJSON_MEDIA_TYPE in accept:
+
+        async def stream_results():
+            async for result in results:
+                yield result.model_dump_json(by_alias=True) + "\n"
+
+        return StreamingResponse(stream_results(), media_type=NDJSON_MEDIA_TYPE)
+
+    collected = [result async for result in results]
+    succeeded = sum(1 for result in collected if result.success)
+    return AttendanceBatchMarkResponse(
+        total=len(collected),
+        succeeded=succeeded,
+        failed=len(collected) - succeeded,
+        results=collected,
+    )
@@ -1,6 +1,3 @@
-from urllib.error import HTTPError, URLError
-from urllib.request import Request as HTTPRequest, urlopen
-
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import (
     HTTPAuthorizationCredentials,
@@ -9,12 +6,18 @@ from fastapi.security import (
     HTTPBearer,
 )
 from pydantic import BaseModel, EmailStr
-from supabase import Client, create_client
-from supabase_auth.errors import AuthApiError
 from typing import Annotated
 
-from app.core.config import settings
+from app.core.supabase_clients import Client, get_anon_client
+from app.exceptions import AuthenticationError, AuthProviderUnavailableError
+from app.services.auth_cache import (
+    get_cached_profile,
+    get_cached_user,
+    get_user_cache,
+    token_key,
+)
 from app.services.auth_service import AuthService
+from app.services.gotrue_client import get_gotrue_client
 
 
 router = APIRouter()
@@ -23,8 +26,6 @@ router = APIRouter()
 security = HTTPBasic()
 bearer_security = HTTPBearer(auto_error=False)
 
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
-
 
 class UserOut(BaseModel):
     id: str
@@ -42,125 +43,104 @@ def get_bearer_token(
     return credentials.credentials
 
 
-def get_current_user(token: str = Depends(get_bearer_token)) -> UserOut:
+async def _fetch_profile(client: Client, user_id: str) -> dict | None:
+    # `.single()` raises when the row is missing; None lets the cache remember it.
+    profile_resp = await (
+        client.table("profiles").select("*").eq("id", user_id).limit(1).execute()
+    )
+    if getattr(profile_resp, "error", None):
+        raise RuntimeError(profile_resp.error)
+    return profile_resp.data[0] if profile_resp.data else None
+
+
+async def get_current_user(
+    token: str = Depends(get_bearer_token),
+    client: Client = Depends(get_anon_client),
+) -> UserOut:
     """
     Esta función valida el token JWT enviado por el cliente.
     Espera un header:
         Authorization: Bearer <JWT>
-    Usa Supabase para obtener al usuario asociado.
+    Usa AuthService.verify_token (local o Supabase Auth) para obtener al usuario.
     Devuelve datos del user si todo está ok.
     """
 
-    # Supabase puede decodificar el token y darte el user
+    # El usuario validado y su perfil se cachean (ver app/services/auth_cache.py)
     try:
-        user_info = supabase.auth.get_user(token)
-    except AuthApiError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido o expirado",
-        ) from exc
-    except Exception as exc:  # pragma: no cover - defensive
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="No se pudo validar el token",
-        ) from exc
-
-    if user_info.user is None:
-        raise HTTPException(status_code=401, detail="Token inválido o expirado")
+        user = await get_cached_user(token)
+    except HTTPException as exc:
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido o expirado",
+            ) from exc
+        raise
 
     # Puedes leer más datos del perfil interno (tabla profiles) si quieres enriquecer
     try:
-        profile_resp = (
-            supabase.table("profiles")
-            .select("*")
-            .eq("id", user_info.user.id)
-            .single()
-            .execute()
-        )
-        if getattr(profile_resp, "error", None):
-            # si falla el profile, igual devolvemos lo básico
-            return UserOut(
-                id=user_info.user.id, email=user_info.user.email, full_name=None
-            )
-        profile = profile_resp.data
-
-        return UserOut(
-            id=user_info.user.id,
-            email=user_info.user.email,
-            full_name=profile.get("full_name") if profile else None,
+        profile = await get_cached_profile(
+            user["id"], lambda: _fetch_profile(client, user["id"])
         )
     except Exception as e:
+        # si falla el profile, igual devolvemos lo básico
         print("Error al obtener usuario", e)
-        return UserOut(id=user_info.user.id, email=user_info.user.email, full_name=None)
+        return UserOut(id=user["id"], email=user["email"], full_name=None)
+
+    return UserOut(
+        id=user["id"],
+        email=user["email"],
+        full_name=profile.get("full_name"),
+    )
 
 
 @router.post("/login")
-def login(credentials: Annotated[HTTPBasicCredentials, Depends(security)]):
+async def login(credentials: Annotated[HTTPBasicCredentials, Depends(security)]):
     try:
-        login_resp = supabase.auth.sign_in_with_password(
-            {"email": credentials.username, "password": credentials.password}
+        login_resp = await get_gotrue_client().sign_in_with_password(
+            credentials.username, credentials.password
         )
-
-        if login_resp.session is None:
-            raise HTTPException(status_code=401, detail="Credenciales inválidas")
-        access_token = login_resp.session.access_token
-        refresh_token = login_resp.session.refresh_token
-        user_id = login_resp.user.id
-
-        # Puedes también retornar info del perfil.
-        return {
-            "user_id": user_id,
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
-        }
-
-    except AuthApiError as e:
+    except AuthenticationError as e:
         print("Error en el inicio de sesión:", e)
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
-    except Exception as e:
+    except AuthProviderUnavailableError as e:
         print("Error interno del servidor:", e)
-        raise HTTPException(status_code=500, detail="Error interno del servidor")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Proveedor de autenticación no disponible",
+        )
+
+    if not login_resp.get("access_token"):
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+
+    # Puedes también retornar info del perfil.
+    return {
+        "user_id": login_resp["user"]["id"],
+        "access_token": login_resp["access_token"],
+        "refresh_token": login_resp["refresh_token"],
+        "token_type": "bearer",
+    }
 
 
 @router.post("/logout")
-def logout(
+async def logout(
     token: str = Depends(get_bearer_token),
     current_user: UserOut = Depends(get_current_user),
 ) -> dict[str, str]:
-    logout_url = f"{settings.supabase_url}/auth/v1/logout"
-    logout_request = HTTPRequest(
-        logout_url,
-        data=b"",
-        method="POST",
-        headers={
-            "apikey": settings.supabase_key,
-            "Authorization": f"Bearer {token}",
-        },
-    )
-
     try:
-        with urlopen(logout_request, timeout=settings.request_timeout):
-            pass
-    except HTTPError as exc:
-        if exc.code in (
-            status.HTTP_400_BAD_REQUEST,
-            status.HTTP_401_UNAUTHORIZED,
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido o expirado",
-            ) from exc
+        await get_gotrue_client().logout(token)
+    except AuthenticationError as exc:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail="No se pudo cerrar sesión en Supabase",
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o expirado",
         ) from exc
-    except URLError as exc:
+    except AuthProviderUnavailableError as exc:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Proveedor de autenticación no disponible",
         ) from exc
 
+    # El token ya no es válido en Supabase: no lo sigamos aceptando desde cache
+    get_user_cache().delete(token_key(token))
     return {
         "user_id": current_user.id,
         "detail": "Sesión cerrada correctamente",
@@ -168,19 +148,27 @@ def logout(
 
 
 @router.get("/refresh")
-def refresh_token(request: Request):
+async def refresh_token(request: Request):
     refresh_token = request.query_params.get("token")
     if not refresh_token:
         raise HTTPException(status_code=401, detail="No refresh token found")
 
-    res = supabase.auth.refresh_session(refresh_token)
-    new_access_token = res.session.access_token
-    new_refresh_token = res.session.refresh_token
+    try:
+        res = await get_gotrue_client().refresh_session(refresh_token)
+    except AuthenticationError as exc:
+        raise HTTPException(
+            status_code=401, detail="Refresh token inválido o expirado"
+        ) from exc
+    except AuthProviderUnavailableError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Proveedor de autenticación no disponible",
+        ) from exc
 
     return {
-        "user_id": res.user.id,
-        "access_token": new_access_token,
-        "refresh_token": new_refresh_token,
+        "user_id": res["user"]["id"],
+        "access_token": res["access_token"],
+        "refresh_token": res["refresh_token"],
         "token_type": "bearer",
     }
 
@@ -0,0 +1,18 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.api.deps.internal import require_internal_key
+from app.core import metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "",
+    response_model=Dict[str, Any],
+    dependencies=[Depends(require_internal_key)],
+)
+async def get_metrics() -> Dict[str, Any]:
+    """Return in-process counters for capacity planning."""
+    return metrics.collect()
@@ -9,8 +9,10 @@ try:
 except ImportError:  # pragma: no cover
     ZoneInfo = None  # type: ignore[assignment]
 
+from app.core.lazy import lazy_import
+
 try:  # pragma: no cover - optional dependency fallback
-    import pytz
+    pytz = lazy_import("pytz")
 except ImportError:  # pragma: no cover
     pytz = None  # type: ignore[assignment]
 
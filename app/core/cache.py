@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded LRU cache whose entries also expire after a time-to-live.
+
+    Expired entries are dropped lazily when they are read or when room is
+    needed; the least recently used entry is evicted once `maxsize` is hit.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: K, value: V, *, ttl: Optional[float] = None) -> None:
+        """Store `value`; `ttl` may only shorten the cache-wide lifetime."""
+        lifetime = self._ttl if ttl is None else min(ttl, self._ttl)
+        if lifetime <= 0 or self._maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + lifetime, value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def pop(self, key: K) -> Optional[V]:
+        """Remove and return an entry, counting it as a hit or miss."""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            del self._entries[key]
+            return entry[1]
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return self._lookup(key) is not None  # type: ignore[arg-type]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self._maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _lookup(self, key: K) -> Optional[Tuple[float, V]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def _evict(self) -> None:
+        now = self._clock()
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+            elif len(self._entries) > self._maxsize:
+                del self._entries[key]
+                self.evictions += 1
+            else:
+                break
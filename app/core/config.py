@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 
@@ -21,12 +23,66 @@ class Settings(BaseSettings):
     whatsapp_auth_username: str = "admin"
     whatsapp_auth_password: str = "example"
     internal_api_key: str = ""
+    marking_provider_url: str = "https://movil.asisscad.cl"
+    marking_pool_size: int = 100
+    marking_pool_keepalive: int = 50
+    marking_keepalive_expiry: float = 30.0
+    marking_dns_cache_ttl: float = 300.0
+    marking_drain_limit_bytes: int = 64 * 1024
+    marking_confirmation_window: float = 2.0
+    marking_batch_concurrency: int = 20
+    marking_batch_max_items: int = 5000
+    marking_queue_enabled: bool = True
+    marking_queue_path: str = "marking_jobs.sqlite3"
+    marking_queue_workers: int = 20
+    marking_queue_poll_interval: float = 1.0
+    marking_queue_retention_hours: float = 72.0
+    marking_queue_lease_seconds: float = 30.0
+    marking_retry_base_delay: float = 5.0
+    marking_retry_max_delay: float = 300.0
+    marking_deadline: float = 45.0
+    marking_debug_timings: bool = False
+    marking_idempotency_cache_size: int = 50000
+    marking_provider_concurrency: int = 50
+    marking_rate_limit: float = 0.0
+    marking_rate_burst: int = 40
+    marking_breaker_failure_threshold: int = 5
+    marking_breaker_reset_timeout: float = 30.0
+    prewarm_enabled: bool = False
+    prewarm_lead_minutes: float = 3.0
+    prewarm_interval: float = 60.0
+    prewarm_session_ttl: float = 600.0
+    prewarm_cache_size: int = 10000
+    prewarm_concurrency: int = 10
 
     port: int = 8000
 
     supabase_url: str = "https://your-supabase-url.supabase.co"
     supabase_key: str = "your-supabase-anon-or-service-role-key"
     supabase_service_key: str = "your-supabase-service-role-key"
+    supabase_pool_size: int = 50
+    supabase_pool_keepalive: int = 20
+    supabase_keepalive_expiry: float = 30.0
+    supabase_jwt_secret: str = ""
+    supabase_jwks_url: str = ""
+    auth_local_verification: bool = False
+    auth_remote_fallback: bool = False
+    auth_jwt_audience: str = "authenticated"
+    auth_allowed_roles: List[str] = ["authenticated"]
+    auth_jwks_cache_ttl: float = 600.0
+    schedule_cache_size: int = 10000
+    schedule_cache_ttl: float = 300.0
+    schedule_cache_invalidation: str = "local"
+    schedule_cache_channel_topic: str = "attendance-schedules"
+    schedule_parse_verify: bool = False
+    auth_pool_size: int = 100
+    auth_pool_keepalive: int = 20
+    auth_token_cache_size: int = 10000
+    auth_token_cache_ttl: float = 300.0
+    auth_profile_cache_ttl: float = 60.0
+    credential_cache_enabled: bool = False
+    credential_cache_size: int = 1000
+    credential_cache_ttl: float = 30.0
 
     class Config:
         env_file = ".env"
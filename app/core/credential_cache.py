@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.lazy import lazy_import
+
+try:  # pragma: no cover - optional dependency fallback
+    fernet = lazy_import("cryptography.fernet")
+except ImportError:  # pragma: no cover
+    fernet = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+
+
+class CredentialCache:
+    """Opt-in, short-lived cache of marking context rows keyed by user id.
+
+    Rows carry the decrypted attendance password, so they are held only as
+    Fernet tokens under a key generated for this process and never leave it:
+    the cache cannot be pickled and its repr shows no entries. Writes go
+    through `invalidate`; a load that started before one is never stored.
+    Other workers keep their copy until the (short) TTL runs out.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: Optional[bool] = None,
+        cache: Optional[TTLCache[str, bytes]] = None,
+    ) -> None:
+        enabled = settings.credential_cache_enabled if enabled is None else enabled
+        if enabled and fernet is None:
+            logger.warning("Credential cache disabled: cryptography is not installed")
+            enabled = False
+        self.enabled = enabled
+        self._cache = (
+            TTLCache(
+                maxsize=settings.credential_cache_size,
+                ttl=settings.credential_cache_ttl,
+            )
+            if cache is None
+            else cache
+        )
+        self._fernet = fernet.Fernet(fernet.Fernet.generate_key()) if enabled else None
+        self._generation = 0
+        self.invalidations = 0
+
+    async def get(
+        self, user_id: str, load: Callable[[], Awaitable[Optional[Row]]]
+    ) -> Optional[Row]:
+        row = self._read(user_id)
+        if row is not None:
+            return row
+        generation = self._generation
+        row = await load()
+        if row is not None and generation == self._generation:
+            self._write(user_id, row)
+        return row
+
+    async def get_many(
+        self,
+        user_ids: List[str],
+        load: Callable[[List[str]], Awaitable[Dict[str, Row]]],
+    ) -> Dict[str, Row]:
+        """Serve cached rows and load the rest with one `load` call."""
+        rows: Dict[str, Row] = {}
+        missing: List[str] = []
+        for user_id in user_ids:
+            row = self._read(user_id)
+            if row is None:
+                missing.append(user_id)
+            else:
+                rows[user_id] = row
+        if missing:
+            generation = self._generation
+            loaded = await load(missing)
+            if generation == self._generation:
+                for user_id, row in loaded.items():
+                    self._write(user_id, row)
+            rows.update(loaded)
+        return rows
+
+    def invalidate(self, user_id: str) -> None:
+        self._generation += 1
+        self.invalidations += 1
+        self._cache.delete(user_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            **self._cache.stats(),
+            "invalidations": self.invalidations,
+        }
+
+    def _read(self, user_id: str) -> Optional[Row]:
+        if self._fernet is None:
+            return None
+        token = self._cache.get(user_id)
+        if token is None:
+            return None
+        return json.loads(self._fernet.decrypt(token))
+
+    def _write(self, user_id: str, row: Row) -> None:
+        if self._fernet is not None:
+            self._cache.set(user_id, self._fernet.encrypt(json.dumps(row).encode()))
+
+    def __repr__(self) -> str:
+        return f"CredentialCache(enabled={self.enabled}, size={len(self._cache)})"
+
+    def __reduce__(self) -> Any:
+        raise TypeError("CredentialCache cannot be serialized")
+
+
+_credential_cache: CredentialCache | None = None
+
+
+def get_credential_cache() -> CredentialCache:
+    global _credential_cache
+    if _credential_cache is None:
+        _credential_cache = CredentialCache()
+    return _credential_cache
+
+
+def credential_cache_metrics() -> Dict[str, Any]:
+    return get_credential_cache().metrics()
+
+
+metrics.register_collector("credential_cache", credential_cache_metrics)
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return `name` as a module that is only executed on first attribute access.
+
+    Keeps heavy dependencies off the import path of `app.main`, so the API
+    starts (and tests collect) without paying for clients it has not used yet.
+    Raises `ImportError` right away when the module is not installed.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
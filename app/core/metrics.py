@@ -0,0 +1,67 @@
+import threading
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+MetricsCollector = Callable[[], Dict[str, Any]]
+
+_collectors: Dict[str, MetricsCollector] = {}
+
+
+def register_collector(name: str, collector: MetricsCollector) -> None:
+    """Expose a component's counters under `name` in the metrics snapshot."""
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, Any]:
+    return {name: collector() for name, collector in _collectors.items()}
+
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label set."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self._buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"count": 0, "sum": 0.0, "buckets": [0] * len(self._buckets)}
+                self._series[key] = series
+            series["count"] += 1
+            series["sum"] += value
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                ",".join(f"{name}={value}" for name, value in key): {
+                    "count": series["count"],
+                    "sum": round(series["sum"], 6),
+                    "buckets": {
+                        str(bound): count
+                        for bound, count in zip(self._buckets, series["buckets"])
+                    },
+                }
+                for key, series in self._series.items()
+            }
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.exceptions import PersistenceError
+
+if TYPE_CHECKING:
+    import httpx
+    from supabase import AsyncClient as Client
+else:
+    # Resolvable at runtime (FastAPI reads dependency annotations) without
+    # importing supabase, which is loaded when the first client is built.
+    Client = Any
+
+logger = logging.getLogger(__name__)
+
+ANON = "anon"
+SERVICE_ROLE = "service_role"
+
+
+class SupabaseClients:
+    """The process-wide Supabase clients, one per API key.
+
+    Each role gets its own keep-alive `httpx.AsyncClient`, shared by PostgREST,
+    RPC and Auth calls made through that client, so the whole app holds two
+    bounded connection pools instead of one per repository, and database
+    round trips never block the event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        url: Optional[str] = None,
+        anon_key: Optional[str] = None,
+        service_key: Optional[str] = None,
+    ) -> None:
+        self._url = url or settings.supabase_url
+        self._keys = {
+            ANON: anon_key or settings.supabase_key,
+            SERVICE_ROLE: service_key
+            or settings.supabase_service_key
+            or settings.supabase_key,
+        }
+        self._http: Dict[str, httpx.AsyncClient] = {}
+        self._clients: Dict[str, Client] = {}
+
+    def open(self) -> None:
+        """Create both clients up front instead of on first use."""
+        for role in self._keys:
+            self._client(role)
+
+    async def warm_up(self) -> None:
+        """Import supabase off the loop, then open both clients."""
+        await asyncio.to_thread(importlib.import_module, "supabase")
+        self.open()
+
+    @property
+    def anon(self) -> Client:
+        return self._client(ANON)
+
+    @property
+    def service(self) -> Client:
+        return self._client(SERVICE_ROLE)
+
+    async def aclose(self) -> None:
+        for http_client in self._http.values():
+            await http_client.aclose()
+        self._http.clear()
+        self._clients.clear()
+
+    def _client(self, role: str) -> Client:
+        client = self._clients.get(role)
+        if client is None:
+            try:
+                import httpx
+                from supabase import AsyncClient, AsyncClientOptions
+            except ImportError as exc:  # pragma: no cover
+                raise PersistenceError(
+                    "Supabase client is unavailable. Install supabase dependencies to persist data."
+                ) from exc
+
+            http_client = httpx.AsyncClient(
+                timeout=settings.request_timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=settings.supabase_pool_size,
+                    max_keepalive_connections=settings.supabase_pool_keepalive,
+                    keepalive_expiry=settings.supabase_keepalive_expiry,
+                ),
+            )
+            # The constructor (unlike `acreate_client`) does no I/O; server-side
+            # clients never carry a user session.
+            client = AsyncClient(
+                self._url,
+                self._keys[role],
+                AsyncClientOptions(
+                    httpx_client=http_client,
+                    auto_refresh_token=False,
+                    persist_session=False,
+                ),
+            )
+            self._http[role] = http_client
+            self._clients[role] = client
+        return client
+
+
+_supabase_clients: SupabaseClients | None = None
+
+
+def get_supabase_clients() -> SupabaseClients:
+    global _supabase_clients
+    if _supabase_clients is None:
+        _supabase_clients = SupabaseClients()
+    return _supabase_clients
+
+
+async def close_supabase_clients() -> None:
+    global _supabase_clients
+    if _supabase_clients is not None:
+        await _supabase_clients.aclose()
+        _supabase_clients = None
+
+
+@lru_cache(maxsize=1)
+def supabase_errors() -> Tuple[type, ...]:
+    """Exception types raised by Supabase calls, for use in `except` clauses.
+
+    Only evaluated once a call has failed, so catching them does not import
+    supabase up front.
+    """
+    try:
+        from postgrest.exceptions import APIError
+        from supabase_auth.errors import AuthApiError
+    except ImportError:  # pragma: no cover
+        return ()
+    return (AuthApiError, APIError)
+
+
+def get_anon_client() -> Client:
+    """FastAPI dependency for the anon-key client."""
+    return get_supabase_clients().anon
@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class AttendanceError(Exception):
     """Base exception for attendance API errors."""
 
@@ -18,5 +21,33 @@ class NotificationError(AttendanceError):
     """Raised when sending notifications fails."""
 
 
+class AuthenticationError(AttendanceError):
+    """Raised when an access token is invalid or expired."""
+
+
+class TokenVerificationUnavailableError(AttendanceError):
+    """Raised when a token cannot be verified locally (no key available)."""
+
+
+class AuthProviderUnavailableError(AttendanceError):
+    """Raised when Supabase Auth cannot be reached or fails."""
+
+
 class MarkingError(AttendanceError):
-    """Raised when attendance marking fails."""
+    """Raised when attendance marking fails; `step` names the failed step."""
+
+    def __init__(self, message: str, *, step: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.step = step
+
+
+class ProviderSessionExpiredError(MarkingError):
+    """Raised when a reused provider session is no longer logged in."""
+
+
+class ProviderUnavailableError(MarkingError):
+    """Raised without contacting the provider while its circuit is open."""
+
+    def __init__(self, message: str, *, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -1,11 +1,18 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import router as api_router
 from app.core.config import settings
-import uvicorn
+from app.core.supabase_clients import close_supabase_clients, get_supabase_clients
+from app.api.v1.attendance import attendance_marking_service
+from app.services.gotrue_client import close_gotrue_client
+from app.services.marking_queue import get_marking_queue
+from app.services.schedule_cache import get_schedule_cache
+from app.services.session_prewarmer import get_session_prewarmer
 import os
+import sys
 
 # Configure logging
 logging.basicConfig(
@@ -17,9 +24,36 @@ logging.basicConfig(
 async def lifespan(app: FastAPI):
     # Startup
     logging.info("Starting attendance API on port %s", settings.port)
+    # Import supabase off the loop so serving (and /health) does not wait
+    # for it; the clients are opened as soon as it is loaded.
+    supabase_warmup = asyncio.create_task(get_supabase_clients().warm_up())
+    await get_schedule_cache().start()
+    if settings.marking_queue_enabled:
+        await get_marking_queue().start(
+            attendance_marking_service.mark_for_user,
+            workers=settings.marking_queue_workers,
+        )
+    if settings.prewarm_enabled:
+        get_session_prewarmer().start()
     yield
     # Shutdown
     logging.info("Shutting down attendance API...")
+    if settings.prewarm_enabled:
+        await get_session_prewarmer().stop()
+    if settings.marking_queue_enabled:
+        await get_marking_queue().stop()
+    await get_schedule_cache().stop()
+    if "app.services.provider_pool" in sys.modules:
+        # Only loaded (with httpx) once a mark has run.
+        from app.services.provider_pool import close_provider_pool
+
+        await close_provider_pool()
+    await close_gotrue_client()
+    try:
+        await supabase_warmup
+    except Exception as exc:  # pragma: no cover - defensive
+        logging.warning("Supabase clients failed to initialise: %s", exc)
+    await close_supabase_clients()
 
 
 app = FastAPI(
@@ -51,6 +85,8 @@ async def root():
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     reload = settings.env == "development"
     host = settings.host  # valor por defecto si no existe
     port = int(os.getenv("PORT", settings.port))  # uvicorn requiere entero
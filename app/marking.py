@@ -3,6 +3,8 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+from app.services.form_extractor import extract_form_data
+
 # %%
 BASE_URL = "https://movil.asisscad.cl"
 HEADERS = {
@@ -16,22 +18,6 @@ HEADERS = {
 }
 
 
-# %%
-def extract_form_data(html):
-    soup = BeautifulSoup(html, "html.parser")
-    form = soup.find("form")
-    if not form:
-        raise ValueError("No form found in the HTML.")
-
-    form_data = {}
-    for input_tag in form.find_all("input"):
-        name = input_tag.get("name")
-        value = input_tag.get("value", "")
-        if name:
-            form_data[name] = value
-    return form_data, form.get("action", ""), form.get("method", "GET").upper()
-
-
 # %%
 def get_page_form_data(client, url, method="GET", data=None, log=False):
     response = client.request(method, url, data=data)
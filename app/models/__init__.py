@@ -138,6 +138,28 @@ class AttendanceMarkRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
     event_type: Literal["entry", "exit"] = Field(alias="eventType")
+    deadline_seconds: Optional[float] = Field(
+        alias="deadlineSeconds",
+        default=None,
+        gt=0,
+        description="Total time budget for this mark; defaults to the server's",
+    )
+
+
+class AttendanceStepTiming(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    step: str
+    outcome: str
+    status_code: Optional[int] = Field(alias="statusCode", default=None)
+    total_ms: float = Field(alias="totalMs")
+    dns_ms: Optional[float] = Field(alias="dnsMs", default=None)
+    connect_ms: Optional[float] = Field(alias="connectMs", default=None)
+    tls_ms: Optional[float] = Field(alias="tlsMs", default=None)
+    ttfb_ms: Optional[float] = Field(alias="ttfbMs", default=None)
+    body_ms: Optional[float] = Field(alias="bodyMs", default=None)
+    parse_ms: Optional[float] = Field(alias="parseMs", default=None)
+    size_bytes: int = Field(alias="sizeBytes", default=0)
 
 
 class AttendanceMarkResponse(BaseModel):
@@ -147,6 +169,11 @@ class AttendanceMarkResponse(BaseModel):
     message: str
     event_type: Literal["entry", "exit"] = Field(alias="eventType")
     timestamp: datetime = Field(default_factory=datetime.now)
+    timings: Optional[List[AttendanceStepTiming]] = Field(
+        default=None,
+        exclude_if=lambda value: value is None,
+        description="Per-step provider timings, only set in debug mode",
+    )
 
 
 class AttendanceInternalMarkRequest(BaseModel):
@@ -154,6 +181,64 @@ class AttendanceInternalMarkRequest(BaseModel):
 
     event_type: Literal["entry", "exit"] = Field(alias="eventType")
     user_id: str = Field(alias="userId", min_length=1)
+    deadline_seconds: Optional[float] = Field(
+        alias="deadlineSeconds",
+        default=None,
+        gt=0,
+        description="Total time budget for this mark; defaults to the server's",
+    )
+    idempotency_key: Optional[str] = Field(
+        alias="idempotencyKey",
+        default=None,
+        description="Replays the first result for repeats, e.g. the event id",
+    )
+
+
+class AttendanceMarkJobResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    job_id: str = Field(alias="jobId")
+    status: Literal["queued", "running", "succeeded", "failed"]
+    event_type: Literal["entry", "exit"] = Field(alias="eventType")
+    step: Optional[Literal["login", "geo", "submit"]] = None
+    attempts: int = 0
+    detail: Optional[str] = None
+    result: Optional[AttendanceMarkResponse] = None
+
+
+class AttendanceBatchMarkRequest(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    items: List[AttendanceInternalMarkRequest] = Field(min_length=1)
+
+
+class AttendanceBatchMarkJobsResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    jobs: List[AttendanceMarkJobResponse]
+
+
+class AttendanceBatchMarkResult(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    user_id: str = Field(alias="userId")
+    event_type: Literal["entry", "exit"] = Field(alias="eventType")
+    success: bool
+    message: str
+    status_code: int = Field(
+        alias="statusCode",
+        description="Status the single-user endpoint would have returned",
+    )
+    timestamp: datetime = Field(default_factory=datetime.now)
+
+
+class AttendanceBatchMarkResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    total: int
+    succeeded: int
+    failed: int
+    results: List[AttendanceBatchMarkResult]
 
 
 class AttendanceCredentialsRequest(BaseModel):
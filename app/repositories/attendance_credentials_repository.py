@@ -1,30 +1,12 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import Dict, List, Optional
 
-from app.core.config import settings
+from app.core.credential_cache import CredentialCache, get_credential_cache
+from app.core.supabase_clients import Client, get_supabase_clients, supabase_errors
 from app.exceptions import PersistenceError
-
-try:
-    from postgrest.exceptions import APIError
-    from supabase import Client, create_client
-    from supabase_auth.errors import AuthApiError
-except ImportError:  # pragma: no cover
-    Client = Any  # type: ignore[assignment]
-
-    class APIError(Exception):
-        """Fallback APIError when supabase dependencies are missing."""
-
-    class AuthApiError(Exception):
-        """Fallback AuthApiError when supabase dependencies are missing."""
-
-    def create_client(*_: Any, **__: Any) -> Any:  # type: ignore[override]
-        raise PersistenceError(
-            "Supabase client is unavailable. Install supabase dependencies to persist data."
-        )
-
+from app.models import LocationData
 
 logger = logging.getLogger(__name__)
 
@@ -32,15 +14,29 @@ logger = logging.getLogger(__name__)
 class AttendanceCredentialsRepository:
     """Persistence gateway for attendance login credentials."""
 
-    def __init__(self, client: Optional[Client] = None) -> None:
-        self._client = client or self._build_client()
-
-    @staticmethod
-    def _build_client() -> Client:
-        key = settings.supabase_service_key or settings.supabase_key
-        return create_client(settings.supabase_url, key)
-
-    def upsert_credentials(
+    def __init__(
+        self,
+        client: Optional[Client] = None,
+        *,
+        credential_cache: Optional[CredentialCache] = None,
+    ) -> None:
+        self._injected_client = client
+        self._injected_credential_cache = credential_cache
+
+    @property
+    def _client(self) -> Client:
+        """The injected client, else the shared service-role client."""
+        if self._injected_client is not None:
+            return self._injected_client
+        return get_supabase_clients().service
+
+    @property
+    def _credential_cache(self) -> CredentialCache:
+        if self._injected_credential_cache is not None:
+            return self._injected_credential_cache
+        return get_credential_cache()
+
+    async def upsert_credentials(
         self,
         *,
         user_id: str,
@@ -48,29 +44,16 @@ class AttendanceCredentialsRepository:
         user_id_number: int,
         password: str,
     ) -> None:
-        existing = self._fetch_credentials_row(user_id=user_id)
-        secret_id = existing.get("vault_secret_id") if existing else None
-
-        if secret_id:
-            self._update_secret(secret_id=secret_id, password=password)
-        else:
-            secret_id = self._create_secret(user_id=user_id, password=password)
-
-        payload = {
-            "user_id": user_id,
-            "company_id": company_id,
-            "user_id_number": user_id_number,
-            "vault_secret_id": secret_id,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
+        """Store the Vault secret and credentials row in one transaction."""
+        params = {
+            "target_user_id": user_id,
+            "target_company_id": company_id,
+            "target_user_id_number": user_id_number,
+            "secret": password,
         }
-
         try:
-            (
-                self._client.table("attendance_credentials")
-                .upsert(payload, on_conflict="user_id", ignore_duplicates=False)
-                .execute()
-            )
-        except (AuthApiError, APIError) as exc:
+            await self._client.rpc("upsert_attendance_credentials", params).execute()
+        except supabase_errors() as exc:
             logger.warning(
                 "Supabase error persisting credentials for user %s: %s", user_id, exc
             )
@@ -78,29 +61,86 @@ class AttendanceCredentialsRepository:
         except Exception as exc:  # pragma: no cover - defensive
             logger.exception("Unexpected persistence error for user %s", user_id)
             raise PersistenceError("Unable to persist attendance credentials") from exc
+        self._credential_cache.invalidate(user_id)
 
-    def fetch_credentials(self, *, user_id: str) -> Optional[dict]:
-        record = self._fetch_credentials_row(user_id=user_id)
+    async def fetch_credentials_metadata(self, *, user_id: str) -> Optional[dict]:
+        """Credential fields and whether a password is stored; skips Vault."""
+        record = await self._fetch_credentials_row(user_id=user_id)
         if not record:
             return None
-        secret_id = record.get("vault_secret_id")
-        password = self._read_secret(secret_id=secret_id) if secret_id else None
         return {
             "company_id": record.get("company_id"),
             "user_id_number": record.get("user_id_number"),
-            "password": password,
+            "has_password": bool(record.get("vault_secret_id")),
+        }
+
+    async def fetch_marking_context(self, *, user_id: str) -> Optional[dict]:
+        """Credentials, password, timezone and location in one round trip."""
+
+        async def load() -> Optional[dict]:
+            rows = await self._rpc_marking_context(
+                "get_marking_context", {"target_user_id": user_id}
+            )
+            return rows[0] if rows else None
+
+        row = await self._credential_cache.get(user_id, load)
+        return self._parse_marking_context(row) if row else None
+
+    async def fetch_marking_contexts(self, *, user_ids: List[str]) -> Dict[str, dict]:
+        """`fetch_marking_context` for several users with a single RPC."""
+        if not user_ids:
+            return {}
+
+        async def load(missing: List[str]) -> Dict[str, dict]:
+            rows = await self._rpc_marking_context(
+                "get_marking_contexts", {"target_user_ids": missing}
+            )
+            return {row["user_id"]: row for row in rows}
+
+        rows = await self._credential_cache.get_many(user_ids, load)
+        return {
+            user_id: self._parse_marking_context(row) for user_id, row in rows.items()
         }
 
-    def _fetch_credentials_row(self, *, user_id: str) -> Optional[dict]:
+    async def _rpc_marking_context(self, name: str, params: dict) -> List[dict]:
         try:
-            response = (
+            response = await self._client.rpc(name, params).execute()
+        except supabase_errors() as exc:
+            logger.warning("Supabase error fetching marking context: %s", exc)
+            raise PersistenceError("Unable to fetch attendance credentials") from exc
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.exception("Unexpected marking context fetch error")
+            raise PersistenceError("Unable to fetch attendance credentials") from exc
+        return getattr(response, "data", None) or []
+
+    @staticmethod
+    def _parse_marking_context(row: dict) -> dict:
+        location = None
+        if row.get("location_address") is not None:
+            location = LocationData(
+                address=row["location_address"],
+                latitude=float(row["location_latitude"]),
+                longitude=float(row["location_longitude"]),
+                radius_meters=float(row["location_radius_meters"]),
+            )
+        return {
+            "company_id": row.get("company_id"),
+            "user_id_number": row.get("user_id_number"),
+            "password": row.get("password"),
+            "timezone": row.get("timezone"),
+            "location": location,
+        }
+
+    async def _fetch_credentials_row(self, *, user_id: str) -> Optional[dict]:
+        try:
+            response = await (
                 self._client.table("attendance_credentials")
                 .select("user_id,company_id,user_id_number,vault_secret_id")
                 .eq("user_id", user_id)
                 .limit(1)
                 .execute()
             )
-        except (AuthApiError, APIError) as exc:
+        except supabase_errors() as exc:
             logger.warning(
                 "Supabase error fetching credentials for user %s: %s", user_id, exc
             )
@@ -112,50 +152,3 @@ class AttendanceCredentialsRepository:
         if not getattr(response, "data", None):
             return None
         return response.data[0]
-
-    def _create_secret(self, *, user_id: str, password: str) -> str:
-        params = {
-            "secret": password,
-            "secret_name": f"attendance:{user_id}",
-            "secret_description": "Attendance login password",
-        }
-        try:
-            response = self._client.rpc("create_attendance_secret", params).execute()
-        except (AuthApiError, APIError) as exc:
-            logger.warning(
-                "Supabase error creating vault secret for user %s: %s", user_id, exc
-            )
-            raise PersistenceError("Unable to store attendance credentials") from exc
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.exception("Unexpected vault error for user %s", user_id)
-            raise PersistenceError("Unable to store attendance credentials") from exc
-
-        secret_id = response.data
-        if not secret_id:
-            raise PersistenceError("Unable to store attendance credentials")
-        return str(secret_id)
-
-    def _update_secret(self, *, secret_id: str, password: str) -> None:
-        params = {"secret_id": secret_id, "secret": password}
-        try:
-            self._client.rpc("update_attendance_secret", params).execute()
-        except (AuthApiError, APIError) as exc:
-            logger.warning(
-                "Supabase error updating vault secret %s: %s", secret_id, exc
-            )
-            raise PersistenceError("Unable to update attendance credentials") from exc
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.exception("Unexpected vault update error for secret %s", secret_id)
-            raise PersistenceError("Unable to update attendance credentials") from exc
-
-    def _read_secret(self, *, secret_id: str) -> Optional[str]:
-        params = {"secret_id": secret_id}
-        try:
-            response = self._client.rpc("read_attendance_secret", params).execute()
-        except (AuthApiError, APIError) as exc:
-            logger.warning("Supabase error reading vault secret %s: %s", secret_id, exc)
-            raise PersistenceError("Unable to read attendance credentials") from exc
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.exception("Unexpected vault read error for secret %s", secret_id)
-            raise PersistenceError("Unable to read attendance credentials") from exc
-        return response.data if response else None
@@ -2,9 +2,13 @@ from __future__ import annotations
 
 import logging
 from datetime import time as dt_time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel
 
 from app.core.config import settings
+from app.core.credential_cache import get_credential_cache
+from app.core.supabase_clients import Client, get_supabase_clients, supabase_errors
 from app.exceptions import PersistenceError
 from app.models import (
     AttendanceRequest,
@@ -14,40 +18,56 @@ from app.models import (
     DayOfWeek,
 )
 
-try:
-    from postgrest.exceptions import APIError
-    from supabase import Client, create_client
-    from supabase_auth.errors import AuthApiError
-except ImportError:  # pragma: no cover
-    Client = Any  # type: ignore[assignment]
+logger = logging.getLogger(__name__)
 
-    class APIError(Exception):
-        """Fallback APIError when supabase dependencies are missing."""
+M = TypeVar("M", bound=BaseModel)
 
-    class AuthApiError(Exception):
-        """Fallback AuthApiError when supabase dependencies are missing."""
+_DAYS = {day.value: day for day in DayOfWeek}
 
-    def create_client(*_: Any, **__: Any) -> Any:  # type: ignore[override]
-        raise PersistenceError(
-            "Supabase client is unavailable. Install supabase dependencies to persist data."
-        )
 
+def _parse_time(value: Optional[str]) -> Optional[dt_time]:
+    if not value:
+        return None
+    return dt_time.fromisoformat(value)
 
-logger = logging.getLogger(__name__)
+
+def _parse_days(values: List[Optional[str]]) -> List[DayOfWeek]:
+    return [_DAYS[day] for day in values if day]
+
+
+def _validated(model: Type[M], fields: Dict[str, Any]) -> M:
+    return model(**fields)
+
+
+def _trusted(model: Type[M], fields: Dict[str, Any]) -> M:
+    """Build `model` from complete, already-valid field values.
+
+    Sets the same instance state as `model_construct` without its per-field
+    default and alias handling, which costs more than validating these rows.
+    The instance gets its own copy of `fields`.
+    """
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", dict(fields))
+    object.__setattr__(instance, "__pydantic_fields_set__", set(fields))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
 
 
 class AttendanceRepository:
     """Persistence gateway for attendance schedules stored in Supabase/Postgres."""
 
     def __init__(self, client: Optional[Client] = None) -> None:
-        self._client = client or self._build_client()
+        self._injected_client = client
 
-    @staticmethod
-    def _build_client() -> Client:
-        key = settings.supabase_service_key or settings.supabase_key
-        return create_client(settings.supabase_url, key)
+    @property
+    def _client(self) -> Client:
+        """The injected client, else the shared service-role client."""
+        if self._injected_client is not None:
+            return self._injected_client
+        return get_supabase_clients().service
 
-    def upsert_schedule(
+    async def upsert_schedule(
         self, *, user_id: str, recorded_by: Optional[str], request: AttendanceRequest
     ) -> None:
         payload = self._build_payload(
@@ -55,12 +75,12 @@ class AttendanceRepository:
         )
 
         try:
-            (
+            await (
                 self._client.table("attendance_records")
                 .upsert(payload, on_conflict="user_id", ignore_duplicates=False)
                 .execute()
             )
-        except (AuthApiError, APIError) as exc:
+        except supabase_errors() as exc:
             logger.warning(
                 "Supabase error persisting attendance for user %s: %s", user_id, exc
             )
@@ -72,17 +92,19 @@ class AttendanceRepository:
             raise PersistenceError(
                 "Unable to persist attendance configuration"
             ) from exc
+        # Cached marking contexts carry the schedule's timezone and location.
+        get_credential_cache().invalidate(user_id)
 
-    def fetch_schedule(self, *, user_id: str) -> Optional[AttendanceRequest]:
+    async def fetch_schedule(self, *, user_id: str) -> Optional[AttendanceRequest]:
         try:
-            response = (
+            response = await (
                 self._client.table("attendance_records")
                 .select("*")
                 .eq("user_id", user_id)
                 .limit(1)
                 .execute()
             )
-        except (AuthApiError, APIError) as exc:
+        except supabase_errors() as exc:
             logger.warning(
                 "Supabase error fetching attendance for user %s: %s", user_id, exc
             )
@@ -97,6 +119,27 @@ class AttendanceRepository:
 
         return AttendanceRepository._parse_payload(data)
 
+    async def fetch_active_schedules(self) -> Dict[str, AttendanceRequest]:
+        """Fetch every active schedule keyed by user id."""
+        try:
+            response = await (
+                self._client.table("attendance_records")
+                .select("*")
+                .eq("is_active", True)
+                .execute()
+            )
+        except supabase_errors() as exc:
+            logger.warning("Supabase error fetching active attendance: %s", exc)
+            raise PersistenceError("Unable to fetch attendance configuration") from exc
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.exception("Unexpected active attendance fetch error")
+            raise PersistenceError("Unable to fetch attendance configuration") from exc
+
+        return {
+            row["user_id"]: AttendanceRepository._parse_payload(row)
+            for row in getattr(response, "data", None) or []
+        }
+
     @staticmethod
     def _build_payload(
         *, user_id: str, recorded_by: Optional[str], request: AttendanceRequest
@@ -132,54 +175,73 @@ class AttendanceRepository:
         }
 
     @staticmethod
-    def _parse_payload(payload: Dict[str, Any]) -> AttendanceRequest:
-        def _parse_time(value: Optional[str]) -> Optional[dt_time]:
-            if not value:
-                return None
-            return dt_time.fromisoformat(value)
-
-        entry_days = [DayOfWeek(day) for day in payload.get("entry_days", [])]
-
-        entry_window = ScheduleWindow(
-            enabled=payload.get("entry_enabled", False),
-            local_time=_parse_time(payload.get("entry_local_time")),
-            utc_time=_parse_time(payload.get("entry_utc_time")),
-            days=entry_days,
+    def _parse_payload(
+        payload: Dict[str, Any], *, verify: Optional[bool] = None
+    ) -> AttendanceRequest:
+        """Build the schedule stored in an `attendance_records` row.
+
+        Rows were validated before they were written, so by default the models
+        are assembled without validation. With `verify` (or
+        `APP_SCHEDULE_PARSE_VERIFY`) every model is fully validated instead.
+        """
+        verify = settings.schedule_parse_verify if verify is None else verify
+        build = _validated if verify else _trusted
+
+        entry_window = build(
+            ScheduleWindow,
+            {
+                "enabled": payload.get("entry_enabled", False),
+                "local_time": _parse_time(payload.get("entry_local_time")),
+                "utc_time": _parse_time(payload.get("entry_utc_time")),
+                "days": _parse_days(payload.get("entry_days", [])),
+            },
         )
 
-        exit_window = ScheduleWindow(
-            enabled=payload.get("exit_enabled", False),
-            local_time=_parse_time(payload.get("exit_local_time")),
-            utc_time=_parse_time(payload.get("exit_utc_time")),
-            days=[DayOfWeek(day) for day in payload.get("exit_days", [])],
+        exit_window = build(
+            ScheduleWindow,
+            {
+                "enabled": payload.get("exit_enabled", False),
+                "local_time": _parse_time(payload.get("exit_local_time")),
+                "utc_time": _parse_time(payload.get("exit_utc_time")),
+                "days": _parse_days(payload.get("exit_days", [])),
+            },
         )
 
-        location = LocationData(
-            address=payload["location_address"],
-            latitude=float(payload["location_latitude"]),
-            longitude=float(payload["location_longitude"]),
-            radius_meters=float(payload["location_radius_meters"]),
+        location = build(
+            LocationData,
+            {
+                "address": payload["location_address"],
+                "latitude": float(payload["location_latitude"]),
+                "longitude": float(payload["location_longitude"]),
+                "radius_meters": float(payload["location_radius_meters"]),
+            },
         )
 
-        return AttendanceRequest(
-            is_active=payload["is_active"],
-            schedule=AttendanceSchedule(entry=entry_window, exit=exit_window),
-            location=location,
-            phone_number=payload.get("phone_number"),
-            random_window_minutes=payload.get("random_window_minutes", 0),
-            timezone=payload["timezone"],
+        schedule = build(
+            AttendanceSchedule, {"entry": entry_window, "exit": exit_window}
+        )
+        return build(
+            AttendanceRequest,
+            {
+                "is_active": payload["is_active"],
+                "schedule": schedule,
+                "location": location,
+                "phone_number": payload.get("phone_number"),
+                "random_window_minutes": payload.get("random_window_minutes", 0),
+                "timezone": payload["timezone"],
+            },
         )
 
-    def fetch_event(self, *, event_id: str) -> Optional[Dict[str, Any]]:
+    async def fetch_event(self, *, event_id: str) -> Optional[Dict[str, Any]]:
         try:
-            response = (
+            response = await (
                 self._client.table("attendance_events")
                 .select("*")
                 .eq("id", event_id)
                 .limit(1)
                 .execute()
             )
-        except (AuthApiError, APIError) as exc:
+        except supabase_errors() as exc:
             logger.warning("Supabase error fetching event %s: %s", event_id, exc)
             raise PersistenceError("Unable to fetch attendance event") from exc
         except Exception as exc:  # pragma: no cover - defensive
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
 
 from app.exceptions import ValidationError
 from app.repositories.attendance_credentials_repository import (
@@ -19,7 +19,7 @@ class AttendanceCredentialsService:
     ) -> None:
         self._repository = repository or AttendanceCredentialsRepository()
 
-    def save_credentials(
+    async def save_credentials(
         self,
         *,
         user_id: Optional[str],
@@ -29,14 +29,26 @@ class AttendanceCredentialsService:
     ) -> None:
         if not user_id:
             raise ValidationError("Authenticated user context is required")
-        self._repository.upsert_credentials(
+        await self._repository.upsert_credentials(
             user_id=user_id,
             company_id=company_id,
             user_id_number=user_id_number,
             password=password,
         )
 
-    def get_credentials(self, *, user_id: Optional[str]) -> Optional[dict]:
+    async def get_credentials_metadata(
+        self, *, user_id: Optional[str]
+    ) -> Optional[dict]:
+        """Stored credential fields without decrypting the password."""
         if not user_id:
             raise ValidationError("Authenticated user context is required")
-        return self._repository.fetch_credentials(user_id=user_id)
+        return await self._repository.fetch_credentials_metadata(user_id=user_id)
+
+    async def get_marking_context(self, *, user_id: Optional[str]) -> Optional[dict]:
+        """Credentials plus the timezone and location a mark needs."""
+        if not user_id:
+            raise ValidationError("Authenticated user context is required")
+        return await self._repository.fetch_marking_context(user_id=user_id)
+
+    async def get_marking_contexts(self, *, user_ids: List[str]) -> Dict[str, dict]:
+        return await self._repository.fetch_marking_contexts(user_ids=user_ids)
@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from http import HTTPStatus
+from datetime import datetime, timedelta, timezone
+from datetime import time as dt_time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.exceptions import (
+    AttendanceError,
+    MarkingError,
+    NotFoundError,
+    PersistenceError,
+    ProviderSessionExpiredError,
+    ValidationError,
+)
+from app.models import (
+    AttendanceBatchMarkResult,
+    AttendanceInternalMarkRequest,
+    AttendanceMarkResponse,
+    AttendanceStepTiming,
+    LocationData,
+)
+from app.services.attendance_credentials_service import AttendanceCredentialsService
+from app.services.attendance_service import localize, safe_timezone
+from app.services.marking_service import (
+    Deadline,
+    MarkingService,
+    ProviderSession,
+    StepCallback,
+)
+from app.services.session_prewarmer import get_provider_session_cache
+from app.services.step_timing import StepSpan, capture_spans
+
+logger = logging.getLogger(__name__)
+
+_mark_results: TTLCache[str, AttendanceMarkResponse] | None = None
+_inflight_marks: SingleFlight[str, AttendanceMarkResponse] = SingleFlight()
+
+
+def get_mark_results_cache() -> TTLCache[str, AttendanceMarkResponse]:
+    """Successful marks by idempotency key, kept until the user's midnight."""
+    global _mark_results
+    if _mark_results is None:
+        _mark_results = TTLCache(
+            maxsize=settings.marking_idempotency_cache_size, ttl=24 * 3600
+        )
+    return _mark_results
+
+
+def idempotency_metrics() -> Dict[str, Any]:
+    return {
+        "results": get_mark_results_cache().stats(),
+        "in_flight": _inflight_marks.stats(),
+    }
+
+
+metrics.register_collector("marking_idempotency", idempotency_metrics)
+
+
+class AttendanceMarkingService:
+    """Resolves a user's credentials and location and runs the marking flow.
+
+    Credentials, password, timezone and location come from one marking
+    context RPC per user (or per batch), so a mark reads the database once.
+    When a pre-warmed provider session is cached for the user, the mark skips
+    the login round trips and falls back to a fresh login if it has expired.
+    """
+
+    def __init__(
+        self,
+        *,
+        credentials_service: Optional[AttendanceCredentialsService] = None,
+        marking_service: Optional[MarkingService] = None,
+        session_cache: Optional[TTLCache[str, ProviderSession]] = None,
+        results_cache: Optional[TTLCache[str, AttendanceMarkResponse]] = None,
+    ) -> None:
+        self._credentials_service = (
+            credentials_service or AttendanceCredentialsService()
+        )
+        self._marking_service = marking_service or MarkingService()
+        self._sessions = (
+            get_provider_session_cache() if session_cache is None else session_cache
+        )
+        self._results = (
+            get_mark_results_cache() if results_cache is None else results_cache
+        )
+
+    async def mark_for_user(
+        self,
+        *,
+        user_id: Optional[str],
+        event_type: str,
+        on_step: Optional[StepCallback] = None,
+        deadline_seconds: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> AttendanceMarkResponse:
+        """Mark once per user, event type and local day (or supplied key).
+
+        Concurrent duplicates share the in-flight attempt and a successful
+        result is replayed until local midnight in the user's timezone.
+        """
+        context = await self._credentials_service.get_marking_context(user_id=user_id)
+        self._require_context(context)
+
+        async def run() -> AttendanceMarkResponse:
+            with capture_spans() as spans:
+                await self._mark(
+                    user_id=user_id,
+                    credentials=context,
+                    location=context["location"],
+                    event_type=event_type,
+                    on_step=on_step,
+                    deadline_seconds=deadline_seconds,
+                )
+            return AttendanceMarkResponse(
+                success=True,
+                message="Attendance marked",
+                event_type=event_type,
+                timings=self._timings(spans)
+                if settings.marking_debug_timings
+                else None,
+            )
+
+        return await self._mark_once(
+            user_id=user_id,
+            event_type=event_type,
+            timezone_name=context["timezone"],
+            idempotency_key=idempotency_key,
+            run=run,
+        )
+
+    async def mark_batch(
+        self,
+        items: List[AttendanceInternalMarkRequest],
+        *,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[AttendanceBatchMarkResult]:
+        """Load everything the batch needs, then mark items concurrently.
+
+        Marking contexts are loaded with one RPC before this returns, so
+        persistence failures surface here. The returned iterator
+        yields results in completion order with at most `concurrency`
+        provider sessions running at the same time.
+        """
+        user_ids = list(dict.fromkeys(item.user_id for item in items))
+        contexts = await self._credentials_service.get_marking_contexts(
+            user_ids=user_ids
+        )
+        semaphore = asyncio.Semaphore(concurrency or settings.marking_batch_concurrency)
+
+        async def run(item: AttendanceInternalMarkRequest) -> AttendanceBatchMarkResult:
+            async with semaphore:
+                return await self._mark_item(item, context=contexts.get(item.user_id))
+
+        async def results() -> AsyncIterator[AttendanceBatchMarkResult]:
+            tasks = [asyncio.create_task(run(item)) for item in items]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return results()
+
+    async def _mark_item(
+        self,
+        item: AttendanceInternalMarkRequest,
+        *,
+        context: Optional[dict],
+    ) -> AttendanceBatchMarkResult:
+        try:
+            self._require_context(context)
+
+            async def run() -> AttendanceMarkResponse:
+                await self._mark(
+                    user_id=item.user_id,
+                    credentials=context,
+                    location=context["location"],
+                    event_type=item.event_type,
+                    deadline_seconds=item.deadline_seconds,
+                )
+                return AttendanceMarkResponse(
+                    success=True,
+                    message="Attendance marked",
+                    event_type=item.event_type,
+                )
+
+            await self._mark_once(
+                user_id=item.user_id,
+                event_type=item.event_type,
+                timezone_name=context["timezone"],
+                idempotency_key=item.idempotency_key,
+                run=run,
+            )
+        except AttendanceError as exc:
+            logger.warning("Batch mark failed for user %s: %s", item.user_id, exc)
+            return AttendanceBatchMarkResult(
+                user_id=item.user_id,
+                event_type=item.event_type,
+                success=False,
+                message=str(exc),
+                status_code=self.status_for(exc),
+            )
+        except Exception:  # pragma: no cover - defensive
+            logger.exception("Unexpected batch mark error for user %s", item.user_id)
+            return AttendanceBatchMarkResult(
+                user_id=item.user_id,
+                event_type=item.event_type,
+                success=False,
+                message="Unexpected attendance marking error",
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            )
+        return AttendanceBatchMarkResult(
+            user_id=item.user_id,
+            event_type=item.event_type,
+            success=True,
+            message="Attendance marked",
+            status_code=HTTPStatus.OK,
+        )
+
+    async def _mark_once(
+        self,
+        *,
+        user_id: Optional[str],
+        event_type: str,
+        timezone_name: str,
+        idempotency_key: Optional[str],
+        run: Callable[[], Awaitable[AttendanceMarkResponse]],
+    ) -> AttendanceMarkResponse:
+        zone = safe_timezone(timezone_name)
+        local_now = datetime.now(timezone.utc).astimezone(zone)
+        if idempotency_key:
+            key = f"{user_id}:{event_type}:{idempotency_key}"
+        else:
+            key = f"{user_id}:{event_type}:{local_now.date().isoformat()}"
+
+        completed = self._results.get(key)
+        if completed is not None:
+            return completed
+
+        async def run_and_remember() -> AttendanceMarkResponse:
+            response = await run()
+            midnight = localize(
+                zone,
+                datetime.combine(local_now.date() + timedelta(days=1), dt_time()),
+            )
+            self._results.set(key, response, ttl=(midnight - local_now).total_seconds())
+            return response
+
+        return await _inflight_marks.do(key, run_and_remember)
+
+    async def _mark(
+        self,
+        *,
+        user_id: Optional[str],
+        credentials: Optional[dict],
+        location: Optional[LocationData],
+        event_type: str,
+        on_step: Optional[StepCallback] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> None:
+        self._require_credentials(credentials)
+        if location is None:
+            raise ValidationError("Location data is required to mark attendance")
+
+        # One budget for the whole mark, including a fallback login.
+        deadline = Deadline(deadline_seconds or settings.marking_deadline)
+        session = self._sessions.pop(user_id) if user_id else None
+        if session is not None:
+            try:
+                await self._marking_service.submit(
+                    session,
+                    latitude=float(location.latitude),
+                    longitude=float(location.longitude),
+                    event_type=event_type,
+                    on_step=on_step,
+                    deadline=deadline,
+                )
+                return
+            except ProviderSessionExpiredError:
+                logger.info("Pre-warmed session for user %s expired", user_id)
+
+        await self._marking_service.mark_attendance(
+            company_id=credentials["company_id"],
+            user_id_number=credentials["user_id_number"],
+            password=credentials["password"],
+            latitude=float(location.latitude),
+            longitude=float(location.longitude),
+            event_type=event_type,
+            on_step=on_step,
+            deadline=deadline,
+        )
+
+    @staticmethod
+    def _timings(spans: List[StepSpan]) -> List[AttendanceStepTiming]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 3)
+
+        return [
+            AttendanceStepTiming(
+                step=span.step,
+                outcome=span.outcome,
+                status_code=span.status_code,
+                total_ms=ms(span.total),
+                dns_ms=ms(span.dns),
+                connect_ms=ms(span.connect),
+                tls_ms=ms(span.tls),
+                ttfb_ms=ms(span.ttfb),
+                body_ms=ms(span.body),
+                parse_ms=ms(span.parse),
+                size_bytes=span.size,
+            )
+            for span in spans
+        ]
+
+    @staticmethod
+    def _require_credentials(credentials: Optional[dict]) -> None:
+        if not credentials or not credentials.get("password"):
+            raise ValidationError("Attendance credentials are required")
+
+    @classmethod
+    def _require_context(cls, context: Optional[dict]) -> None:
+        cls._require_credentials(context)
+        if context.get("timezone") is None:
+            raise NotFoundError("Attendance schedule not found")
+
+    @staticmethod
+    def status_for(exc: AttendanceError) -> int:
+        """HTTP status the mark routes use for a marking failure."""
+        if isinstance(exc, ValidationError):
+            return HTTPStatus.BAD_REQUEST
+        if isinstance(exc, MarkingError):
+            return HTTPStatus.BAD_GATEWAY
+        if isinstance(exc, (NotFoundError, PersistenceError)):
+            return HTTPStatus.SERVICE_UNAVAILABLE
+        return HTTPStatus.INTERNAL_SERVER_ERROR
@@ -1,25 +1,57 @@
 import logging
 from datetime import datetime, timezone, tzinfo
-from typing import List, Optional
-
-import pytz
+from typing import Dict, List, Optional
 
+from app.core.lazy import lazy_import
 from app.models import AttendanceRequest, AttendanceResponse
 from app.exceptions import NotFoundError, PersistenceError, ValidationError
+from app.services.schedule_cache import ScheduleCache, get_schedule_cache
 from app.services.whatsapp_service import WhatsAppService
 from app.repositories.attendance_repository import AttendanceRepository
 
+pytz = lazy_import("pytz")
+
 logger = logging.getLogger(__name__)
 
 
+def safe_timezone(value: str) -> tzinfo:
+    """Resolve a stored timezone label, falling back to UTC when unknown."""
+    parts = value.split()
+    for part in reversed(parts):
+        if "/" in part:
+            try:
+                return pytz.timezone(part)
+            except pytz.UnknownTimeZoneError:
+                break
+    try:
+        return pytz.timezone(value)
+    except pytz.UnknownTimeZoneError:
+        return timezone.utc
+
+
+def localize(zone: tzinfo, value: datetime) -> datetime:
+    """Attach `zone` to a naive local time, resolving DST like pytz does."""
+    localize_ = getattr(zone, "localize", None)
+    if localize_ is not None:
+        return localize_(value)
+    return value.replace(tzinfo=zone)
+
+
 class AttendanceService:
     """Validates attendance schedules and returns deterministic acknowledgements."""
 
-    def __init__(self, repository: Optional[AttendanceRepository] = None) -> None:
+    def __init__(
+        self,
+        repository: Optional[AttendanceRepository] = None,
+        schedule_cache: Optional[ScheduleCache] = None,
+    ) -> None:
         self._repository = repository
+        self._schedule_cache = (
+            get_schedule_cache() if schedule_cache is None else schedule_cache
+        )
         self._whatsapp_service = WhatsAppService()
 
-    def process_attendance(
+    async def process_attendance(
         self, request: AttendanceRequest, *, current_user: Optional[dict] = None
     ) -> AttendanceResponse:
         """Validate the payload and create a deterministic response."""
@@ -46,7 +78,7 @@ class AttendanceService:
             timestamp=datetime.now(),
         )
 
-        self._persist_schedule(request=request, current_user=current_user)
+        await self._persist_schedule(request=request, current_user=current_user)
         return response
 
     @staticmethod
@@ -75,7 +107,7 @@ class AttendanceService:
         if not user or not user.get("id"):
             raise ValidationError("Authenticated user context is required")
 
-    def _persist_schedule(
+    async def _persist_schedule(
         self, *, request: AttendanceRequest, current_user: Optional[dict]
     ) -> None:
         """Persist the schedule configuration via the repository."""
@@ -84,18 +116,19 @@ class AttendanceService:
             raise ValidationError("Authenticated user context is required")
 
         recorded_by = current_user.get("id")
-        self._get_repository().upsert_schedule(
+        await self._get_repository().upsert_schedule(
             user_id=user_id, recorded_by=recorded_by, request=request
         )
+        await self._schedule_cache.invalidate(user_id)
 
-    def get_attendance_schedule(
+    async def get_attendance_schedule(
         self, *, current_user: Optional[dict]
     ) -> AttendanceRequest:
         """Retrieve the stored attendance schedule for the authenticated user."""
         self._ensure_user_context(current_user)
         user_id = current_user.get("id")
         try:
-            schedule = self._get_repository().fetch_schedule(user_id=user_id)
+            schedule = await self._fetch_schedule(user_id)
         except PersistenceError:
             raise
 
@@ -104,16 +137,9 @@ class AttendanceService:
 
         return schedule
 
-    def get_attendance_schedule_for_user(self, *, user_id: str) -> AttendanceRequest:
-        if not user_id:
-            raise ValidationError("User id is required")
-        try:
-            schedule = self._get_repository().fetch_schedule(user_id=user_id)
-        except PersistenceError:
-            raise
-        if schedule is None:
-            raise NotFoundError("Attendance schedule not found")
-        return schedule
+    async def get_active_schedules(self) -> Dict[str, AttendanceRequest]:
+        """Fetch every active schedule keyed by user id."""
+        return await self._get_repository().fetch_active_schedules()
 
     async def notify_attendance_event(
         self, *, event_id: str, current_user: Optional[dict]
@@ -121,11 +147,11 @@ class AttendanceService:
         self._ensure_user_context(current_user)
         user_id = current_user.get("id")
 
-        event = self._get_repository().fetch_event(event_id=event_id)
+        event = await self._get_repository().fetch_event(event_id=event_id)
         if event is None or event.get("user_id") != user_id:
             raise NotFoundError("Attendance event not found")
 
-        schedule = self._get_repository().fetch_schedule(user_id=user_id)
+        schedule = await self._fetch_schedule(user_id)
         if schedule is None:
             raise NotFoundError("Attendance schedule not found")
 
@@ -136,7 +162,7 @@ class AttendanceService:
             raise ValidationError("Phone number is required to send notifications")
 
         event_time = self._parse_event_time(event.get("scheduled_for"))
-        timezone_name = self._safe_timezone(event.get("timezone") or schedule.timezone)
+        timezone_name = safe_timezone(event.get("timezone") or schedule.timezone)
         local_time = event_time.astimezone(timezone_name)
 
         response = await self._whatsapp_service.send_template(
@@ -168,24 +194,16 @@ class AttendanceService:
             return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
         raise ValidationError("Invalid event timestamp")
 
-    @staticmethod
-    def _safe_timezone(value: str) -> tzinfo:
-        parts = value.split()
-        for part in reversed(parts):
-            if "/" in part:
-                try:
-                    return pytz.timezone(part)
-                except pytz.UnknownTimeZoneError:
-                    break
-        try:
-            return pytz.timezone(value)
-        except pytz.UnknownTimeZoneError:
-            return timezone.utc
-
     @staticmethod
     def _format_wa_id(phone_number: str) -> str:
         return phone_number.lstrip("+")
 
+    async def _fetch_schedule(self, user_id: str) -> Optional[AttendanceRequest]:
+        """Read-through `fetch_schedule`; see `ScheduleCache`."""
+        return await self._schedule_cache.get(
+            user_id, lambda: self._get_repository().fetch_schedule(user_id=user_id)
+        )
+
     def _get_repository(self) -> AttendanceRepository:
         if self._repository is None:
             self._repository = AttendanceRepository()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.singleflight import SingleFlight
+from app.services.auth_service import AuthService
+
+jwt = lazy_import("jwt")
+
+_users: TTLCache[str, Dict[str, Any]] | None = None
+_profiles: TTLCache[str, Dict[str, Any]] | None = None
+_inflight_users: SingleFlight[str, Dict[str, Any]] = SingleFlight()
+_inflight_profiles: SingleFlight[str, Dict[str, Any]] = SingleFlight()
+
+
+def get_user_cache() -> TTLCache[str, Dict[str, Any]]:
+    """Validated users keyed by the SHA-256 of their bearer token."""
+    global _users
+    if _users is None:
+        _users = TTLCache(
+            maxsize=settings.auth_token_cache_size, ttl=settings.auth_token_cache_ttl
+        )
+    return _users
+
+
+def get_profile_cache() -> TTLCache[str, Dict[str, Any]]:
+    """`profiles` rows keyed by user id; `{}` records a user without one."""
+    global _profiles
+    if _profiles is None:
+        _profiles = TTLCache(
+            maxsize=settings.auth_token_cache_size,
+            ttl=settings.auth_profile_cache_ttl,
+        )
+    return _profiles
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def token_lifetime(token: str, *, now: Optional[float] = None) -> float:
+    """Seconds until the token's `exp`, or 0 when it has none.
+
+    Only called after the token was verified, so the signature is not checked
+    again here.
+    """
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return 0.0
+    expires_at = claims.get("exp")
+    if not isinstance(expires_at, (int, float)):
+        return 0.0
+    return float(expires_at) - (time.time() if now is None else now)
+
+
+async def get_cached_user(token: str) -> Dict[str, Any]:
+    """Validate `token` through `AuthService.verify_token`, at most once per TTL.
+
+    Concurrent validations of the same token share one call; failures are not
+    cached, and no entry outlives the token's `exp`.
+    """
+    cache = get_user_cache()
+    key = token_key(token)
+    user = cache.get(key)
+    if user is not None:
+        return dict(user)
+
+    async def validate() -> Dict[str, Any]:
+        validated = await AuthService.verify_token(token)
+        cache.set(key, validated, ttl=token_lifetime(token))
+        return validated
+
+    return dict(await _inflight_users.do(key, validate))
+
+
+async def get_cached_profile(
+    user_id: str, fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+) -> Dict[str, Any]:
+    """Return the `profiles` row for `user_id`, loading it with `fetch` on a miss."""
+    cache = get_profile_cache()
+    profile = cache.get(user_id)
+    if profile is not None:
+        return profile
+
+    async def load() -> Dict[str, Any]:
+        loaded = await fetch() or {}
+        cache.set(user_id, loaded)
+        return loaded
+
+    return await _inflight_profiles.do(user_id, load)
+
+
+def auth_cache_metrics() -> Dict[str, Any]:
+    return {
+        "users": get_user_cache().stats(),
+        "profiles": get_profile_cache().stats(),
+        "users_in_flight": _inflight_users.stats(),
+        "profiles_in_flight": _inflight_profiles.stats(),
+    }
+
+
+metrics.register_collector("auth_cache", auth_cache_metrics)
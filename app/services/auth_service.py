@@ -1,31 +1,26 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-import jwt
 from fastapi import HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from postgrest.exceptions import APIError
-from supabase import Client, create_client
-from supabase_auth.errors import AuthApiError
 
 from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.exceptions import (
+    AuthenticationError,
+    AuthProviderUnavailableError,
+    TokenVerificationUnavailableError,
+)
+from app.services.gotrue_client import get_gotrue_client
+from app.services.token_verifier import get_token_verifier
+
+jwt = lazy_import("jwt")
 
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
-_supabase_client: Client | None = None
-
-
-def get_supabase_client() -> Client:
-    global _supabase_client
-    if _supabase_client is None:
-        print(settings.supabase_service_key)
-        _supabase_client = create_client(
-            settings.supabase_url, settings.supabase_service_key
-        )
-    return _supabase_client
-
 
 class AuthService:
     @staticmethod
@@ -44,45 +39,63 @@ class AuthService:
         return encoded_jwt
 
     @staticmethod
-    def verify_token(token: str) -> dict:
+    async def verify_token(token: str) -> dict:
+        """Verify a Supabase access token.
+
+        With `auth_local_verification` the token is checked offline; Supabase
+        Auth is only asked when no local key is available and
+        `auth_remote_fallback` allows it. Verification runs in a thread because
+        a cold or rotated JWKS is fetched with blocking I/O.
+        """
+        if settings.auth_local_verification:
+            try:
+                return await asyncio.to_thread(get_token_verifier().verify, token)
+            except AuthenticationError as exc:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid or expired token",
+                ) from exc
+            except TokenVerificationUnavailableError as exc:
+                if not settings.auth_remote_fallback:
+                    logger.error("Unable to verify token locally: %s", exc)
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="Authentication provider unavailable",
+                    ) from exc
+                logger.info("Falling back to remote token validation: %s", exc)
+        return await AuthService._verify_remote(token)
+
+    @staticmethod
+    async def _verify_remote(token: str) -> dict:
         """Verify JWT token against Supabase"""
-        client = get_supabase_client()
         try:
-            user_response = client.auth.get_user(token)
-        except AuthApiError as exc:
-            logger.warning("Supabase rejected token: %s", exc)
+            user = await get_gotrue_client().get_user(token)
+        except AuthenticationError as exc:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token",
             ) from exc
-        except APIError as exc:
-            logger.error("Supabase API error while validating token: %s", exc)
+        except AuthProviderUnavailableError as exc:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Authentication provider unavailable",
             ) from exc
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.exception("Unexpected error validating token")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Unable to validate authentication token",
-            ) from exc
 
-        if user_response.user is None:
+        if not user.get("id"):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token",
             )
 
         return {
-            "id": user_response.user.id,
-            "email": user_response.user.email,
-            "role": user_response.user.role,
-            "audience": user_response.user.aud,
+            "id": user["id"],
+            "email": user.get("email"),
+            "role": user.get("role"),
+            "audience": user.get("aud"),
         }
 
     @staticmethod
-    def get_current_user(credentials: HTTPAuthorizationCredentials) -> dict:
+    async def get_current_user(credentials: HTTPAuthorizationCredentials) -> dict:
         """Get current user from token"""
         token = credentials.credentials
-        return AuthService.verify_token(token)
+        return await AuthService.verify_token(token)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import re
+from html import unescape
+from typing import Dict, List, Optional, Tuple
+
+from app.exceptions import MarkingError
+
+# Tags we care about, plus comments so commented-out inputs are skipped the
+# same way an HTML parser would. Attribute values may contain `>` when quoted.
+# A tag or comment cut off by the end of the text still matches, without its
+# `comment_end`/`tag_end` group, so `feed` knows where the unfinished part starts.
+_TAG_RE = re.compile(
+    r"<!--.*?(?:(?P<comment_end>-->)|\Z)"
+    r"|<(?P<closing>/?)(?P<tag>form|input)\b"
+    r"(?P<attrs>(?:[^>\"']|\"[^\"]*\"|'[^']*')*)"
+    r"(?:(?P<tag_end>>)|(?:\"[^\"]*|'[^']*)?\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+# Longest tag or comment opener whose name can still be incomplete.
+_OPENER_LOOKBACK = len("</form")
+# What ends an unfinished tag: `>`, or a quote that opens an attribute value.
+_TAG_DELIM_RE = re.compile(r"[>\"']")
+_ATTR_RE = re.compile(
+    r"([^\s\"'>/=]+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+)))?",
+)
+
+FormData = Tuple[Dict[str, str], str, str]
+
+
+class FormExtractor:
+    """Single-pass extractor for the first `<form>` of a provider page.
+
+    It only looks at `<form>` and `<input>` tags, so large `__VIEWSTATE`
+    values are skipped by the regex engine instead of being built into a
+    document tree. Text can be fed in chunks; `feed` returns True once the
+    first `</form>` has been seen and the rest of the page can be ignored.
+
+    A tag or comment split across chunks is held back until the chunk that
+    ends it arrives. Only new chunks are searched for that end, so a large
+    `__VIEWSTATE` fed in small chunks is still matched once.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        # The unfinished tag or comment, and how far its end search got.
+        self._pending: List[str] = []
+        self._pending_comment = False
+        self._comment_tail = ""
+        self._quote: Optional[str] = None
+        self._in_form = False
+        self._done = False
+        self._data: Dict[str, str] = {}
+        self._action = ""
+        self._method = "GET"
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> bool:
+        if self._done:
+            return True
+
+        if self._pending:
+            self._pending.append(chunk)
+            if not self._pending_ends(chunk):
+                return False
+            buffer = "".join(self._pending)
+            self._pending = []
+        else:
+            buffer = self._buffer + chunk
+        self._buffer = ""
+
+        consumed = 0
+        for match in _TAG_RE.finditer(buffer):
+            closing, tag = match.group("closing"), match.group("tag")
+            if match.group("comment_end" if tag is None else "tag_end") is None:
+                # Cut off by the end of the text: wait for the chunk ending it.
+                start = match.start()
+                if tag is None:
+                    self._hold_comment(buffer[start:])
+                else:
+                    self._hold_tag(buffer[start:], match.start("attrs") - start)
+                return False
+            consumed = match.end()
+            if tag is None:
+                continue
+            tag = tag.lower()
+            if tag == "form":
+                if closing:
+                    if self._in_form:
+                        self._done = True
+                        self._buffer = ""
+                        return True
+                elif not self._in_form:
+                    self._open_form(match.group("attrs"))
+            elif self._in_form and not closing:
+                self._add_input(match.group("attrs"))
+
+        # Keep an opener like `<inp` whose name is still incomplete.
+        tail = buffer.rfind("<", max(consumed, len(buffer) - _OPENER_LOOKBACK))
+        if tail != -1:
+            self._buffer = buffer[tail:]
+        return False
+
+    def result(self) -> FormData:
+        if not self._in_form:
+            raise MarkingError("No form found in response")
+        return dict(self._data), self._action, self._method
+
+    def _hold_comment(self, text: str) -> None:
+        self._pending = [text]
+        self._pending_comment = True
+        # `-->` may straddle chunks; the opening `<!--` cannot be part of it.
+        self._comment_tail = text[len("<!--") :][-2:]
+
+    def _hold_tag(self, text: str, attrs_start: int) -> None:
+        self._pending = [text]
+        self._pending_comment = False
+        self._quote = None
+        self._tag_ends(text, attrs_start)
+
+    def _pending_ends(self, chunk: str) -> bool:
+        """Whether `chunk` completes the held tag or comment."""
+        if self._pending_comment:
+            text = self._comment_tail + chunk
+            self._comment_tail = text[-2:]
+            return "-->" in text
+        return self._tag_ends(chunk, 0)
+
+    def _tag_ends(self, text: str, pos: int) -> bool:
+        """Scan `text` for the held tag's `>`, tracking quoted values."""
+        while True:
+            if self._quote is not None:
+                pos = text.find(self._quote, pos)
+                if pos == -1:
+                    return False
+                self._quote = None
+                pos += 1
+            delim = _TAG_DELIM_RE.search(text, pos)
+            if delim is None:
+                return False
+            if delim.group() == ">":
+                return True
+            self._quote = delim.group()
+            pos = delim.end()
+
+    def _open_form(self, raw_attrs: str) -> None:
+        attrs = _parse_attrs(raw_attrs)
+        self._in_form = True
+        self._action = attrs.get("action", "") or ""
+        self._method = (attrs.get("method", "GET") or "").upper()
+
+    def _add_input(self, raw_attrs: str) -> None:
+        attrs = _parse_attrs(raw_attrs)
+        name = attrs.get("name")
+        if name:
+            self._data[name] = attrs.get("value", "") or ""
+
+
+def _parse_attrs(raw: str) -> Dict[str, Optional[str]]:
+    attrs: Dict[str, Optional[str]] = {}
+    for match in _ATTR_RE.finditer(raw):
+        key = match.group(1).lower()
+        value = match.group(2)
+        if value is None:
+            value = match.group(3)
+        if value is None:
+            value = match.group(4)
+        attrs[key] = unescape(value) if value is not None else None
+    return attrs
+
+
+def extract_form_data(html: str) -> FormData:
+    """Return `(data, action, method)` for the first form in `html`."""
+    extractor = FormExtractor()
+    extractor.feed(html)
+    return extractor.result()
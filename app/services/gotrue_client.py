@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.exceptions import AuthenticationError, AuthProviderUnavailableError
+
+httpx = lazy_import("httpx")
+
+logger = logging.getLogger(__name__)
+
+# GoTrue answers these for bad credentials, bad or expired tokens.
+REJECTED_STATUSES = {400, 401, 403, 404, 422}
+
+
+class GoTrueClient:
+    """Async client for the Supabase Auth (GoTrue) endpoints used by the API.
+
+    A single `httpx.AsyncClient` is shared by every request, so token
+    validation, login, refresh and logout reuse keep-alive connections instead
+    of blocking a worker thread per call.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self._api_key = api_key or settings.supabase_key
+        self._client = httpx.AsyncClient(
+            base_url=f"{(base_url or settings.supabase_url).rstrip('/')}/auth/v1",
+            headers={"apikey": self._api_key},
+            timeout=settings.request_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.auth_pool_size,
+                max_keepalive_connections=settings.auth_pool_keepalive,
+            ),
+            transport=transport,
+        )
+
+    async def get_user(self, token: str) -> Dict[str, Any]:
+        return await self._request("GET", "/user", token=token)
+
+    async def sign_in_with_password(self, email: str, password: str) -> Dict[str, Any]:
+        return await self._request(
+            "POST",
+            "/token",
+            params={"grant_type": "password"},
+            json={"email": email, "password": password},
+        )
+
+    async def refresh_session(self, refresh_token: str) -> Dict[str, Any]:
+        return await self._request(
+            "POST",
+            "/token",
+            params={"grant_type": "refresh_token"},
+            json={"refresh_token": refresh_token},
+        )
+
+    async def logout(self, token: str) -> None:
+        await self._request("POST", "/logout", token=token)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        token: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {token or self._api_key}"}
+        try:
+            response = await self._client.request(
+                method, path, headers=headers, **kwargs
+            )
+        except httpx.HTTPError as exc:
+            logger.error("Supabase Auth request %s %s failed: %s", method, path, exc)
+            raise AuthProviderUnavailableError(
+                "Authentication provider unavailable"
+            ) from exc
+
+        if response.status_code in REJECTED_STATUSES:
+            logger.warning(
+                "Supabase Auth rejected %s %s: %s", method, path, response.status_code
+            )
+            raise AuthenticationError("Invalid or expired token")
+        if response.status_code >= 400:
+            logger.error(
+                "Supabase Auth error on %s %s: %s", method, path, response.status_code
+            )
+            raise AuthProviderUnavailableError("Authentication provider unavailable")
+        if not response.content:
+            return {}
+        return response.json()
+
+
+_gotrue_client: GoTrueClient | None = None
+
+
+def get_gotrue_client() -> GoTrueClient:
+    global _gotrue_client
+    if _gotrue_client is None:
+        _gotrue_client = GoTrueClient()
+    return _gotrue_client
+
+
+async def close_gotrue_client() -> None:
+    global _gotrue_client
+    if _gotrue_client is not None:
+        await _gotrue_client.aclose()
+        _gotrue_client = None
@@ -0,0 +1,509 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core import metrics
+from app.core.config import settings
+from app.exceptions import (
+    AttendanceError,
+    MarkingError,
+    PersistenceError,
+    ProviderUnavailableError,
+)
+from app.models import AttendanceInternalMarkRequest, AttendanceMarkResponse
+
+logger = logging.getLogger(__name__)
+
+MarkingRunner = Callable[..., Awaitable[AttendanceMarkResponse]]
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_SCHEMA = """
+create table if not exists marking_jobs (
+    id text primary key,
+    user_id text not null,
+    event_type text not null,
+    idempotency_key text,
+    deadline_seconds real,
+    status text not null,
+    attempts integer not null default 0,
+    max_attempts integer not null,
+    next_run_at real not null,
+    step text,
+    owner text,
+    lease_expires_at real,
+    last_error text,
+    result text,
+    created_at real not null,
+    updated_at real not null
+);
+create index if not exists idx_marking_jobs_due
+    on marking_jobs (status, next_run_at);
+"""
+
+
+@dataclass
+class MarkingJob:
+    id: str
+    user_id: str
+    event_type: str
+    idempotency_key: Optional[str]
+    deadline_seconds: Optional[float]
+    status: str
+    attempts: int
+    max_attempts: int
+    next_run_at: float
+    step: Optional[str]
+    owner: Optional[str]
+    lease_expires_at: Optional[float]
+    last_error: Optional[str]
+    result: Optional[Dict[str, Any]]
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "MarkingJob":
+        data = dict(row)
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        return cls(**data)
+
+
+class MarkingJobStore:
+    """SQLite-backed job table; every method is blocking and thread-safe.
+
+    The file may be shared by several processes. A claimed job is leased to
+    this store's `owner` until `lease_expires_at`; the lease is renewed while
+    the job runs, and only jobs whose lease ran out are recovered.
+    """
+
+    def __init__(self, path: str, *, owner: Optional[str] = None) -> None:
+        self.owner = owner or uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.executescript(_SCHEMA)
+
+    def enqueue(
+        self,
+        *,
+        user_id: str,
+        event_type: str,
+        max_attempts: int,
+        idempotency_key: Optional[str] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> MarkingJob:
+        item = AttendanceInternalMarkRequest(
+            user_id=user_id,
+            event_type=event_type,
+            idempotency_key=idempotency_key,
+            deadline_seconds=deadline_seconds,
+        )
+        return self.enqueue_many([item], max_attempts=max_attempts)[0]
+
+    def enqueue_many(
+        self, items: List[AttendanceInternalMarkRequest], *, max_attempts: int
+    ) -> List[MarkingJob]:
+        """Insert one job per item in a single transaction."""
+        now = time.time()
+        job_ids = [str(uuid.uuid4()) for _ in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "insert into marking_jobs (id, user_id, event_type, idempotency_key,"
+                " deadline_seconds, status, max_attempts, next_run_at, created_at,"
+                " updated_at) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        job_id,
+                        item.user_id,
+                        item.event_type,
+                        item.idempotency_key,
+                        item.deadline_seconds,
+                        QUEUED,
+                        max_attempts,
+                        now,
+                        now,
+                        now,
+                    )
+                    for job_id, item in zip(job_ids, items)
+                ],
+            )
+        return [self.get(job_id) for job_id in job_ids]
+
+    def get(self, job_id: str) -> Optional[MarkingJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "select * from marking_jobs where id = ?", (job_id,)
+            ).fetchone()
+        return MarkingJob.from_row(row) if row else None
+
+    def claim_next(self, *, lease: float) -> Optional[MarkingJob]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "update marking_jobs"
+                " set status = ?, attempts = attempts + 1, owner = ?,"
+                " lease_expires_at = ?, updated_at = ?"
+                " where id = (select id from marking_jobs"
+                "   where status = ? and next_run_at <= ?"
+                "   order by next_run_at limit 1)"
+                " returning *",
+                (RUNNING, self.owner, now + lease, now, QUEUED, now),
+            ).fetchone()
+        return MarkingJob.from_row(row) if row else None
+
+    def renew(self, job_id: str, *, lease: float) -> bool:
+        """Extend the lease on a job this store is running."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "update marking_jobs set lease_expires_at = ?"
+                " where id = ? and status = ? and owner = ?",
+                (time.time() + lease, job_id, RUNNING, self.owner),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, status=SUCCEEDED, result=json.dumps(result), error=None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, status=FAILED, result=None, error=error)
+
+    def set_step(self, job_id: str, step: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "update marking_jobs set step = ?, updated_at = ? where id = ?",
+                (step, now, job_id),
+            )
+
+    def retry(self, job_id: str, *, error: str, delay: float) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "update marking_jobs set status = ?, next_run_at = ?, step = null,"
+                " owner = null, lease_expires_at = null,"
+                " last_error = ?, updated_at = ? where id = ?",
+                (QUEUED, now + delay, error, now, job_id),
+            )
+
+    def defer(self, job_id: str, *, delay: float) -> None:
+        """Requeue a job without counting the attempt it just made."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "update marking_jobs set status = ?, attempts = attempts - 1,"
+                " next_run_at = ?, step = null, owner = null,"
+                " lease_expires_at = null, updated_at = ? where id = ?",
+                (QUEUED, now + delay, now, job_id),
+            )
+
+    def recover(self) -> int:
+        """Requeue running jobs whose lease expired (their process stopped)."""
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "update marking_jobs set status = ?, next_run_at = ?, step = null,"
+                " owner = null, lease_expires_at = null, updated_at = ?"
+                " where status = ?"
+                " and (lease_expires_at is null or lease_expires_at <= ?)",
+                (QUEUED, now, now, RUNNING, now),
+            )
+        return cursor.rowcount
+
+    def purge(self, *, older_than: float) -> int:
+        """Delete finished jobs last updated before `older_than`."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "delete from marking_jobs where status in (?, ?) and updated_at < ?",
+                (SUCCEEDED, FAILED, older_than),
+            )
+        return cursor.rowcount
+
+    def next_due_at(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "select min(next_run_at) from marking_jobs where status = ?",
+                (QUEUED,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "select status, count(*) from marking_jobs group by status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _finish(
+        self, job_id: str, *, status: str, result: Optional[str], error: Optional[str]
+    ) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "update marking_jobs set status = ?, result = ?, owner = null,"
+                " lease_expires_at = null, last_error = coalesce(?, last_error),"
+                " updated_at = ? where id = ?",
+                (status, result, error, now, job_id),
+            )
+
+
+class MarkingQueue:
+    """Durable marking queue drained by a pool of asyncio workers.
+
+    Provider and persistence failures are retried with jittered exponential
+    backoff until the job has run `max_retries + 1` times; validation and
+    not-found errors fail the job immediately. Jobs rejected by an open
+    provider circuit are deferred until it half-opens, keeping their attempt.
+    Running jobs hold a renewed lease; idle workers requeue jobs whose lease
+    expired, so marks of a stopped process resume without double-marking
+    jobs another live process is still running.
+    """
+
+    def __init__(self, store: MarkingJobStore) -> None:
+        self._store = store
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self._runner: Optional[MarkingRunner] = None
+        self._watchers: Dict[str, Set[asyncio.Event]] = {}
+        self._recovered_at = 0.0
+        self.deferred = 0
+
+    async def enqueue(
+        self,
+        *,
+        user_id: str,
+        event_type: str,
+        idempotency_key: Optional[str] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> MarkingJob:
+        job = await asyncio.to_thread(
+            self._store.enqueue,
+            user_id=user_id,
+            event_type=event_type,
+            max_attempts=settings.max_retries + 1,
+            idempotency_key=idempotency_key,
+            deadline_seconds=deadline_seconds,
+        )
+        self._wakeup.set()
+        return job
+
+    async def enqueue_many(
+        self, items: List[AttendanceInternalMarkRequest]
+    ) -> List[MarkingJob]:
+        jobs = await asyncio.to_thread(
+            self._store.enqueue_many, items, max_attempts=settings.max_retries + 1
+        )
+        self._wakeup.set()
+        return jobs
+
+    async def get(self, job_id: str) -> Optional[MarkingJob]:
+        return await asyncio.to_thread(self._store.get, job_id)
+
+    async def watch(self, job_id: str) -> AsyncIterator[MarkingJob]:
+        """Yield the job each time it changes, ending once it is finished.
+
+        Changes made by this process wake the watcher right away; the store is
+        also re-read every poll interval so jobs run elsewhere still progress.
+        """
+        changed = asyncio.Event()
+        self._watchers.setdefault(job_id, set()).add(changed)
+        try:
+            last_seen = None
+            while True:
+                changed.clear()
+                job = await self.get(job_id)
+                if job is None:
+                    return
+                snapshot = (job.status, job.step, job.attempts)
+                if snapshot != last_seen:
+                    last_seen = snapshot
+                    yield job
+                if job.status in (SUCCEEDED, FAILED):
+                    return
+                await _wait(changed, settings.marking_queue_poll_interval)
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers is not None:
+                watchers.discard(changed)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    async def start(self, runner: MarkingRunner, *, workers: int) -> None:
+        self._runner = runner
+        await self._recover()
+        await asyncio.to_thread(
+            self._store.purge,
+            older_than=time.time() - settings.marking_queue_retention_hours * 3600,
+        )
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"marking-worker-{index}")
+            for index in range(workers)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "jobs": self._store.counts(),
+            "deferred": self.deferred,
+        }
+
+    async def _recover(self) -> None:
+        self._recovered_at = time.monotonic()
+        recovered = await asyncio.to_thread(self._store.recover)
+        if recovered:
+            logger.info("Requeued %s interrupted marking jobs", recovered)
+
+    async def _work(self) -> None:
+        while True:
+            job = await asyncio.to_thread(
+                self._store.claim_next, lease=settings.marking_queue_lease_seconds
+            )
+            if job is None:
+                await self._wait_for_work()
+                continue
+            await self._run(job)
+
+    async def _wait_for_work(self) -> None:
+        lease = settings.marking_queue_lease_seconds
+        if time.monotonic() - self._recovered_at >= lease:
+            await self._recover()
+        timeout = settings.marking_queue_poll_interval
+        due_at = await asyncio.to_thread(self._store.next_due_at)
+        if due_at is not None:
+            timeout = min(timeout, max(due_at - time.time(), 0.0))
+        self._wakeup.clear()
+        await _wait(self._wakeup, timeout)
+
+    def _changed(self, job_id: str) -> None:
+        for changed in self._watchers.get(job_id, ()):
+            changed.set()
+
+    async def _renew_lease(self, job_id: str) -> None:
+        lease = settings.marking_queue_lease_seconds
+        while True:
+            await asyncio.sleep(lease / 3)
+            if not await asyncio.to_thread(self._store.renew, job_id, lease=lease):
+                logger.warning("Lost the lease on marking job %s", job_id)
+                return
+
+    async def _run(self, job: MarkingJob) -> None:
+        async def on_step(step: str) -> None:
+            await asyncio.to_thread(self._store.set_step, job.id, step)
+            self._changed(job.id)
+
+        self._changed(job.id)
+        renewal = asyncio.create_task(self._renew_lease(job.id))
+        try:
+            response = await self._runner(
+                user_id=job.user_id,
+                event_type=job.event_type,
+                on_step=on_step,
+                idempotency_key=job.idempotency_key,
+                deadline_seconds=job.deadline_seconds,
+            )
+        except ProviderUnavailableError as exc:
+            logger.info(
+                "Deferring marking job %s for %.1fs: %s", job.id, exc.retry_after, exc
+            )
+            await asyncio.to_thread(self._store.defer, job.id, delay=exc.retry_after)
+            self.deferred += 1
+            self._wakeup.set()
+        except (MarkingError, PersistenceError) as exc:
+            if job.attempts < job.max_attempts:
+                delay = self.backoff_delay(job.attempts)
+                logger.warning(
+                    "Marking job %s attempt %s failed, retrying in %.1fs: %s",
+                    job.id,
+                    job.attempts,
+                    delay,
+                    exc,
+                )
+                await asyncio.to_thread(
+                    self._store.retry, job.id, error=str(exc), delay=delay
+                )
+                self._wakeup.set()
+                return
+            logger.error("Marking job %s exhausted its retries: %s", job.id, exc)
+            await asyncio.to_thread(self._store.fail, job.id, str(exc))
+        except AttendanceError as exc:
+            logger.warning("Marking job %s failed: %s", job.id, exc)
+            await asyncio.to_thread(self._store.fail, job.id, str(exc))
+        except Exception:  # pragma: no cover - defensive
+            logger.exception("Unexpected error running marking job %s", job.id)
+            await asyncio.to_thread(
+                self._store.fail, job.id, "Unexpected attendance marking error"
+            )
+        else:
+            await asyncio.to_thread(
+                self._store.complete,
+                job.id,
+                response.model_dump(mode="json", by_alias=True),
+            )
+        finally:
+            renewal.cancel()
+            self._changed(job.id)
+
+    @staticmethod
+    def backoff_delay(attempt: int) -> float:
+        """Exponential delay for the retry after `attempt`, with 50-100% jitter."""
+        ceiling = min(
+            settings.marking_retry_max_delay,
+            settings.marking_retry_base_delay * 2 ** (attempt - 1),
+        )
+        return random.uniform(ceiling / 2, ceiling)
+
+
+async def _wait(event: asyncio.Event, timeout: float) -> None:
+    """Wait for `event` for at most `timeout` seconds.
+
+    Unlike `asyncio.wait_for` on Python 3.11, `asyncio.timeout` never swallows
+    a cancellation that lands just as the wait ends, so `stop()` cannot leave
+    a worker looping.
+    """
+    try:
+        async with asyncio.timeout(timeout):
+            await event.wait()
+    except TimeoutError:
+        pass
+
+
+_marking_queue: MarkingQueue | None = None
+
+
+def get_marking_queue() -> MarkingQueue:
+    global _marking_queue
+    if _marking_queue is None:
+        _marking_queue = MarkingQueue(MarkingJobStore(settings.marking_queue_path))
+    return _marking_queue
+
+
+def marking_queue_metrics() -> Dict[str, Any]:
+    if _marking_queue is None:
+        return {"workers": 0, "jobs": {}}
+    return _marking_queue.metrics()
+
+
+metrics.register_collector("marking_queue", marking_queue_metrics)
@@ -1,29 +1,107 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
 import logging
-from typing import Dict, Tuple
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+)
 from urllib.parse import urljoin
-import requests
-from bs4 import BeautifulSoup
-from app.exceptions import MarkingError
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.exceptions import (
+    MarkingError,
+    ProviderSessionExpiredError,
+    ProviderUnavailableError,
+)
+from app.services.form_extractor import FormData, FormExtractor
+from app.services.provider_guard import ProviderGuard, get_provider_guard
+from app.services.step_timing import StepSpan, sending
+
+if TYPE_CHECKING:
+    from app.services.provider_pool import ProviderPool
+
+httpx = lazy_import("httpx")
 
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://movil.asisscad.cl"
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) "
         "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 "
         "Mobile/15E148 Safari/604.1"
     ),
-    "Origin": BASE_URL,
 }
+REQUEST_TIMEOUT = 30
+
+# Present only on the provider's login form; seeing it after login means the
+# ASP.NET session behind a cached cookie jar is gone.
+LOGIN_FIELD = "txt_pass"
+
+StepCallback = Callable[[str], Awaitable[None]]
+
+
+class Deadline:
+    """Time budget shared by every step of one mark."""
+
+    def __init__(
+        self, budget: float, *, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self.expires_at = clock() + budget
+
+    def remaining(self) -> float:
+        return max(self.expires_at - self._clock(), 0.0)
+
+    async def excluding(self, waiting: Awaitable[None]) -> None:
+        """Await `waiting` without spending the budget on it."""
+        started = self._clock()
+        try:
+            await waiting
+        finally:
+            self.expires_at += self._clock() - started
+
+
+@dataclass
+class ProviderSession:
+    """Cookies and geo form of a provider session that is already logged in."""
+
+    cookies: httpx.Cookies = field(repr=False)
+    geo_form: FormData = field(repr=False)
+    created_at: float = field(default_factory=time.monotonic)
 
 
 class MarkingService:
-    """Handles the attendance marking flow against the external provider."""
+    """Handles the attendance marking flow against the external provider.
+
+    The flow is asyncio-native so a slow provider response only suspends the
+    mark that is waiting on it; `mark_attendance_sync` wraps it for scripts.
+    Connections come from the process-wide `ProviderPool`, while each mark
+    gets its own client and therefore its own cookie jar. Every request goes
+    through the process-wide `ProviderGuard`, so a struggling provider sees
+    bounded load and an unreachable one fails marks straight away.
+    """
 
-    def mark_attendance(
+    def __init__(
+        self,
+        pool: Optional[ProviderPool] = None,
+        guard: Optional[ProviderGuard] = None,
+    ) -> None:
+        self._pool = pool
+        self._guard = guard
+
+    async def mark_attendance(
         self,
         *,
         company_id: int,
@@ -32,49 +110,164 @@ class MarkingService:
         latitude: float,
         longitude: float,
         event_type: str,
+        on_step: Optional[StepCallback] = None,
+        deadline: Optional[Deadline] = None,
     ) -> None:
-        event_target = self._map_event_target(event_type)
-        session = requests.Session()
-        session.headers.update(HEADERS)
+        """Run the provider postbacks; `on_step` hears login, geo and submit.
 
-        login_response = session.get(BASE_URL, timeout=30)
-        self._ensure_ok(login_response, "login page")
-
-        login_data, login_action, login_method = self._extract_form_data(
-            login_response.text
+        All four requests share `deadline` (by default `marking_deadline`
+        seconds from now); each one only gets what the previous left over.
+        """
+        self._map_event_target(event_type)
+        deadline = deadline or Deadline(settings.marking_deadline)
+        session = await self.login(
+            company_id=company_id,
+            user_id_number=user_id_number,
+            password=password,
+            on_step=on_step,
+            deadline=deadline,
         )
-        login_data["txt_id_empresa"] = company_id
-        login_data["txt_id_usuario"] = user_id_number
-        login_data["txt_pass"] = password
-        login_data["__EVENTTARGET"] = "lnk_ingreso"
-
-        login_url = urljoin(BASE_URL, login_action)
-        logged_in = session.request(
-            login_method, login_url, data=login_data, timeout=30
+        await self.submit(
+            session,
+            latitude=latitude,
+            longitude=longitude,
+            event_type=event_type,
+            on_step=on_step,
+            deadline=deadline,
         )
-        self._ensure_ok(logged_in, "login submit")
 
-        geo_data, geo_action, geo_method = self._extract_form_data(logged_in.text)
-        geo_data["txt_lat"] = latitude
-        geo_data["txt_lon"] = longitude
-        geo_data["hf_lat"] = latitude
-        geo_data["hf_lon"] = longitude
-        geo_data["__EVENTTARGET"] = "lnk_proceso"
+    async def login(
+        self,
+        *,
+        company_id: int,
+        user_id_number: int,
+        password: str,
+        on_step: Optional[StepCallback] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> ProviderSession:
+        """Run the event-independent login steps and keep the session."""
+        deadline = deadline or Deadline(settings.marking_deadline)
+        base_url = settings.marking_provider_url
+        async with self._client() as client:
+            await self._notify(on_step, "login")
+            login_data, login_action, login_method = await self._submit_form(
+                client, "login page", "GET", base_url, deadline=deadline
+            )
+            login_data["txt_id_empresa"] = company_id
+            login_data["txt_id_usuario"] = user_id_number
+            login_data["txt_pass"] = password
+            login_data["__EVENTTARGET"] = "lnk_ingreso"
 
-        geo_url = urljoin(BASE_URL, geo_action)
-        geo_response = session.request(geo_method, geo_url, data=geo_data, timeout=30)
-        self._ensure_ok(geo_response, "geo submit")
+            login_url = urljoin(base_url, login_action)
+            geo_form = await self._submit_form(
+                client,
+                "login submit",
+                login_method,
+                login_url,
+                login_data,
+                deadline=deadline,
+            )
+            return ProviderSession(
+                cookies=httpx.Cookies(client.cookies), geo_form=geo_form
+            )
 
-        assist_data, assist_action, assist_method = self._extract_form_data(
-            geo_response.text
-        )
-        assist_data["__EVENTTARGET"] = event_target
+    async def submit(
+        self,
+        session: ProviderSession,
+        *,
+        latitude: float,
+        longitude: float,
+        event_type: str,
+        on_step: Optional[StepCallback] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> None:
+        """Run the geo and attendance postbacks on a logged-in session.
 
-        assist_url = urljoin(BASE_URL, assist_action)
-        final_response = session.request(
-            assist_method, assist_url, data=assist_data, timeout=30
+        Raises `ProviderSessionExpiredError` when the provider answers the geo
+        postback with its login form again.
+        """
+        event_target = self._map_event_target(event_type)
+        deadline = deadline or Deadline(settings.marking_deadline)
+        base_url = settings.marking_provider_url
+        geo_data, geo_action, geo_method = session.geo_form
+        geo_data = dict(geo_data)
+        async with self._client(cookies=session.cookies) as client:
+            geo_data["txt_lat"] = latitude
+            geo_data["txt_lon"] = longitude
+            geo_data["hf_lat"] = latitude
+            geo_data["hf_lon"] = longitude
+            geo_data["__EVENTTARGET"] = "lnk_proceso"
+
+            await self._notify(on_step, "geo")
+            geo_url = urljoin(base_url, geo_action)
+            assist_data, assist_action, assist_method = await self._submit_form(
+                client, "geo submit", geo_method, geo_url, geo_data, deadline=deadline
+            )
+            if LOGIN_FIELD in assist_data:
+                raise ProviderSessionExpiredError(
+                    "Provider session has expired", step="geo submit"
+                )
+            assist_data["__EVENTTARGET"] = event_target
+
+            await self._notify(on_step, "submit")
+            assist_url = urljoin(base_url, assist_action)
+            await self._submit_final(
+                client,
+                "attendance submit",
+                assist_method,
+                assist_url,
+                assist_data,
+                deadline=deadline,
+            )
+
+    def mark_attendance_sync(
+        self,
+        *,
+        company_id: int,
+        user_id_number: int,
+        password: str,
+        latitude: float,
+        longitude: float,
+        event_type: str,
+    ) -> None:
+        """Blocking facade over `mark_attendance` for scripts and the REPL."""
+
+        async def _run() -> None:
+            # Pooled connections and guard primitives are bound to the loop
+            # that created them, so each blocking call gets private ones.
+            from app.services.provider_pool import ProviderPool
+
+            pool = ProviderPool()
+            try:
+                await MarkingService(pool=pool, guard=ProviderGuard()).mark_attendance(
+                    company_id=company_id,
+                    user_id_number=user_id_number,
+                    password=password,
+                    latitude=latitude,
+                    longitude=longitude,
+                    event_type=event_type,
+                )
+            finally:
+                await pool.aclose()
+
+        asyncio.run(_run())
+
+    def _client(self, **kwargs: Any) -> httpx.AsyncClient:
+        # Imported here so httpx is only loaded once the first mark runs.
+        from app.services.provider_pool import get_provider_pool
+
+        pool = self._pool or get_provider_pool()
+        return pool.client(
+            headers={**HEADERS, "Origin": settings.marking_provider_url},
+            follow_redirects=True,
+            timeout=REQUEST_TIMEOUT,
+            **kwargs,
         )
-        self._ensure_ok(final_response, "attendance submit")
+
+    @staticmethod
+    async def _notify(on_step: Optional[StepCallback], step: str) -> None:
+        if on_step is not None:
+            await on_step(step)
 
     @staticmethod
     def _map_event_target(event_type: str) -> str:
@@ -84,25 +277,202 @@ class MarkingService:
             return "lnk_salida"
         raise MarkingError("Unsupported attendance event type")
 
+    async def _submit_form(
+        self,
+        client: httpx.AsyncClient,
+        step: str,
+        method: str,
+        url: str,
+        data: Optional[Dict[str, Any]] = None,
+        *,
+        deadline: Deadline,
+    ) -> FormData:
+        """Send a step and parse the next form while the body streams in.
+
+        Decoding stops at the first `</form>`; whatever is left of the page is
+        drained undecoded (or the connection dropped when too much is left).
+        """
+        async with self._stream(client, step, method, url, data, deadline) as (
+            response,
+            span,
+        ):
+            guard = self._guard or get_provider_guard()
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(
+                errors="replace"
+            )
+            extractor = FormExtractor()
+            chunks = response.aiter_bytes()
+            body_started = time.perf_counter()
+            try:
+                async with (
+                    self._within(deadline, step) as scope,
+                    self._hang(scope, guard),
+                ):
+                    async for chunk in chunks:
+                        span.size += len(chunk)
+                        parse_started = time.perf_counter()
+                        found = extractor.feed(decoder.decode(chunk))
+                        span.add_parse(time.perf_counter() - parse_started)
+                        if found:
+                            break
+                    else:
+                        extractor.feed(decoder.decode(b"", final=True))
+                    form = extractor.result()
+                    span.size += await self._drain(
+                        chunks, settings.marking_drain_limit_bytes
+                    )
+                span.body = time.perf_counter() - body_started
+            except httpx.HTTPError as exc:
+                guard.breaker.record_failure()
+                raise self._step_error(step, exc) from exc
+            except MarkingError as exc:
+                exc.step = exc.step or step
+                raise
+        return form
+
+    async def _submit_final(
+        self,
+        client: httpx.AsyncClient,
+        step: str,
+        method: str,
+        url: str,
+        data: Optional[Dict[str, Any]] = None,
+        *,
+        deadline: Deadline,
+    ) -> None:
+        """Send the last step; its body is only drained, never decoded."""
+        async with self._stream(client, step, method, url, data, deadline) as (
+            response,
+            span,
+        ):
+            window = min(settings.marking_confirmation_window, deadline.remaining())
+            body_started = time.perf_counter()
+            try:
+                async with asyncio.timeout(window):
+                    span.size += await self._drain(
+                        response.aiter_bytes(), settings.marking_drain_limit_bytes
+                    )
+                span.body = time.perf_counter() - body_started
+            except (TimeoutError, httpx.HTTPError):
+                # The status line already confirmed the mark; a slow or broken
+                # trailing body only costs us the connection.
+                logger.debug("Discarded the rest of the %s response", step)
+
+    @asynccontextmanager
+    async def _stream(
+        self,
+        client: httpx.AsyncClient,
+        step: str,
+        method: str,
+        url: str,
+        data: Optional[Dict[str, Any]],
+        deadline: Deadline,
+    ) -> AsyncIterator[Tuple[httpx.Response, StepSpan]]:
+        """Send a step and yield its streaming response with its timing span.
+
+        The span is exported when the block exits, labelled `ok`, `error` or
+        `rejected` (never sent because the provider circuit is open).
+        """
+        guard = self._guard or get_provider_guard()
+        span = StepSpan(step=step)
+        request = client.build_request(method, url, data=data)
+        request.extensions["trace"] = span.trace
+        outcome = "error"
+        # Queueing for a rate-limit token is not provider time: take it
+        # before the step's deadline window and give the wait back.
+        await deadline.excluding(guard.throttle())
+        try:
+            async with AsyncExitStack() as stack:
+                # The deadline covers waiting for a provider slot and the
+                # response headers; the caller bounds the body read separately.
+                async with self._within(deadline, step) as scope:
+                    try:
+                        await stack.enter_async_context(guard.request())
+                    except ProviderUnavailableError as exc:
+                        outcome = "rejected"
+                        exc.step = step
+                        raise
+                    try:
+                        async with self._hang(scope, guard):
+                            with sending(span):
+                                response = await client.send(request, stream=True)
+                    except httpx.HTTPError as exc:
+                        guard.breaker.record_failure()
+                        raise self._step_error(step, exc) from exc
+                span.status_code = response.status_code
+                if response.status_code >= 500:
+                    guard.breaker.record_failure()
+                else:
+                    guard.breaker.record_success()
+                try:
+                    self._ensure_ok(response, step)
+                    yield response, span
+                finally:
+                    await response.aclose()
+            outcome = "ok"
+        finally:
+            span.finish(outcome)
+
+    @asynccontextmanager
+    async def _within(
+        self, deadline: Deadline, step: str
+    ) -> AsyncIterator[asyncio.Timeout]:
+        """Bound a block by what is left of `deadline`, naming `step` on expiry."""
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise self._deadline_error(step)
+        try:
+            async with asyncio.timeout(remaining) as scope:
+                yield scope
+        except TimeoutError as exc:
+            raise self._deadline_error(step) from exc
+
     @staticmethod
-    def _extract_form_data(html: str) -> Tuple[Dict[str, str], str, str]:
-        soup = BeautifulSoup(html, "html.parser")
-        form = soup.find("form")
-        if not form:
-            raise MarkingError("No form found in response")
-
-        form_data: Dict[str, str] = {}
-        for input_tag in form.find_all("input"):
-            name = input_tag.get("name")
-            value = input_tag.get("value", "")
-            if name:
-                form_data[name] = value
-        action = form.get("action", "")
-        method = form.get("method", "GET").upper()
-        return form_data, action, method
+    @asynccontextmanager
+    async def _hang(
+        scope: asyncio.Timeout, guard: ProviderGuard
+    ) -> AsyncIterator[None]:
+        """Count a provider call the deadline cut short as a breaker failure."""
+        try:
+            yield
+        except asyncio.CancelledError:
+            if scope.expired():
+                guard.breaker.record_failure()
+            raise
+
+    @staticmethod
+    async def _drain(chunks: AsyncIterator[bytes], limit: int) -> int:
+        """Read and drop the rest of a body so its connection can be reused.
+
+        Bodies longer than `limit` are abandoned instead; closing the response
+        then closes the connection rather than downloading the remainder.
+        Returns how many bytes were read.
+        """
+        drained = 0
+        async for chunk in chunks:
+            drained += len(chunk)
+            if drained > limit:
+                break
+        return drained
+
+    @staticmethod
+    def _step_error(step: str, exc: Exception) -> MarkingError:
+        logger.warning("Marking failed at %s: %s", step, exc)
+        return MarkingError(
+            f"Failed to complete attendance marking at {step}", step=step
+        )
+
+    @staticmethod
+    def _deadline_error(step: str) -> MarkingError:
+        logger.warning("Marking deadline exceeded at %s", step)
+        return MarkingError(
+            f"Attendance marking deadline exceeded at {step}", step=step
+        )
 
     @staticmethod
-    def _ensure_ok(response: requests.Response, step: str) -> None:
+    def _ensure_ok(response: httpx.Response, step: str) -> None:
         if response.status_code >= 400:
             logger.warning("Marking failed at %s: %s", step, response.status_code)
-            raise MarkingError(f"Failed to complete attendance marking at {step}")
+            raise MarkingError(
+                f"Failed to complete attendance marking at {step}", step=step
+            )
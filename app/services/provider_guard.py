@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from app.core import metrics
+from app.core.config import settings
+from app.exceptions import ProviderUnavailableError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class TokenBucket:
+    """Token-bucket rate limiter; `rate <= 0` disables it."""
+
+    def __init__(
+        self,
+        *,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._clock = clock
+        self._tokens = float(self._burst)
+        self._updated_at = clock()
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+        self.throttled = 0
+
+    async def acquire(self) -> None:
+        if self._rate <= 0:
+            return
+        self.waiting += 1
+        try:
+            # The lock keeps waiters in arrival order while one of them sleeps
+            # for the next token.
+            async with self._lock:
+                delay = self._take()
+                if delay > 0:
+                    self.throttled += 1
+                    await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+
+    def _take(self) -> float:
+        """Take a token, returning how long to wait until it is earned."""
+        now = self._clock()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self._rate
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "rate": self._rate,
+            "burst": self._burst,
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+        }
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive provider failures.
+
+    While open every call is rejected; after `reset_timeout` seconds a single
+    probe is let through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.retry_after() <= 0:
+            return HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        if self._state != OPEN:
+            return 0.0
+        return max(self._opened_at + self._reset_timeout - self._clock(), 0.0)
+
+    def before_call(self) -> bool:
+        """Admit or reject a call; returns True when it is the half-open probe."""
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and not self._probing:
+            self._state = HALF_OPEN
+            self._probing = True
+            return True
+        self.rejected += 1
+        raise ProviderUnavailableError(
+            "Attendance provider is unavailable",
+            retry_after=self.retry_after() or self._reset_timeout,
+        )
+
+    def release_probe(self) -> None:
+        """Let another call probe when the current one ended without an outcome."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == OPEN:
+            # Late failures from requests sent before the breaker opened.
+            return
+        if self._state == HALF_OPEN or self._failures >= self._failure_threshold:
+            logger.warning("Opening provider circuit after %s failures", self._failures)
+            self.opened += 1
+            self._state = OPEN
+            self._opened_at = self._clock()
+            self._probing = False
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_after": round(self.retry_after(), 3),
+        }
+
+
+class ProviderGuard:
+    """Concurrency limit, rate limit and circuit breaker for one provider host.
+
+    Every provider request first takes a rate-limit token from `throttle()`,
+    then runs inside `request()`: it is rejected straight away while the
+    breaker is open, otherwise it waits for a concurrency slot and is sent.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self._limit = concurrency or settings.marking_provider_concurrency
+        self._semaphore = asyncio.Semaphore(self._limit)
+        self._bucket = TokenBucket(
+            rate=settings.marking_rate_limit if rate is None else rate,
+            burst=burst or settings.marking_rate_burst,
+        )
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.marking_breaker_failure_threshold,
+            reset_timeout=settings.marking_breaker_reset_timeout,
+        )
+        self._in_flight = 0
+        self._waiting = 0
+        self.saturated = 0
+
+    async def throttle(self) -> None:
+        """Wait for a rate-limit token; a no-op while the limiter is disabled."""
+        await self._bucket.acquire()
+
+    @asynccontextmanager
+    async def request(self) -> AsyncIterator[None]:
+        """Hold a provider slot; the caller reports the outcome to `breaker`."""
+        probe = self.breaker.before_call()
+        try:
+            if self._semaphore.locked():
+                self.saturated += 1
+            self._waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+                self._semaphore.release()
+        finally:
+            if probe and self.breaker.state == HALF_OPEN:
+                self.breaker.release_probe()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.metrics(),
+            "limiter": {
+                "limit": self._limit,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "saturated": self.saturated,
+            },
+            "rate_limit": self._bucket.metrics(),
+        }
+
+
+_provider_guard: ProviderGuard | None = None
+
+
+def get_provider_guard() -> ProviderGuard:
+    global _provider_guard
+    if _provider_guard is None:
+        _provider_guard = ProviderGuard()
+    return _provider_guard
+
+
+def provider_guard_metrics() -> Dict[str, Any]:
+    if _provider_guard is None:
+        return {}
+    return _provider_guard.metrics()
+
+
+metrics.register_collector("marking_provider", provider_guard_metrics)
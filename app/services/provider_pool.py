@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+from app.services import step_timing
+
+
+@dataclass
+class PoolStats:
+    """Counters describing how the provider connection pool is being used."""
+
+    requests: int = 0
+    new_connections: int = 0
+    idle_evictions: int = 0
+    closed_connections: int = 0
+    dns_lookups: int = 0
+    dns_cache_hits: int = 0
+
+    @property
+    def hits(self) -> int:
+        """Requests served on an already-open keep-alive connection."""
+        return max(self.requests - self.new_connections, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        data = asdict(self)
+        data["hits"] = self.hits
+        return data
+
+
+class _TrackedStream(httpcore.AsyncNetworkStream):
+    """Network stream that reports its close reason back to `PoolStats`."""
+
+    def __init__(
+        self,
+        stream: httpcore.AsyncNetworkStream,
+        stats: PoolStats,
+        keepalive_expiry: float,
+    ) -> None:
+        self._stream = stream
+        self._stats = stats
+        self._keepalive_expiry = keepalive_expiry
+        self._last_used = time.monotonic()
+
+    async def read(self, max_bytes: int, timeout: Optional[float] = None) -> bytes:
+        data = await self._stream.read(max_bytes, timeout=timeout)
+        self._last_used = time.monotonic()
+        return data
+
+    async def write(self, buffer: bytes, timeout: Optional[float] = None) -> None:
+        await self._stream.write(buffer, timeout=timeout)
+        self._last_used = time.monotonic()
+
+    async def aclose(self) -> None:
+        self._stats.closed_connections += 1
+        if time.monotonic() - self._last_used >= self._keepalive_expiry:
+            self._stats.idle_evictions += 1
+        await self._stream.aclose()
+
+    async def start_tls(
+        self,
+        ssl_context: Any,
+        server_hostname: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        stream = await self._stream.start_tls(
+            ssl_context, server_hostname=server_hostname, timeout=timeout
+        )
+        self._stream = stream
+        return self
+
+    def get_extra_info(self, info: str) -> Any:
+        return self._stream.get_extra_info(info)
+
+
+class _CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that caches DNS answers and counts new connections.
+
+    TLS still verifies against the original host name because httpcore passes
+    the origin host to `start_tls` independently of the address we dial.
+    """
+
+    def __init__(
+        self, stats: PoolStats, *, dns_ttl: float, keepalive_expiry: float
+    ) -> None:
+        self._backend = httpcore.AnyIOBackend()
+        self._stats = stats
+        self._dns_ttl = dns_ttl
+        self._keepalive_expiry = keepalive_expiry
+        self._dns_cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        addresses = await self._resolve(host, port)
+        last_error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                stream = await self._backend.connect_tcp(
+                    address,
+                    port,
+                    timeout=timeout,
+                    local_address=local_address,
+                    socket_options=socket_options,
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                last_error = exc
+                continue
+            self._stats.new_connections += 1
+            return _TrackedStream(stream, self._stats, self._keepalive_expiry)
+
+        self._dns_cache.pop((host, port), None)
+        raise last_error or httpcore.ConnectError(f"Unable to connect to {host}")
+
+    async def connect_unix_socket(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:  # pragma: no cover - unused
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        if self._dns_ttl <= 0:
+            return [host]
+
+        now = time.monotonic()
+        cached = self._dns_cache.get((host, port))
+        if cached and cached[0] > now:
+            self._stats.dns_cache_hits += 1
+            return cached[1]
+
+        self._stats.dns_lookups += 1
+        started = time.perf_counter()
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, type=socket.SOCK_STREAM
+            )
+        except OSError as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        finally:
+            step_timing.record_dns(time.perf_counter() - started)
+
+        addresses = list(dict.fromkeys(info[4][0] for info in infos)) or [host]
+        self._dns_cache[(host, port)] = (now + self._dns_ttl, addresses)
+        return addresses
+
+
+class _PooledTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: PoolStats) -> None:
+        # httpx does not expose the httpcore network backend, so instead of
+        # calling the base constructor (which would build a second pool) the
+        # one pool it works through is built here with the DNS-caching,
+        # connection-counting backend.
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=settings.marking_pool_size,
+            max_keepalive_connections=settings.marking_pool_keepalive,
+            keepalive_expiry=settings.marking_keepalive_expiry,
+            network_backend=_CachingNetworkBackend(
+                stats,
+                dns_ttl=settings.marking_dns_cache_ttl,
+                keepalive_expiry=settings.marking_keepalive_expiry,
+            ),
+        )
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.requests += 1
+        return await super().handle_async_request(request)
+
+
+class _BorrowedTransport(httpx.AsyncBaseTransport):
+    """Lets a short-lived client use the shared pool without closing it."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        return None
+
+
+class ProviderPool:
+    """Keep-alive connection pool shared by every mark against the provider.
+
+    Each call to `client()` returns a fresh `httpx.AsyncClient` with its own
+    cookie jar, so employees never share an ASP.NET session even though their
+    requests ride the same TCP/TLS connections.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self.stats = PoolStats()
+        self._transport = transport or _PooledTransport(self.stats)
+
+    def client(self, **kwargs: Any) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=_BorrowedTransport(self._transport), **kwargs
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+_provider_pool: ProviderPool | None = None
+
+
+def get_provider_pool() -> ProviderPool:
+    global _provider_pool
+    if _provider_pool is None:
+        _provider_pool = ProviderPool()
+    return _provider_pool
+
+
+async def close_provider_pool() -> None:
+    global _provider_pool
+    if _provider_pool is not None:
+        await _provider_pool.aclose()
+        _provider_pool = None
+
+
+def provider_pool_metrics() -> Dict[str, Any]:
+    if _provider_pool is None:
+        return PoolStats().as_dict()
+    return _provider_pool.stats.as_dict()
+
+
+metrics.register_collector("marking_pool", provider_pool_metrics)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.supabase_clients import get_supabase_clients
+from app.models import AttendanceRequest
+
+logger = logging.getLogger(__name__)
+
+InvalidationCallback = Callable[[str], None]
+
+INVALIDATE_EVENT = "invalidate"
+
+
+class LocalInvalidationChannel:
+    """In-process stand-in for the cross-worker invalidation channel.
+
+    Every subscriber hears every publish, including the publisher itself, the
+    same way workers sharing a real channel would.
+    """
+
+    def __init__(self) -> None:
+        self._callbacks: List[InvalidationCallback] = []
+
+    def subscribe(self, callback: InvalidationCallback) -> None:
+        self._callbacks.append(callback)
+
+    async def publish(self, user_id: str) -> None:
+        for callback in list(self._callbacks):
+            callback(user_id)
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+
+class SupabaseInvalidationChannel:
+    """Fans invalidations out to other workers over Supabase Realtime broadcast.
+
+    Publishing never fails the write that triggered it: a worker that misses
+    a message serves its copy until the cache TTL runs out.
+    """
+
+    def __init__(self, topic: Optional[str] = None) -> None:
+        self._topic = topic or settings.schedule_cache_channel_topic
+        self._origin = uuid.uuid4().hex
+        self._callbacks: List[InvalidationCallback] = []
+        self._channel: Any = None
+
+    def subscribe(self, callback: InvalidationCallback) -> None:
+        self._callbacks.append(callback)
+
+    async def start(self) -> None:
+        try:
+            channel = get_supabase_clients().service.channel(self._topic)
+            channel.on_broadcast(INVALIDATE_EVENT, self._on_broadcast)
+            await asyncio.wait_for(channel.subscribe(), settings.request_timeout)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.warning("Schedule invalidation channel unavailable: %s", exc)
+            return
+        self._channel = channel
+
+    async def stop(self) -> None:
+        if self._channel is not None:
+            channel, self._channel = self._channel, None
+            await channel.unsubscribe()
+
+    async def publish(self, user_id: str) -> None:
+        for callback in list(self._callbacks):
+            callback(user_id)
+        if self._channel is None:
+            return
+        try:
+            await self._channel.send_broadcast(
+                INVALIDATE_EVENT, {"user_id": user_id, "origin": self._origin}
+            )
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.warning("Unable to broadcast schedule invalidation: %s", exc)
+
+    def _on_broadcast(self, message: Dict[str, Any]) -> None:
+        payload = message.get("payload") or {}
+        user_id = payload.get("user_id")
+        if not user_id or payload.get("origin") == self._origin:
+            return
+        for callback in list(self._callbacks):
+            callback(user_id)
+
+
+class ScheduleCache:
+    """Read-through cache of parsed schedules keyed by user id.
+
+    Writes go through `invalidate`, which drops the entry here and on every
+    worker listening on the channel. A load that started before an
+    invalidation is never stored, so a stale read cannot outlive the write.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache: Optional[TTLCache[str, AttendanceRequest]] = None,
+        channel: Optional[Any] = None,
+    ) -> None:
+        self._cache = (
+            TTLCache(
+                maxsize=settings.schedule_cache_size, ttl=settings.schedule_cache_ttl
+            )
+            if cache is None
+            else cache
+        )
+        self._channel = LocalInvalidationChannel() if channel is None else channel
+        self._channel.subscribe(self._drop)
+        self._generation = 0
+        self.invalidations = 0
+        self.dropped = 0
+
+    async def get(
+        self,
+        user_id: str,
+        load: Callable[[], Awaitable[Optional[AttendanceRequest]]],
+    ) -> Optional[AttendanceRequest]:
+        schedule = self._cache.get(user_id)
+        if schedule is not None:
+            return schedule
+        generation = self._generation
+        schedule = await load()
+        if schedule is not None and generation == self._generation:
+            self._cache.set(user_id, schedule)
+        return schedule
+
+    async def invalidate(self, user_id: str) -> None:
+        self.invalidations += 1
+        await self._channel.publish(user_id)
+
+    async def start(self) -> None:
+        await self._channel.start()
+
+    async def stop(self) -> None:
+        await self._channel.stop()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            "invalidations": self.invalidations,
+            "dropped": self.dropped,
+        }
+
+    def _drop(self, user_id: str) -> None:
+        self._generation += 1
+        if user_id in self._cache:
+            self._cache.delete(user_id)
+            self.dropped += 1
+
+
+_schedule_cache: ScheduleCache | None = None
+
+
+def get_schedule_cache() -> ScheduleCache:
+    global _schedule_cache
+    if _schedule_cache is None:
+        channel = (
+            SupabaseInvalidationChannel()
+            if settings.schedule_cache_invalidation == "supabase"
+            else LocalInvalidationChannel()
+        )
+        _schedule_cache = ScheduleCache(channel=channel)
+    return _schedule_cache
+
+
+def schedule_cache_metrics() -> Dict[str, Any]:
+    return get_schedule_cache().metrics()
+
+
+metrics.register_collector("schedule_cache", schedule_cache_metrics)
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.exceptions import AttendanceError
+from app.models import AttendanceRequest
+from app.services.attendance_credentials_service import AttendanceCredentialsService
+from app.services.attendance_service import (
+    AttendanceService,
+    localize,
+    safe_timezone,
+)
+from app.services.marking_service import MarkingService, ProviderSession
+
+logger = logging.getLogger(__name__)
+
+_session_cache: TTLCache[str, ProviderSession] | None = None
+
+
+def get_provider_session_cache() -> TTLCache[str, ProviderSession]:
+    """Logged-in provider sessions keyed by user id, consumed by the next mark."""
+    global _session_cache
+    if _session_cache is None:
+        _session_cache = TTLCache(
+            maxsize=settings.prewarm_cache_size, ttl=settings.prewarm_session_ttl
+        )
+    return _session_cache
+
+
+def _hash_string(value: str) -> int:
+    # Same 32-bit string hash as the attendance_scheduler edge function, so
+    # both sides agree on each user's random offset.
+    hashed = 0
+    for char in value:
+        hashed = (hashed * 31 + ord(char)) & 0xFFFFFFFF
+    if hashed >= 0x80000000:
+        hashed -= 0x100000000
+    return abs(hashed)
+
+
+def _offset_minutes(user_id: str, date: str, event_type: str, window: int) -> int:
+    if window <= 0:
+        return 0
+    hashed = _hash_string(f"{user_id}:{date}:{event_type}")
+    return hashed % (window * 2 + 1) - window
+
+
+def scheduled_fire_time(
+    *,
+    user_id: str,
+    schedule: AttendanceRequest,
+    event_type: str,
+    now: datetime,
+) -> Optional[datetime]:
+    """When the scheduler will mark `event_type` today, mirroring its rules."""
+    window = getattr(schedule.schedule, event_type)
+    if not window.enabled or window.local_time is None:
+        return None
+
+    zone = safe_timezone(schedule.timezone)
+    local_now = now.astimezone(zone)
+    day_name = local_now.strftime("%A").lower()
+    if window.days and day_name not in {day.value for day in window.days}:
+        return None
+
+    local_date = local_now.date()
+    base_local = datetime.combine(local_date, window.local_time.replace(tzinfo=None))
+    minutes = max(schedule.random_window_minutes, 0)
+    offset = _offset_minutes(user_id, local_date.isoformat(), event_type, minutes)
+    start_of_day = datetime.combine(local_date, datetime.min.time())
+    end_of_day = start_of_day + timedelta(days=1, microseconds=-1)
+    fire_local = min(
+        max(base_local + timedelta(minutes=offset), start_of_day), end_of_day
+    )
+    return localize(zone, fire_local).astimezone(timezone.utc)
+
+
+class SessionPrewarmer:
+    """Logs users in shortly before their scheduled marks.
+
+    Every `prewarm_interval` seconds it looks for users whose entry or exit
+    fires within the next `prewarm_lead_minutes` and stores a logged-in
+    provider session for them, so the fire-time mark only runs the geo and
+    attendance postbacks.
+    """
+
+    def __init__(
+        self,
+        *,
+        attendance_service: Optional[AttendanceService] = None,
+        credentials_service: Optional[AttendanceCredentialsService] = None,
+        marking_service: Optional[MarkingService] = None,
+        session_cache: Optional[TTLCache[str, ProviderSession]] = None,
+    ) -> None:
+        self._attendance_service = attendance_service or AttendanceService()
+        self._credentials_service = (
+            credentials_service or AttendanceCredentialsService()
+        )
+        self._marking_service = marking_service or MarkingService()
+        self._sessions = (
+            get_provider_session_cache() if session_cache is None else session_cache
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.warmed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="session-prewarmer")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Warm every session that is due; returns how many were stored."""
+        now = now or datetime.now(timezone.utc)
+        schedules = await self._attendance_service.get_active_schedules()
+        due = self._due_users(schedules, now)
+        if not due:
+            return 0
+
+        credentials = await self._credentials_service.get_marking_contexts(user_ids=due)
+        semaphore = asyncio.Semaphore(settings.prewarm_concurrency)
+
+        async def warm(user_id: str) -> bool:
+            creds = credentials.get(user_id)
+            if not creds or not creds.get("password"):
+                return False
+            async with semaphore:
+                try:
+                    session = await self._marking_service.login(
+                        company_id=creds["company_id"],
+                        user_id_number=creds["user_id_number"],
+                        password=creds["password"],
+                    )
+                except AttendanceError as exc:
+                    logger.warning(
+                        "Pre-warm login failed for user %s: %s", user_id, exc
+                    )
+                    self.failed += 1
+                    return False
+            self._sessions.set(user_id, session)
+            self.warmed += 1
+            return True
+
+        results = await asyncio.gather(*(warm(user_id) for user_id in due))
+        return sum(results)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"warmed": self.warmed, "failed": self.failed, **self._sessions.stats()}
+
+    def _due_users(
+        self, schedules: Dict[str, AttendanceRequest], now: datetime
+    ) -> List[str]:
+        lead = timedelta(minutes=settings.prewarm_lead_minutes)
+        due: List[str] = []
+        for user_id, schedule in schedules.items():
+            if user_id in self._sessions:
+                continue
+            for event_type in ("entry", "exit"):
+                fire_at = scheduled_fire_time(
+                    user_id=user_id, schedule=schedule, event_type=event_type, now=now
+                )
+                if fire_at is not None and now < fire_at <= now + lead:
+                    due.append(user_id)
+                    break
+        return due
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                warmed = await self.run_once()
+                if warmed:
+                    logger.info("Pre-warmed %s provider sessions", warmed)
+            except AttendanceError as exc:
+                logger.warning("Session pre-warm pass failed: %s", exc)
+            except Exception:  # pragma: no cover - defensive
+                logger.exception("Unexpected session pre-warm error")
+            await asyncio.sleep(settings.prewarm_interval)
+
+
+_prewarmer: SessionPrewarmer | None = None
+
+
+def get_session_prewarmer() -> SessionPrewarmer:
+    global _prewarmer
+    if _prewarmer is None:
+        _prewarmer = SessionPrewarmer()
+    return _prewarmer
+
+
+def prewarm_metrics() -> Dict[str, Any]:
+    if _prewarmer is None:
+        return {"warmed": 0, "failed": 0, **get_provider_session_cache().stats()}
+    return _prewarmer.metrics()
+
+
+metrics.register_collector("provider_sessions", prewarm_metrics)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core import metrics
+
+PHASES = ("total", "dns", "connect", "tls", "ttfb", "body", "parse")
+SIZE_BUCKETS = (1_024, 8_192, 32_768, 65_536, 131_072, 262_144, 524_288, 1_048_576)
+
+_histograms: Dict[str, metrics.Histogram] = {
+    phase: metrics.Histogram() for phase in PHASES
+}
+_sizes = metrics.Histogram(SIZE_BUCKETS)
+
+# Span of the request being sent, so the pool's DNS cache can report lookups.
+_active_span: ContextVar[Optional["StepSpan"]] = ContextVar(
+    "active_step_span", default=None
+)
+_captured: ContextVar[Optional[List["StepSpan"]]] = ContextVar(
+    "captured_step_spans", default=None
+)
+
+
+@dataclass
+class StepSpan:
+    """Timings of one provider request, in seconds.
+
+    Connection phases come from the httpx `trace` extension and stay `None`
+    when the request rode an open keep-alive connection (or a mock transport).
+    """
+
+    step: str
+    outcome: str = "ok"
+    status_code: Optional[int] = None
+    total: float = 0.0
+    dns: Optional[float] = None
+    connect: Optional[float] = None
+    tls: Optional[float] = None
+    ttfb: Optional[float] = None
+    body: Optional[float] = None
+    parse: Optional[float] = None
+    size: int = 0
+    _started_at: float = field(default_factory=time.perf_counter, repr=False)
+    _events: Dict[str, float] = field(default_factory=dict, repr=False)
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpx/httpcore trace hook, e.g. `http11.send_request_headers.started`."""
+        now = time.perf_counter()
+        name, _, stage = event_name.rpartition(".")
+        if stage == "started":
+            self._events[name] = now
+            return
+        if stage != "complete" or name not in self._events:
+            return
+        if name == "connection.connect_tcp":
+            # Our network backend resolves inside connect_tcp; keep DNS apart.
+            self.connect = now - self._events[name] - (self.dns or 0.0)
+        elif name == "connection.start_tls":
+            self.tls = now - self._events[name]
+        elif name.endswith(".receive_response_headers"):
+            sent = self._events.get(name.replace("receive_response", "send_request"))
+            if sent is not None:
+                self.ttfb = now - sent
+
+    def add_dns(self, seconds: float) -> None:
+        self.dns = (self.dns or 0.0) + seconds
+
+    def add_parse(self, seconds: float) -> None:
+        self.parse = (self.parse or 0.0) + seconds
+
+    def finish(self, outcome: str) -> None:
+        """Close the span, export it and hand it to any active capture."""
+        self.outcome = outcome
+        self.total = time.perf_counter() - self._started_at
+        for phase in PHASES:
+            value = getattr(self, phase)
+            if value is not None:
+                _histograms[phase].observe(value, step=self.step, outcome=outcome)
+        _sizes.observe(self.size, step=self.step, outcome=outcome)
+        captured = _captured.get()
+        if captured is not None:
+            captured.append(self)
+
+
+@contextmanager
+def sending(span: StepSpan) -> Iterator[None]:
+    """Mark `span` as the request currently being sent by this task."""
+    token: Token = _active_span.set(span)
+    try:
+        yield
+    finally:
+        _active_span.reset(token)
+
+
+def record_dns(seconds: float) -> None:
+    span = _active_span.get()
+    if span is not None:
+        span.add_dns(seconds)
+
+
+@contextmanager
+def capture_spans() -> Iterator[List[StepSpan]]:
+    """Collect the spans finished inside the block, e.g. for a debug response."""
+    spans: List[StepSpan] = []
+    token = _captured.set(spans)
+    try:
+        yield spans
+    finally:
+        _captured.reset(token)
+
+
+def step_timing_metrics() -> Dict[str, Any]:
+    data: Dict[str, Any] = {
+        f"{phase}_seconds": histogram.snapshot()
+        for phase, histogram in _histograms.items()
+    }
+    data["response_bytes"] = _sizes.snapshot()
+    return data
+
+
+metrics.register_collector("marking_steps", step_timing_metrics)
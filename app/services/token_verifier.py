@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.exceptions import AuthenticationError, TokenVerificationUnavailableError
+
+jwt = lazy_import("jwt")
+
+logger = logging.getLogger(__name__)
+
+HMAC_ALGORITHMS = ["HS256", "HS384", "HS512"]
+ASYMMETRIC_ALGORITHMS = ["RS256", "RS384", "RS512", "ES256", "ES384", "PS256"]
+
+
+class LocalTokenVerifier:
+    """Validates Supabase access tokens without calling Supabase Auth.
+
+    HMAC tokens are checked against the project JWT secret; asymmetric ones
+    against the project's JWKS, which PyJWT fetches once and caches. Signature,
+    expiry, audience and role are all enforced.
+    """
+
+    def __init__(
+        self,
+        *,
+        secret: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        audience: Optional[str] = None,
+        roles: Optional[List[str]] = None,
+    ) -> None:
+        self._secret = settings.supabase_jwt_secret if secret is None else secret
+        self._jwks_url = (
+            jwks_url
+            or settings.supabase_jwks_url
+            or (f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json")
+        )
+        self._audience = audience or settings.auth_jwt_audience
+        self._roles = roles or settings.auth_allowed_roles
+        self._jwks_client: Optional[jwt.PyJWKClient] = None
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the user dict for `token`.
+
+        Raises `AuthenticationError` for tokens that are invalid, and
+        `TokenVerificationUnavailableError` when no key is available to check
+        the signature locally.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as exc:
+            raise AuthenticationError("Invalid or expired token") from exc
+
+        algorithm = header.get("alg")
+        if algorithm in HMAC_ALGORITHMS:
+            if not self._secret:
+                raise TokenVerificationUnavailableError("JWT secret is not configured")
+            key: Any = self._secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = self._signing_key(token)
+        else:
+            raise AuthenticationError("Invalid or expired token")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self._audience,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.InvalidTokenError as exc:
+            logger.info("Rejected access token: %s", exc)
+            raise AuthenticationError("Invalid or expired token") from exc
+
+        if claims.get("role") not in self._roles:
+            raise AuthenticationError("Invalid or expired token")
+
+        return {
+            "id": claims["sub"],
+            "email": claims.get("email"),
+            "role": claims.get("role"),
+            "audience": claims.get("aud"),
+        }
+
+    def _signing_key(self, token: str) -> Any:
+        if self._jwks_client is None:
+            self._jwks_client = jwt.PyJWKClient(
+                self._jwks_url,
+                cache_keys=True,
+                lifespan=int(settings.auth_jwks_cache_ttl),
+                timeout=settings.request_timeout,
+            )
+        try:
+            return self._jwks_client.get_signing_key_from_jwt(token).key
+        except jwt.PyJWKClientConnectionError as exc:
+            logger.warning("Unable to fetch JWKS: %s", exc)
+            raise TokenVerificationUnavailableError("JWKS is unavailable") from exc
+        except jwt.PyJWKClientError as exc:
+            # Unknown key id: possibly rotated after our last JWKS fetch.
+            raise TokenVerificationUnavailableError(str(exc)) from exc
+        except jwt.InvalidTokenError as exc:
+            raise AuthenticationError("Invalid or expired token") from exc
+
+
+_verifier: LocalTokenVerifier | None = None
+
+
+def get_token_verifier() -> LocalTokenVerifier:
+    global _verifier
+    if _verifier is None:
+        _verifier = LocalTokenVerifier()
+    return _verifier
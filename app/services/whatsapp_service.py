@@ -1,11 +1,14 @@
+from __future__ import annotations
+
 import logging
 from typing import Any, Dict, Optional
 
-import httpx
-
 from app.core.config import settings
+from app.core.lazy import lazy_import
 from app.exceptions import NotificationError
 
+httpx = lazy_import("httpx")
+
 logger = logging.getLogger(__name__)
 
 
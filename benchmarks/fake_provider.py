@@ -0,0 +1,180 @@
+"""Local stand-in for movil.asisscad.cl that replays the provider pages.
+
+It serves the login -> geo -> assist -> done postback chain with the page
+replicas from `benchmarks.provider_pages`, issues session cookies like the
+real provider (and answers with the login form when they are missing), and
+can inject latency and errors.
+
+Usage:
+    python -m benchmarks.fake_provider [--port 8081] [--latency 0.2]
+        [--jitter 0.05] [--error-rate 0.01] [--viewstate-scale 1.0]
+
+Point the API at it with `APP_MARKING_PROVIDER_URL=http://127.0.0.1:8081`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Set
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response
+from starlette.routing import Route
+
+from benchmarks.provider_pages import VIEWSTATE_SIZES, render_page
+
+SESSION_COOKIE = "ASP.NET_SessionId"
+AUTH_COOKIE = ".ASPXAUTH"
+
+
+@dataclass
+class FakeProviderConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    viewstate_scale: float = 1.0
+    seed: int | None = None
+
+
+@dataclass
+class _ProviderState:
+    pages: Dict[str, str]
+    sessions: Set[str] = field(default_factory=set)
+    logged_in: Set[str] = field(default_factory=set)
+    requests: int = 0
+    errors: int = 0
+
+
+def create_app(config: FakeProviderConfig | None = None) -> Starlette:
+    """Build the fake provider ASGI app; counters live on `app.state.provider`."""
+    config = config or FakeProviderConfig()
+    rng = random.Random(config.seed)
+    state = _ProviderState(
+        pages={
+            step: render_page(step, viewstate_size=int(size * config.viewstate_scale))
+            for step, size in VIEWSTATE_SIZES.items()
+        }
+    )
+
+    async def respond(step: str) -> Response:
+        state.requests += 1
+        delay = config.latency + rng.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < config.error_rate:
+            state.errors += 1
+            return Response("Server Error", status_code=500)
+        return HTMLResponse(state.pages[step])
+
+    async def login_page(request: Request) -> Response:
+        response = await respond("login")
+        if response.status_code == 200:
+            session_id = secrets.token_hex(12)
+            state.sessions.add(session_id)
+            response.set_cookie(SESSION_COOKIE, session_id, httponly=True)
+        return response
+
+    async def login_submit(request: Request) -> Response:
+        await request.form()
+        if request.cookies.get(SESSION_COOKIE) not in state.sessions:
+            return await respond("login")
+        response = await respond("geo")
+        if response.status_code == 200:
+            token = secrets.token_hex(32)
+            state.logged_in.add(token)
+            response.set_cookie(AUTH_COOKIE, token, httponly=True)
+        return response
+
+    async def geo_submit(request: Request) -> Response:
+        await request.form()
+        if request.cookies.get(AUTH_COOKIE) not in state.logged_in:
+            return await respond("login")
+        return await respond("assist")
+
+    async def attendance_submit(request: Request) -> Response:
+        await request.form()
+        if request.cookies.get(AUTH_COOKIE) not in state.logged_in:
+            return await respond("login")
+        return await respond("done")
+
+    app = Starlette(
+        routes=[
+            Route("/", login_page, methods=["GET"]),
+            Route("/Default.aspx", login_submit, methods=["POST"]),
+            Route("/Geo.aspx", geo_submit, methods=["POST"]),
+            Route("/Marca.aspx", attendance_submit, methods=["POST"]),
+        ]
+    )
+    app.state.provider = state
+    return app
+
+
+class FakeProviderServer:
+    """Runs the fake provider on its own thread and event loop."""
+
+    def __init__(
+        self,
+        config: FakeProviderConfig | None = None,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8081,
+    ) -> None:
+        self.app = create_app(config)
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                self.app,
+                host=host,
+                port=port,
+                log_level="warning",
+                backlog=4096,
+                timeout_keep_alive=60,
+            )
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "FakeProviderServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Fake provider did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--viewstate-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    app = create_app(
+        FakeProviderConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            viewstate_scale=args.viewstate_scale,
+        )
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
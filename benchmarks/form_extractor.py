@@ -0,0 +1,54 @@
+"""Compare the streaming form extractor with the BeautifulSoup path.
+
+Usage:
+    python -m benchmarks.form_extractor [--rounds 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Callable, Dict, Tuple
+
+from bs4 import BeautifulSoup
+
+from app.services.form_extractor import extract_form_data
+from benchmarks.provider_pages import VIEWSTATE_SIZES, render_page
+
+
+def extract_with_beautifulsoup(html: str) -> Tuple[Dict[str, str], str, str]:
+    """The extractor MarkingService used before the streaming one."""
+    soup = BeautifulSoup(html, "html.parser")
+    form = soup.find("form")
+    if not form:
+        raise ValueError("No form found in response")
+
+    form_data: Dict[str, str] = {}
+    for input_tag in form.find_all("input"):
+        name = input_tag.get("name")
+        value = input_tag.get("value", "")
+        if name:
+            form_data[name] = value
+    return form_data, form.get("action", ""), form.get("method", "GET").upper()
+
+
+def _per_call_ms(func: Callable[[str], object], html: str, rounds: int) -> float:
+    return timeit.timeit(lambda: func(html), number=rounds) / rounds * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'page':<8}{'bytes':>9}{'bs4 ms':>10}{'fast ms':>10}{'speedup':>9}")
+    for step in VIEWSTATE_SIZES:
+        html = render_page(step)
+        assert extract_form_data(html) == extract_with_beautifulsoup(html)
+        slow = _per_call_ms(extract_with_beautifulsoup, html, args.rounds)
+        fast = _per_call_ms(extract_form_data, html, args.rounds)
+        print(f"{step:<8}{len(html):>9}{slow:>10.3f}{fast:>10.3f}{slow / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
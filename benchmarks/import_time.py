@@ -0,0 +1,56 @@
+"""Measure how long importing the app takes with `python -X importtime`.
+
+Usage:
+    python -m benchmarks.import_time [--module app.main] [--top 15] [--runs 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Must stay off the import path of `app.main`; see `app.core.lazy`.
+HEAVY_MODULES = ("supabase", "postgrest", "bs4", "pytz", "httpx", "jwt")
+
+
+def measure(module: str = "app.main") -> Dict[str, int]:
+    """Cumulative import time in microseconds of every module `module` loads."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    totals: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        totals[name.strip()] = int(cumulative)
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda totals: totals[args.module])
+    print(f"{args.module}: {best[args.module] / 1000:.1f} ms (best of {args.runs})")
+    for name, micros in sorted(best.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+    loaded = [name for name in HEAVY_MODULES if name in best]
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Load-test the marking endpoints against the local fake provider.
+
+Starts `benchmarks.fake_provider` on a background thread, points the API at
+it and drives `/api/v1/attendance/mark/internal` (one request per mark) or
+`/mark/internal/batch` (one batch) with N concurrent users. Credentials and
+schedules come from in-memory stand-ins so Supabase is not involved; the
+API, marking engine, connection pool and provider guard are the real ones.
+
+Usage:
+    python -m benchmarks.marking_load [--users 50] [--marks 500]
+        [--mode internal|batch] [--latency 0.1] [--jitter 0.05]
+        [--error-rate 0.0] [--rate-limit 0]
+
+Reports throughput plus p50/p95/p99 of the whole mark and of each step
+(login = login page + login submit, geo, submit), from `on_step` timestamps.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+
+from app.api.v1 import attendance
+from app.core.config import settings
+from app.main import app
+from app.models import AttendanceRequest
+from app.services.attendance_marking_service import AttendanceMarkingService
+from app.services.marking_service import MarkingService, StepCallback
+from benchmarks.fake_provider import FakeProviderConfig, FakeProviderServer
+
+INTERNAL_KEY = "benchmark"
+STEPS = ("login", "geo", "submit")
+SCHEDULE = AttendanceRequest.model_validate(
+    {
+        "isActive": True,
+        "schedule": {
+            "entry": {"enabled": False, "days": []},
+            "exit": {"enabled": False, "days": []},
+        },
+        "location": {
+            "address": "Avenida",
+            "latitude": -6.7711,
+            "longitude": -79.8431,
+            "radiusMeters": 20,
+        },
+        "timezone": "America/Lima",
+    }
+)
+
+
+@dataclass
+class MarkTiming:
+    started_at: float
+    steps: Dict[str, float] = field(default_factory=dict)
+    finished_at: float = 0.0
+    error: Optional[str] = None
+
+    def durations(self) -> Dict[str, float]:
+        marks = [(step, self.steps[step]) for step in STEPS if step in self.steps]
+        ends = [at for _, at in marks[1:]] + [self.finished_at]
+        return {step: end - at for (step, at), end in zip(marks, ends)}
+
+
+class TimedMarkingService(MarkingService):
+    """Records when each step of every mark starts and when the mark ends."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.timings: List[MarkTiming] = []
+
+    async def mark_attendance(
+        self, *, on_step: Optional[StepCallback] = None, **kwargs
+    ) -> None:
+        timing = MarkTiming(started_at=time.perf_counter())
+        self.timings.append(timing)
+
+        async def record(step: str) -> None:
+            timing.steps[step] = time.perf_counter()
+            if on_step is not None:
+                await on_step(step)
+
+        try:
+            await super().mark_attendance(on_step=record, **kwargs)
+        except Exception as exc:
+            timing.error = type(exc).__name__
+            raise
+        finally:
+            timing.finished_at = time.perf_counter()
+
+
+class _Credentials:
+    async def get_marking_context(self, *, user_id: str) -> dict:
+        return {
+            "company_id": 7040,
+            "user_id_number": 1234,
+            "password": "secret",
+            "timezone": SCHEDULE.timezone,
+            "location": SCHEDULE.location,
+        }
+
+    async def get_marking_contexts(self, *, user_ids: Sequence[str]) -> Dict[str, dict]:
+        return {
+            user_id: await self.get_marking_context(user_id=user_id)
+            for user_id in user_ids
+        }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = max(int(round(fraction * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+async def _drive_internal(
+    client: httpx.AsyncClient, *, users: int, marks: int
+) -> Counter:
+    statuses: Counter = Counter()
+    remaining = iter(range(marks))
+
+    async def user() -> None:
+        for index in remaining:
+            response = await client.post(
+                "/api/v1/attendance/mark/internal",
+                json={"userId": f"user-{index}", "eventType": "entry"},
+            )
+            statuses[response.status_code] += 1
+
+    await asyncio.gather(*(user() for _ in range(users)))
+    return statuses
+
+
+async def _drive_batch(client: httpx.AsyncClient, *, users: int, marks: int) -> Counter:
+    settings.marking_batch_concurrency = users
+    settings.marking_batch_max_items = max(settings.marking_batch_max_items, marks)
+    response = await client.post(
+        "/api/v1/attendance/mark/internal/batch",
+        json={
+            "items": [
+                {"userId": f"user-{index}", "eventType": "entry"}
+                for index in range(marks)
+            ]
+        },
+    )
+    response.raise_for_status()
+    return Counter(result["statusCode"] for result in response.json()["results"])
+
+
+async def run(args: argparse.Namespace) -> Counter:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://attendance-api",
+        headers={"X-Internal-Key": INTERNAL_KEY},
+        timeout=None,
+    ) as client:
+        drive = _drive_batch if args.mode == "batch" else _drive_internal
+        return await drive(client, users=args.users, marks=args.marks)
+
+
+def _report(
+    timings: List[MarkTiming], statuses: Counter, elapsed: float, provider
+) -> None:
+    succeeded = [timing for timing in timings if timing.error is None]
+    print(f"marks: {len(timings)}  elapsed: {elapsed:.2f}s")
+    print(f"throughput: {len(succeeded) / elapsed:.1f} successful marks/s")
+    print(f"responses: {dict(sorted(statuses.items()))}")
+    errors = Counter(timing.error for timing in timings if timing.error)
+    if errors:
+        print(f"errors: {dict(errors)}")
+    print(f"provider: {provider.requests} requests, {provider.errors} injected errors")
+    if not succeeded:
+        return
+
+    series = {"mark": [t.finished_at - t.started_at for t in succeeded]}
+    for step in STEPS:
+        series[step] = [t.durations()[step] for t in succeeded]
+    print(f"{'step':<8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, values in series.items():
+        print(
+            f"{name:<8}"
+            + "".join(
+                f"{_percentile(values, fraction) * 1000:>10.1f}"
+                for fraction in (0.50, 0.95, 0.99)
+            )
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--marks", type=int, default=500)
+    parser.add_argument("--mode", choices=("internal", "batch"), default="internal")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--viewstate-scale", type=float, default=1.0)
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=None,
+        help="provider requests per second (default: APP_MARKING_RATE_LIMIT)",
+    )
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    config = FakeProviderConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        viewstate_scale=args.viewstate_scale,
+    )
+    with FakeProviderServer(config, port=args.port) as provider:
+        settings.marking_provider_url = provider.url
+        settings.marking_queue_enabled = False
+        settings.internal_api_key = INTERNAL_KEY
+        if args.rate_limit is not None:
+            settings.marking_rate_limit = args.rate_limit
+
+        marking = TimedMarkingService()
+        attendance.attendance_marking_service = AttendanceMarkingService(
+            credentials_service=_Credentials(),
+            marking_service=marking,
+        )
+        started = time.perf_counter()
+        statuses = asyncio.run(run(args))
+        elapsed = time.perf_counter() - started
+        _report(marking.timings, statuses, elapsed, provider.app.state.provider)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare trusted and validated parsing of stored attendance schedules.
+
+Usage:
+    python -m benchmarks.parse_payload [--rows 10000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Any, Dict, List
+
+from app.repositories.attendance_repository import AttendanceRepository
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    """`attendance_records` rows shaped the way PostgREST returns them."""
+    return [
+        {
+            "user_id": f"user-{index}",
+            "is_active": True,
+            "timezone": "America/Lima",
+            "random_window_minutes": index % 30,
+            "phone_number": f"+5198{index:07d}",
+            "entry_enabled": True,
+            "entry_local_time": "08:00:00",
+            "entry_utc_time": "13:00:00",
+            "entry_days": DAYS,
+            "exit_enabled": True,
+            "exit_local_time": "17:30:00",
+            "exit_utc_time": "22:30:00",
+            "exit_days": DAYS,
+            "location_address": "Avenida Balta 123",
+            "location_latitude": "-6.771100",
+            "location_longitude": "-79.843100",
+            "location_radius_meters": "20.00",
+        }
+        for index in range(count)
+    ]
+
+
+def _best_ms(rows: List[Dict[str, Any]], *, verify: bool, repeat: int) -> float:
+    def parse() -> None:
+        for row in rows:
+            AttendanceRepository._parse_payload(row, verify=verify)
+
+    return min(timeit.repeat(parse, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    assert AttendanceRepository._parse_payload(
+        rows[0], verify=False
+    ) == AttendanceRepository._parse_payload(rows[0], verify=True)
+
+    validated = _best_ms(rows, verify=True, repeat=args.repeat)
+    trusted = _best_ms(rows, verify=False, repeat=args.repeat)
+    print(f"{'path':<11}{'total ms':>10}{'µs/row':>9}")
+    for name, total in (("validated", validated), ("trusted", trusted)):
+        print(f"{name:<11}{total:>10.1f}{total * 1000 / args.rows:>9.2f}")
+    print(f"speedup: {validated / trusted:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Provider page replicas used by the benchmarks and tests.
+
+The pages mirror the markup served by movil.asisscad.cl for each step of the
+marking flow (WebForms postbacks with `__VIEWSTATE`, `__EVENTVALIDATION` and
+`__doPostBack` links). Hidden field values are generated deterministically so
+the pages keep realistic sizes without storing credentials or session data.
+"""
+
+from __future__ import annotations
+
+import base64
+import random
+from typing import Dict
+
+# Sizes observed on provider responses, in bytes of base64 view state.
+VIEWSTATE_SIZES: Dict[str, int] = {
+    "login": 6_000,
+    "geo": 48_000,
+    "assist": 96_000,
+    "done": 24_000,
+}
+
+_HEAD = """<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
+ "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
+<title>AsisSCAD Movil</title>
+<link href="css/bootstrap.min.css" rel="stylesheet" type="text/css" />
+<link href="css/movil.css?v=3.2" rel="stylesheet" type="text/css" />
+<script src="js/jquery-1.11.3.min.js" type="text/javascript"></script>
+<style type="text/css">.btn-marca{{width:100%;height:64px;font-size:22px}}</style>
+</head>
+<body>
+<form method="post" action="{action}" id="form1" autocomplete="off">
+<div class="aspNetHidden">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+</div>
+<script type="text/javascript">
+//<![CDATA[
+var theForm = document.forms['form1'];
+if (!theForm) {{ theForm = document.form1; }}
+function __doPostBack(eventTarget, eventArgument) {{
+    if (!theForm.onsubmit || (theForm.onsubmit() != false)) {{
+        theForm.__EVENTTARGET.value = eventTarget;
+        theForm.__EVENTARGUMENT.value = eventArgument;
+        theForm.submit();
+    }}
+}}
+//]]>
+</script>
+<div class="aspNetHidden">
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="{generator}" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{validation}" />
+</div>
+<div class="container">
+"""
+
+_TAIL = """</div>
+</form>
+<footer class="text-center small">&copy; AsisSCAD &mdash; Control de asistencia</footer>
+<script src="js/bootstrap.min.js" type="text/javascript"></script>
+<script type="text/javascript">
+$(function () {{ $('[data-toggle="tooltip"]').tooltip(); }});
+</script>
+</body>
+</html>
+"""
+
+_BODIES: Dict[str, str] = {
+    "login": """<div class="panel panel-default"><div class="panel-body">
+<h4>Ingreso</h4>
+<!-- <input type="text" name="txt_rut" id="txt_rut" /> -->
+<label for="txt_id_empresa">Empresa</label>
+<input name="txt_id_empresa" type="number" id="txt_id_empresa" class="form-control" />
+<label for="txt_id_usuario">Usuario</label>
+<input name="txt_id_usuario" type="number" id="txt_id_usuario" class="form-control" />
+<label for="txt_pass">Clave</label>
+<input name="txt_pass" type="password" id="txt_pass" class="form-control" />
+<input type="checkbox" name="chk_recordar" id="chk_recordar" value="on" />
+<a id="lnk_ingreso" class="btn btn-primary" href="javascript:__doPostBack(&#39;lnk_ingreso&#39;,&#39;&#39;)">Ingresar</a>
+</div></div>
+""",
+    "geo": """<div class="panel panel-default"><div class="panel-body">
+<h4>Bienvenido(a) USUARIO DEMO</h4>
+<p>Obteniendo ubicaci&oacute;n&hellip;</p>
+<input name="txt_lat" type="text" id="txt_lat" readonly="readonly" class="form-control" value="" />
+<input name="txt_lon" type="text" id="txt_lon" readonly="readonly" class="form-control" value="" />
+<input type="hidden" name="hf_lat" id="hf_lat" value="0" />
+<input type="hidden" name="hf_lon" id="hf_lon" value="0" />
+<input type="hidden" name="hf_precision" id="hf_precision" value="" />
+<a id="lnk_proceso" class="btn btn-success" href="javascript:__doPostBack(&#39;lnk_proceso&#39;,&#39;&#39;)">Continuar</a>
+</div></div>
+""",
+    "assist": """<div class="panel panel-default"><div class="panel-body">
+<h4>Registrar marca</h4>
+<input type="hidden" name="hf_id_sesion" id="hf_id_sesion" value="{session}" />
+<input type="hidden" name="hf_ubicacion" id="hf_ubicacion" value="-6.771100|-79.843100" />
+<a id="lnk_entrada" class="btn btn-marca btn-success" href="javascript:__doPostBack(&#39;lnk_entrada&#39;,&#39;&#39;)">Entrada</a>
+<a id="lnk_salida" class="btn btn-marca btn-danger" href="javascript:__doPostBack(&#39;lnk_salida&#39;,&#39;&#39;)">Salida</a>
+</div></div>
+""",
+    "done": """<div class="alert alert-success">
+<strong>Marca registrada correctamente.</strong>
+<span id="lbl_fecha">{stamp}</span>
+</div>
+""",
+}
+
+_ACTIONS: Dict[str, str] = {
+    "login": "./Default.aspx",
+    "geo": "./Geo.aspx",
+    "assist": "./Marca.aspx",
+    "done": "./Marca.aspx",
+}
+
+
+def _blob(seed: str, size: int) -> str:
+    rng = random.Random(seed)
+    raw = rng.randbytes(size * 3 // 4)
+    return base64.b64encode(raw).decode("ascii")[:size]
+
+
+def render_page(step: str, *, viewstate_size: int | None = None) -> str:
+    """Render the provider page served at `step` (login, geo, assist, done)."""
+    size = VIEWSTATE_SIZES[step] if viewstate_size is None else viewstate_size
+    head = _HEAD.format(
+        action=_ACTIONS[step],
+        viewstate=_blob(f"{step}:viewstate", size),
+        generator=_blob(f"{step}:generator", 8).upper(),
+        validation=_blob(f"{step}:validation", max(size // 40, 64)),
+    )
+    body = _BODIES[step].format(
+        session=_blob(f"{step}:session", 24), stamp="17/10/2026 08:00:12"
+    )
+    return head + body + _TAIL.format()
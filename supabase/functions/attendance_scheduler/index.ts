@@ -24,10 +24,27 @@ type AttendanceEventInsert = {
   offset_minutes: number;
 };
 
+type InsertedEvent = {
+  id: string;
+  user_id: string;
+  event_type: "entry" | "exit";
+  event_date: string;
+};
+
+type MarkResult = {
+  userId: string;
+  eventType: "entry" | "exit";
+  success: boolean;
+  message: string;
+  statusCode: number;
+};
+
 const SUPABASE_URL = Deno.env.get("SUPABASE_URL");
 const SUPABASE_SERVICE_ROLE_KEY = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY");
 const ATTENDANCE_API_URL = Deno.env.get("ATTENDANCE_API_URL");
 const ATTENDANCE_API_KEY = Deno.env.get("ATTENDANCE_API_KEY");
+// Items per request to the batch endpoint; each request only queues its items.
+const MARK_BATCH_SIZE = Number(Deno.env.get("ATTENDANCE_MARK_BATCH_SIZE") ?? 500);
 
 if (
   !SUPABASE_URL ||
@@ -197,6 +214,53 @@ function scheduleEvent(
   };
 }
 
+// Queues one chunk of marks. Items carry no idempotency key, so the API keys
+// them by user, event type and local day, the same key a manual /mark without
+// an Idempotency-Key gets; a resent chunk or a manual mark is not marked twice.
+async function queueMarks(events: InsertedEvent[]): Promise<number> {
+  const response = await fetch(
+    `${ATTENDANCE_API_URL}/api/v1/attendance/mark/internal/batch`,
+    {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        "X-Internal-Key": ATTENDANCE_API_KEY!,
+        Prefer: "respond-async",
+      },
+      body: JSON.stringify({
+        items: events.map((event) => ({
+          eventType: event.event_type,
+          userId: event.user_id,
+        })),
+      }),
+    },
+  );
+
+  if (!response.ok) {
+    const body = await response.text();
+    throw new Error(`Batch endpoint answered ${response.status}: ${body}`);
+  }
+
+  if (response.status === 202) {
+    return events.length;
+  }
+
+  // The API marked the chunk inline (its queue is disabled).
+  const { results } = (await response.json()) as { results: MarkResult[] };
+  for (const result of results) {
+    if (!result.success) {
+      console.error(
+        "Failed to mark attendance",
+        result.userId,
+        result.eventType,
+        result.statusCode,
+        result.message,
+      );
+    }
+  }
+  return events.length;
+}
+
 Deno.serve(async () => {
   const { data: records, error } = await supabase
     .from("attendance_records")
@@ -255,6 +319,7 @@ Deno.serve(async () => {
   }
 
   let inserted = 0;
+  let queued = 0;
   if (inserts.length > 0) {
     const { error: insertError, data } = await supabase
       .from("attendance_events")
@@ -262,7 +327,7 @@ Deno.serve(async () => {
         onConflict: "user_id,event_date,event_type",
         ignoreDuplicates: true,
       })
-      .select("id,user_id,event_type");
+      .select("id,user_id,event_type,event_date");
 
     if (insertError) {
       return new Response(
@@ -277,42 +342,26 @@ Deno.serve(async () => {
       );
     }
 
-    const insertedRows = (data ?? []) as {
-      user_id: string;
-      event_type: "entry" | "exit";
-    }[];
+    const insertedRows = (data ?? []) as InsertedEvent[];
     inserted = insertedRows.length;
 
-    if (insertedRows.length > 0) {
-      await Promise.all(
-        insertedRows.map(async (row) => {
-          const response = await fetch(
-            `${ATTENDANCE_API_URL}/api/v1/attendance/mark/internal`,
-            {
-              method: "POST",
-              headers: {
-                "Content-Type": "application/json",
-                "X-Internal-Key": ATTENDANCE_API_KEY,
-              },
-              body: JSON.stringify({
-                eventType: row.event_type,
-                userId: row.user_id,
-              }),
-            },
-          );
-
-          if (!response.ok) {
-            const body = await response.text();
-            console.error(
-              "Failed to mark attendance",
-              row.user_id,
-              row.event_type,
-              response.status,
-              body,
-            );
-          }
-        }),
-      );
+    const chunkSize = Math.max(MARK_BATCH_SIZE, 1);
+    for (let start = 0; start < insertedRows.length; start += chunkSize) {
+      const chunk = insertedRows.slice(start, start + chunkSize);
+      try {
+        queued += await queueMarks(chunk);
+      } catch (error) {
+        // Keep going with the other chunks, and release this chunk's events
+        // so the next run inserts and queues them again.
+        console.error("Failed to queue attendance marks", chunk.length, error);
+        const { error: releaseError } = await supabase
+          .from("attendance_events")
+          .delete()
+          .in("id", chunk.map((event) => event.id));
+        if (releaseError) {
+          console.error("Failed to release attendance events", releaseError);
+        }
+      }
     }
   }
 
@@ -322,6 +371,7 @@ Deno.serve(async () => {
       considered: records.length,
       candidates: inserts.length,
       inserted,
+      queued,
     }),
     {
       status: 200,
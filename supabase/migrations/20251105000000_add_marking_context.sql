@@ -0,0 +1,72 @@
+-- Everything a mark needs (credentials, decrypted password, timezone and
+-- location) in a single round trip.
+create or replace function public.get_marking_contexts(
+    target_user_ids uuid[]
+) returns table (
+    user_id uuid,
+    company_id bigint,
+    user_id_number bigint,
+    password text,
+    timezone text,
+    location_address text,
+    location_latitude numeric,
+    location_longitude numeric,
+    location_radius_meters numeric
+)
+language sql
+stable
+security definer
+set search_path = public, vault
+as $$
+    select
+        c.user_id,
+        c.company_id,
+        c.user_id_number,
+        s.decrypted_secret,
+        r.timezone,
+        r.location_address,
+        r.location_latitude,
+        r.location_longitude,
+        r.location_radius_meters
+    from public.attendance_credentials c
+    left join vault.decrypted_secrets s on s.id = c.vault_secret_id
+    left join lateral (
+        select
+            ar.timezone,
+            ar.location_address,
+            ar.location_latitude,
+            ar.location_longitude,
+            ar.location_radius_meters
+        from public.attendance_records ar
+        where ar.user_id = c.user_id
+        order by ar.recorded_at desc
+        limit 1
+    ) r on true
+    where c.user_id = any(target_user_ids);
+$$;
+
+create or replace function public.get_marking_context(
+    target_user_id uuid
+) returns table (
+    user_id uuid,
+    company_id bigint,
+    user_id_number bigint,
+    password text,
+    timezone text,
+    location_address text,
+    location_latitude numeric,
+    location_longitude numeric,
+    location_radius_meters numeric
+)
+language sql
+stable
+security definer
+set search_path = public, vault
+as $$
+    select * from public.get_marking_contexts(array[target_user_id]);
+$$;
+
+revoke all on function public.get_marking_contexts(uuid[]) from public;
+revoke all on function public.get_marking_context(uuid) from public;
+grant execute on function public.get_marking_contexts(uuid[]) to service_role;
+grant execute on function public.get_marking_context(uuid) to service_role;
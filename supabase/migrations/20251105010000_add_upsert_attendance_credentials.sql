@@ -0,0 +1,73 @@
+-- Store the Vault secret and the credentials row in one transaction, so a
+-- failed write can no longer leave an orphaned secret behind.
+create or replace function public.upsert_attendance_credentials(
+    target_user_id uuid,
+    target_company_id bigint,
+    target_user_id_number bigint,
+    secret text
+) returns public.attendance_credentials
+language plpgsql
+security definer
+set search_path = public, vault
+as $$
+declare
+    secret_id uuid;
+    secret_name text := 'attendance:' || target_user_id::text;
+    result public.attendance_credentials;
+begin
+    -- Serialise writers for the same user so only one secret is created.
+    perform pg_advisory_xact_lock(
+        hashtext('attendance_credentials:' || target_user_id::text)
+    );
+
+    select c.vault_secret_id
+    into secret_id
+    from public.attendance_credentials c
+    where c.user_id = target_user_id;
+
+    -- Secret names are unique: reuse a secret left behind by an earlier
+    -- save that failed before its credentials row was written.
+    if secret_id is null then
+        select s.id
+        into secret_id
+        from vault.secrets s
+        where s.name = secret_name;
+    end if;
+
+    if secret_id is null then
+        secret_id := vault.create_secret(
+            secret,
+            secret_name,
+            'Attendance login password'
+        );
+    else
+        perform vault.update_secret(secret_id, secret, null, null);
+    end if;
+
+    insert into public.attendance_credentials as c (
+        user_id,
+        company_id,
+        user_id_number,
+        vault_secret_id,
+        updated_at
+    )
+    values (
+        target_user_id,
+        target_company_id,
+        target_user_id_number,
+        secret_id,
+        now()
+    )
+    on conflict (user_id) do update
+    set company_id = excluded.company_id,
+        user_id_number = excluded.user_id_number,
+        vault_secret_id = excluded.vault_secret_id,
+        updated_at = excluded.updated_at
+    returning c.* into result;
+
+    return result;
+end;
+$$;
+
+revoke all on function public.upsert_attendance_credentials(uuid, bigint, bigint, text) from public;
+grant execute on function public.upsert_attendance_credentials(uuid, bigint, bigint, text) to service_role;
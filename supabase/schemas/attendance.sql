@@ -181,3 +181,146 @@ revoke all on function public.read_attendance_secret(uuid) from public;
 grant execute on function public.create_attendance_secret(text, text, text) to service_role;
 grant execute on function public.update_attendance_secret(uuid, text) to service_role;
 grant execute on function public.read_attendance_secret(uuid) to service_role;
+
+create or replace function public.get_marking_contexts(
+    target_user_ids uuid[]
+) returns table (
+    user_id uuid,
+    company_id bigint,
+    user_id_number bigint,
+    password text,
+    timezone text,
+    location_address text,
+    location_latitude numeric,
+    location_longitude numeric,
+    location_radius_meters numeric
+)
+language sql
+stable
+security definer
+set search_path = public, vault
+as $$
+    select
+        c.user_id,
+        c.company_id,
+        c.user_id_number,
+        s.decrypted_secret,
+        r.timezone,
+        r.location_address,
+        r.location_latitude,
+        r.location_longitude,
+        r.location_radius_meters
+    from public.attendance_credentials c
+    left join vault.decrypted_secrets s on s.id = c.vault_secret_id
+    left join lateral (
+        select
+            ar.timezone,
+            ar.location_address,
+            ar.location_latitude,
+            ar.location_longitude,
+            ar.location_radius_meters
+        from public.attendance_records ar
+        where ar.user_id = c.user_id
+        order by ar.recorded_at desc
+        limit 1
+    ) r on true
+    where c.user_id = any(target_user_ids);
+$$;
+
+create or replace function public.get_marking_context(
+    target_user_id uuid
+) returns table (
+    user_id uuid,
+    company_id bigint,
+    user_id_number bigint,
+    password text,
+    timezone text,
+    location_address text,
+    location_latitude numeric,
+    location_longitude numeric,
+    location_radius_meters numeric
+)
+language sql
+stable
+security definer
+set search_path = public, vault
+as $$
+    select * from public.get_marking_contexts(array[target_user_id]);
+$$;
+
+revoke all on function public.get_marking_contexts(uuid[]) from public;
+revoke all on function public.get_marking_context(uuid) from public;
+grant execute on function public.get_marking_contexts(uuid[]) to service_role;
+grant execute on function public.get_marking_context(uuid) to service_role;
+
+create or replace function public.upsert_attendance_credentials(
+    target_user_id uuid,
+    target_company_id bigint,
+    target_user_id_number bigint,
+    secret text
+) returns public.attendance_credentials
+language plpgsql
+security definer
+set search_path = public, vault
+as $$
+declare
+    secret_id uuid;
+    secret_name text := 'attendance:' || target_user_id::text;
+    result public.attendance_credentials;
+begin
+    -- Serialise writers for the same user so only one secret is created.
+    perform pg_advisory_xact_lock(
+        hashtext('attendance_credentials:' || target_user_id::text)
+    );
+
+    select c.vault_secret_id
+    into secret_id
+    from public.attendance_credentials c
+    where c.user_id = target_user_id;
+
+    -- Secret names are unique: reuse a secret left behind by an earlier
+    -- save that failed before its credentials row was written.
+    if secret_id is null then
+        select s.id
+        into secret_id
+        from vault.secrets s
+        where s.name = secret_name;
+    end if;
+
+    if secret_id is null then
+        secret_id := vault.create_secret(
+            secret,
+            secret_name,
+            'Attendance login password'
+        );
+    else
+        perform vault.update_secret(secret_id, secret, null, null);
+    end if;
+
+    insert into public.attendance_credentials as c (
+        user_id,
+        company_id,
+        user_id_number,
+        vault_secret_id,
+        updated_at
+    )
+    values (
+        target_user_id,
+        target_company_id,
+        target_user_id_number,
+        secret_id,
+        now()
+    )
+    on conflict (user_id) do update
+    set company_id = excluded.company_id,
+        user_id_number = excluded.user_id_number,
+        vault_secret_id = excluded.vault_secret_id,
+        updated_at = excluded.updated_at
+    returning c.* into result;
+
+    return result;
+end;
+$$;
+
+revoke all on function public.upsert_attendance_credentials(uuid, bigint, bigint, text) from public;
+grant execute on function public.upsert_attendance_credentials(uuid, bigint, bigint, text) to service_role;
@@ -0,0 +1,72 @@
+import pytest
+
+from app.models import AttendanceRequest
+
+SCHEDULE_PAYLOAD = {
+    "isActive": True,
+    "schedule": {
+        "entry": {"enabled": False, "days": []},
+        "exit": {"enabled": False, "days": []},
+    },
+    "location": {
+        "address": "Avenida",
+        "latitude": -6.75,
+        "longitude": -79.84,
+        "radiusMeters": 20,
+    },
+    "timezone": "America/Lima",
+}
+
+
+class StubCredentials:
+    """Marking contexts for any user except `no-credentials`."""
+
+    def __init__(self, schedule: AttendanceRequest) -> None:
+        self._schedule = schedule
+
+    async def get_marking_context(self, *, user_id):
+        contexts = await self.get_marking_contexts(user_ids=[user_id])
+        return contexts.get(user_id)
+
+    async def get_marking_contexts(self, *, user_ids):
+        return {
+            user_id: {
+                "company_id": 1,
+                "user_id_number": 2,
+                "password": "x",
+                "timezone": self._schedule.timezone,
+                "location": self._schedule.location,
+            }
+            for user_id in user_ids
+            if user_id != "no-credentials"
+        }
+
+
+@pytest.fixture
+def schedule():
+    """A stored schedule with both windows disabled."""
+    return AttendanceRequest.model_validate(SCHEDULE_PAYLOAD)
+
+
+@pytest.fixture
+def entry_schedule():
+    """Entry at 08:00 Lima time on Mondays, with a 15 minute random window."""
+    return AttendanceRequest.model_validate(
+        {
+            **SCHEDULE_PAYLOAD,
+            "schedule": {
+                "entry": {
+                    "enabled": True,
+                    "localTime": "08:00:00",
+                    "days": ["monday"],
+                },
+                "exit": {"enabled": False, "days": []},
+            },
+            "randomWindowMinutes": 15,
+        }
+    )
+
+
+@pytest.fixture
+def credentials(schedule):
+    return StubCredentials(schedule)
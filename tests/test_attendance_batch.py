@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import attendance
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.exceptions import MarkingError
+from app.main import app
+from app.services.attendance_marking_service import AttendanceMarkingService
+
+
+class _Marking:
+    def __init__(self):
+        self.calls = 0
+
+    async def mark_attendance(self, *, password, event_type, **_):
+        self.calls += 1
+        if event_type == "exit":
+            raise MarkingError("Failed to complete attendance marking at geo submit")
+
+
+@pytest.fixture
+def client(monkeypatch, credentials):
+    marking = _Marking()
+    monkeypatch.setattr(settings, "internal_api_key", "internal")
+    monkeypatch.setattr(
+        attendance,
+        "attendance_marking_service",
+        AttendanceMarkingService(
+            credentials_service=credentials,
+            marking_service=marking,
+            session_cache=TTLCache(maxsize=10, ttl=60),
+            results_cache=TTLCache(maxsize=10, ttl=60),
+        ),
+    )
+    return TestClient(app, headers={"X-Internal-Key": "internal"}), marking
+
+
+ITEMS = [
+    {"userId": "a", "eventType": "entry"},
+    {"userId": "b", "eventType": "exit"},
+    {"userId": "no-credentials", "eventType": "entry"},
+]
+
+
+def test_batch_returns_per_item_results(client):
+    http, marking = client
+    response = http.post(
+        "/api/v1/attendance/mark/internal/batch", json={"items": ITEMS}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total"], data["succeeded"], data["failed"]) == (3, 1, 2)
+    by_user = {result["userId"]: result["statusCode"] for result in data["results"]}
+    assert by_user == {"a": 200, "b": 502, "no-credentials": 400}
+    assert marking.calls == 2
+
+
+def test_batch_streams_ndjson(client):
+    http, _ = client
+    response = http.post(
+        "/api/v1/attendance/mark/internal/batch",
+        json={"items": ITEMS},
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["userId"] for line in lines) == ["a", "b", "no-credentials"]
@@ -0,0 +1,106 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps.auth import get_current_user
+from app.api.v1 import attendance
+from app.core.config import settings
+from app.main import app
+from app.models import AttendanceMarkResponse
+from app.services import marking_queue
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, calls):
+    async def mark_for_user(*, user_id, event_type, on_step=None, **options):
+        calls.append(options)
+        for step in ("login", "geo", "submit"):
+            await on_step(step)
+        return AttendanceMarkResponse(
+            success=True, message="Attendance marked", event_type=event_type
+        )
+
+    monkeypatch.setattr(settings, "marking_queue_path", str(tmp_path / "q.sqlite3"))
+    monkeypatch.setattr(marking_queue, "_marking_queue", None)
+    monkeypatch.setattr(
+        attendance.attendance_marking_service, "mark_for_user", mark_for_user
+    )
+    app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+    with TestClient(app) as http:
+        yield http
+    app.dependency_overrides.clear()
+
+
+def test_async_mark_reports_steps_and_terminal_result(client):
+    accepted = client.post(
+        "/api/v1/attendance/mark",
+        json={"eventType": "entry"},
+        headers={"Prefer": "respond-async"},
+    )
+    assert accepted.status_code == 202
+    job_id = accepted.json()["jobId"]
+    assert accepted.headers["Location"].endswith(f"/api/v1/attendance/mark/{job_id}")
+
+    with client.stream("GET", f"/api/v1/attendance/mark/{job_id}/events") as events:
+        names = [
+            line.removeprefix("event: ")
+            for line in events.iter_lines()
+            if line.startswith("event: ")
+        ]
+    assert names[-1] == "succeeded"
+
+    status = client.get(f"/api/v1/attendance/mark/{job_id}").json()
+    assert status["status"] == "succeeded"
+    assert status["step"] == "submit"
+    assert status["result"]["message"] == "Attendance marked"
+
+
+def test_other_users_cannot_read_a_job(client):
+    job_id = client.post(
+        "/api/v1/attendance/mark",
+        json={"eventType": "exit"},
+        headers={"Prefer": "respond-async"},
+    ).json()["jobId"]
+
+    app.dependency_overrides[get_current_user] = lambda: {"id": "someone-else"}
+    assert client.get(f"/api/v1/attendance/mark/{job_id}").status_code == 404
+
+
+def test_queued_mark_keeps_the_idempotency_key_and_deadline(client, calls):
+    job_id = client.post(
+        "/api/v1/attendance/mark",
+        json={"eventType": "entry", "deadlineSeconds": 12.5},
+        headers={"Prefer": "respond-async", "Idempotency-Key": "retry-1"},
+    ).json()["jobId"]
+
+    with client.stream("GET", f"/api/v1/attendance/mark/{job_id}/events") as events:
+        list(events.iter_lines())
+    assert calls[-1] == {"idempotency_key": "retry-1", "deadline_seconds": 12.5}
+
+
+def test_batch_with_respond_async_queues_one_job_per_item(client, calls, monkeypatch):
+    monkeypatch.setattr(settings, "internal_api_key", "internal")
+    accepted = client.post(
+        "/api/v1/attendance/mark/internal/batch",
+        json={
+            "items": [
+                {"userId": "user-1", "eventType": "entry", "idempotencyKey": "ev-1"},
+                {"userId": "user-1", "eventType": "exit", "idempotencyKey": "ev-2"},
+            ]
+        },
+        headers={"Prefer": "respond-async", "X-Internal-Key": "internal"},
+    )
+    assert accepted.status_code == 202
+    jobs = accepted.json()["jobs"]
+    assert [job["status"] for job in jobs] == ["queued", "queued"]
+
+    for job in jobs:
+        with client.stream(
+            "GET", f"/api/v1/attendance/mark/{job['jobId']}/events"
+        ) as events:
+            assert "event: succeeded" in list(events.iter_lines())
+    assert sorted(call["idempotency_key"] for call in calls) == ["ev-1", "ev-2"]
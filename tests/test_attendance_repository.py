@@ -0,0 +1,59 @@
+import pytest
+from pydantic import ValidationError
+
+from app.models import LocationData
+from app.repositories.attendance_repository import AttendanceRepository, _trusted
+
+ROW = {
+    "user_id": "user-1",
+    "is_active": True,
+    "timezone": "America/Lima",
+    "random_window_minutes": 15,
+    "phone_number": "+51987654321",
+    "entry_enabled": True,
+    "entry_local_time": "08:00:00",
+    "entry_utc_time": "13:00:00",
+    "entry_days": ["monday", "friday"],
+    "exit_enabled": False,
+    "exit_local_time": None,
+    "exit_utc_time": None,
+    "exit_days": [],
+    "location_address": "Avenida",
+    "location_latitude": "-6.771100",
+    "location_longitude": "-79.843100",
+    "location_radius_meters": "20.00",
+}
+
+
+def test_trusted_rows_match_validated_parse():
+    trusted = AttendanceRepository._parse_payload(ROW, verify=False)
+    verified = AttendanceRepository._parse_payload(ROW, verify=True)
+
+    assert trusted == verified
+    assert trusted.model_dump(by_alias=True) == verified.model_dump(by_alias=True)
+
+
+def test_trusted_model_matches_model_validate_and_owns_its_fields():
+    fields = {
+        "address": "Avenida",
+        "latitude": -6.7711,
+        "longitude": -79.8431,
+        "radius_meters": 20.0,
+    }
+    trusted = _trusted(LocationData, fields)
+    validated = LocationData.model_validate(fields)
+
+    assert trusted == validated
+    assert trusted.model_fields_set == validated.model_fields_set
+    assert trusted.model_dump() == validated.model_dump()
+
+    fields["address"] = "Changed"
+    assert trusted.address == "Avenida"
+
+
+def test_verify_mode_rejects_rows_the_fast_path_trusts():
+    row = {**ROW, "phone_number": "987654321"}
+
+    assert AttendanceRepository._parse_payload(row, verify=False).phone_number
+    with pytest.raises(ValidationError):
+        AttendanceRepository._parse_payload(row, verify=True)
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import httpx
+import jwt
+from supabase import AsyncClient, AsyncClientOptions
+
+from app.api.v1.auth import _fetch_profile
+from app.core.cache import TTLCache
+from app.services import auth_cache
+from app.services.auth_service import AuthService
+
+
+def _token(exp):
+    return jwt.encode({"sub": "user-1", "exp": exp}, "secret-" * 6, algorithm="HS256")
+
+
+def test_concurrent_validations_share_one_call_and_respect_exp(monkeypatch):
+    calls = []
+
+    async def verify(token):
+        calls.append(token)
+        await asyncio.sleep(0.05)
+        return {"id": "user-1", "email": None, "role": "authenticated"}
+
+    monkeypatch.setattr(AuthService, "verify_token", verify)
+    monkeypatch.setattr(
+        auth_cache, "_users", TTLCache(maxsize=10, ttl=300, clock=time.time)
+    )
+
+    async def scenario():
+        token = _token(int(time.time()) + 3600)
+        users = await asyncio.gather(
+            *(auth_cache.get_cached_user(token) for _ in range(5))
+        )
+        assert all(user["id"] == "user-1" for user in users)
+        assert len(calls) == 1
+        await auth_cache.get_cached_user(token)
+        assert len(calls) == 1
+
+        # Expired by the time it would be stored: never cached.
+        stale = _token(int(time.time()) - 1)
+        await auth_cache.get_cached_user(stale)
+        await auth_cache.get_cached_user(stale)
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+    assert auth_cache.get_user_cache().stats()["hits"] == 1
+
+
+def test_missing_profile_is_cached_as_empty(monkeypatch):
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            # What PostgREST answers `.single()` when no row matches.
+            return httpx.Response(
+                406, json={"code": "PGRST116", "message": "0 rows", "details": None}
+            )
+        return httpx.Response(200, json=[])
+
+    monkeypatch.setattr(auth_cache, "_profiles", TTLCache(maxsize=10, ttl=300))
+
+    async def scenario():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = AsyncClient(
+            "https://project.supabase.co",
+            "anon-key",
+            AsyncClientOptions(
+                httpx_client=http_client,
+                auto_refresh_token=False,
+                persist_session=False,
+            ),
+        )
+        try:
+            for _ in range(2):
+                profile = await auth_cache.get_cached_profile(
+                    "user-1", lambda: _fetch_profile(client, "user-1")
+                )
+                assert profile == {}
+        finally:
+            await http_client.aclose()
+
+    asyncio.run(scenario())
+    assert paths == ["/rest/v1/profiles"]
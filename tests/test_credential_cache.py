@@ -0,0 +1,48 @@
+import asyncio
+import pickle
+
+import pytest
+
+from app.core.cache import TTLCache
+from app.core.credential_cache import CredentialCache
+
+ROW = {"user_id": "user-1", "company_id": 7040, "password": "s3cret"}
+
+
+def test_rows_are_encrypted_and_never_serialized():
+    store = TTLCache(maxsize=10, ttl=30)
+    cache = CredentialCache(enabled=True, cache=store)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return ROW
+
+    async def scenario():
+        assert await cache.get("user-1", load) == ROW
+        assert await cache.get("user-1", load) == ROW
+
+    asyncio.run(scenario())
+    assert len(loads) == 1
+    assert cache.metrics()["hits"] == 1
+    assert b"s3cret" not in store.get("user-1")
+    assert "s3cret" not in repr(cache)
+    with pytest.raises(TypeError):
+        pickle.dumps(cache)
+
+
+def test_disabled_cache_always_loads():
+    cache = CredentialCache(enabled=False, cache=TTLCache(maxsize=10, ttl=30))
+    loads = []
+
+    async def load(user_ids):
+        loads.append(user_ids)
+        return {user_id: ROW for user_id in user_ids}
+
+    async def scenario():
+        await cache.get_many(["user-1"], load)
+        await cache.get_many(["user-1"], load)
+
+    asyncio.run(scenario())
+    assert loads == [["user-1"], ["user-1"]]
+    assert cache.metrics()["size"] == 0
@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from supabase import AsyncClient, AsyncClientOptions
+
+from app.core.cache import TTLCache
+from app.core.credential_cache import CredentialCache
+from app.exceptions import PersistenceError
+from app.repositories.attendance_credentials_repository import (
+    AttendanceCredentialsRepository,
+)
+
+ROW = {
+    "user_id": "user-1",
+    "company_id": 7040,
+    "user_id_number": 1234,
+    "vault_secret_id": "secret-1",
+}
+
+
+def _repository(handler, credential_cache=None):
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = AsyncClient(
+        "https://project.supabase.co",
+        "service-key",
+        AsyncClientOptions(
+            httpx_client=http_client, auto_refresh_token=False, persist_session=False
+        ),
+    )
+    return (
+        AttendanceCredentialsRepository(client, credential_cache=credential_cache),
+        http_client,
+    )
+
+
+def test_upsert_is_a_single_rpc():
+    requests = []
+
+    def handler(request):
+        requests.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200, json=ROW)
+
+    async def scenario():
+        repository, http_client = _repository(handler)
+        try:
+            await repository.upsert_credentials(
+                user_id="user-1", company_id=7040, user_id_number=1234, password="pw"
+            )
+        finally:
+            await http_client.aclose()
+
+    asyncio.run(scenario())
+    assert requests == [
+        (
+            "/rest/v1/rpc/upsert_attendance_credentials",
+            {
+                "target_user_id": "user-1",
+                "target_company_id": 7040,
+                "target_user_id_number": 1234,
+                "secret": "pw",
+            },
+        )
+    ]
+
+
+def test_metadata_read_never_calls_vault():
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        return httpx.Response(200, json=[ROW])
+
+    async def scenario():
+        repository, http_client = _repository(handler)
+        try:
+            return await repository.fetch_credentials_metadata(user_id="user-1")
+        finally:
+            await http_client.aclose()
+
+    assert asyncio.run(scenario()) == {
+        "company_id": 7040,
+        "user_id_number": 1234,
+        "has_password": True,
+    }
+    assert paths == ["/rest/v1/attendance_credentials"]
+
+
+def test_marking_contexts_load_in_one_rpc():
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        assert json.loads(request.content) == {"target_user_ids": ["user-1", "user-2"]}
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    **ROW,
+                    "password": "s3cret",
+                    "timezone": "America/Lima",
+                    "location_address": "Avenida",
+                    "location_latitude": "-6.771100",
+                    "location_longitude": "-79.843100",
+                    "location_radius_meters": "20.00",
+                },
+                {"user_id": "user-2", "company_id": 1, "password": None},
+            ],
+        )
+
+    async def scenario():
+        repository, http_client = _repository(handler)
+        try:
+            return await repository.fetch_marking_contexts(
+                user_ids=["user-1", "user-2"]
+            )
+        finally:
+            await http_client.aclose()
+
+    contexts = asyncio.run(scenario())
+    assert paths == ["/rest/v1/rpc/get_marking_contexts"]
+    assert contexts["user-1"]["password"] == "s3cret"
+    assert contexts["user-1"]["timezone"] == "America/Lima"
+    assert contexts["user-1"]["location"].latitude == -6.7711
+    assert contexts["user-2"]["location"] is None
+
+
+def test_cached_marking_context_is_dropped_on_upsert():
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        if request.url.path.endswith("/rpc/get_marking_context"):
+            return httpx.Response(200, json=[{**ROW, "password": "s3cret"}])
+        return httpx.Response(200, json=ROW)
+
+    cache = CredentialCache(enabled=True, cache=TTLCache(maxsize=10, ttl=30))
+
+    async def scenario():
+        repository, http_client = _repository(handler, credential_cache=cache)
+        try:
+            await repository.fetch_marking_context(user_id="user-1")
+            await repository.fetch_marking_context(user_id="user-1")
+            await repository.upsert_credentials(
+                user_id="user-1", company_id=7040, user_id_number=1234, password="pw"
+            )
+            await repository.fetch_marking_context(user_id="user-1")
+        finally:
+            await http_client.aclose()
+
+    asyncio.run(scenario())
+    assert paths == [
+        "/rest/v1/rpc/get_marking_context",
+        "/rest/v1/rpc/upsert_attendance_credentials",
+        "/rest/v1/rpc/get_marking_context",
+    ]
+    assert cache.metrics()["hits"] == 1
+
+
+def test_postgrest_errors_map_to_persistence_error():
+    def handler(request):
+        return httpx.Response(500, json={"message": "boom", "code": "XX000"})
+
+    async def scenario():
+        repository, http_client = _repository(handler)
+        try:
+            await repository.fetch_credentials_metadata(user_id="user-1")
+        finally:
+            await http_client.aclose()
+
+    with pytest.raises(PersistenceError):
+        asyncio.run(scenario())
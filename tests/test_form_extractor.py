@@ -0,0 +1,100 @@
+import pytest
+
+from app.exceptions import MarkingError
+from app.services import form_extractor
+from app.services.form_extractor import FormExtractor, extract_form_data
+from benchmarks.form_extractor import extract_with_beautifulsoup
+from benchmarks.provider_pages import VIEWSTATE_SIZES, render_page
+
+
+@pytest.mark.parametrize("step", list(VIEWSTATE_SIZES))
+def test_matches_beautifulsoup_on_provider_pages(step):
+    html = render_page(step)
+    assert extract_form_data(html) == extract_with_beautifulsoup(html)
+
+
+def test_chunked_feed_stops_after_first_form():
+    trailer = "<p>" + "x" * 4000 + '</p><form action="/2"><input name="x" /></form>'
+    html = render_page("geo") + trailer
+    extractor = FormExtractor()
+    chunks = [html[i : i + 997] for i in range(0, len(html), 997)]
+
+    fed = 0
+    for chunk in chunks:
+        fed += 1
+        if extractor.feed(chunk):
+            break
+
+    assert fed < len(chunks)
+    assert extractor.result() == extract_with_beautifulsoup(render_page("geo"))
+
+
+def test_every_two_chunk_split_matches_a_single_feed():
+    html = (
+        '<html><!-- <form action="/fake"><input name="c" value="1"> -->'
+        '<form action="/a?x=1&amp;y=2" method="post">'
+        '<input name="expr" value="a<b">'
+        "<input name='t' value='<input name=\"z\">'>"
+        '<!-- <input name="hidden" value="<"> -->'
+        "<input name=plain value=1>"
+        '</form><form action="/2"><input name="x"></form>'
+    )
+    expected = (
+        {"expr": "a<b", "t": '<input name="z">', "plain": "1"},
+        "/a?x=1&y=2",
+        "POST",
+    )
+    assert extract_form_data(html) == expected
+
+    for offset in range(len(html) + 1):
+        extractor = FormExtractor()
+        extractor.feed(html[:offset])
+        extractor.feed(html[offset:])
+        assert extractor.result() == expected, offset
+
+    for size in range(1, 8):
+        extractor = FormExtractor()
+        for start in range(0, len(html), size):
+            extractor.feed(html[start : start + size])
+        assert extractor.result() == expected, size
+
+
+def test_split_viewstate_is_matched_once(monkeypatch):
+    scans = []
+
+    class _CountingRegex:
+        def finditer(self, text):
+            scans.append(len(text))
+            return pattern.finditer(text)
+
+    html = (
+        '<form action="/a"><input name="__VIEWSTATE" value="'
+        + "A" * 100_000
+        + '"><input name="b" value="1"></form>'
+    )
+    expected = extract_form_data(html)
+    pattern = form_extractor._TAG_RE
+    monkeypatch.setattr(form_extractor, "_TAG_RE", _CountingRegex())
+    extractor = FormExtractor()
+    for start in range(0, len(html), 1024):
+        if extractor.feed(html[start : start + 1024]):
+            break
+
+    assert extractor.result() == expected
+    assert sum(scans) < 2 * len(html)
+
+
+def test_unquoted_and_escaped_attributes():
+    html = (
+        "<FORM Action=Login.aspx?a=1&amp;b=2 method=post>"
+        "<input name=__EVENTTARGET value=>"
+        "<input name=\"title\" value='a &gt; b' disabled>"
+        '<input value="orphan">'
+        "</form>"
+    )
+    assert extract_form_data(html) == extract_with_beautifulsoup(html)
+
+
+def test_missing_form_raises_marking_error():
+    with pytest.raises(MarkingError):
+        extract_form_data("<html><body>Sesion expirada</body></html>")
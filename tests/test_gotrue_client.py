@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.exceptions import AuthenticationError, AuthProviderUnavailableError
+from app.services.gotrue_client import GoTrueClient
+
+
+def _client(handler):
+    return GoTrueClient(
+        base_url="https://project.supabase.co",
+        api_key="anon-key",
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def test_requests_carry_api_key_and_map_errors():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        if request.url.path == "/auth/v1/user" and token == "good":
+            return httpx.Response(200, json={"id": "user-1", "aud": "authenticated"})
+        if token == "down":
+            return httpx.Response(502)
+        return httpx.Response(401, json={"msg": "invalid JWT"})
+
+    async def scenario():
+        client = _client(handler)
+        try:
+            assert (await client.get_user("good"))["id"] == "user-1"
+            with pytest.raises(AuthenticationError):
+                await client.get_user("expired")
+            with pytest.raises(AuthProviderUnavailableError):
+                await client.logout("down")
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
+    assert all(request.headers["apikey"] == "anon-key" for request in seen)
+
+
+def test_password_login_posts_grant_type():
+    def handler(request):
+        assert request.url.params["grant_type"] == "password"
+        return httpx.Response(
+            200,
+            json={"access_token": "a", "refresh_token": "r", "user": {"id": "u"}},
+        )
+
+    async def scenario():
+        client = _client(handler)
+        try:
+            return await client.sign_in_with_password("user@example.com", "pw")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(scenario())["refresh_token"] == "r"
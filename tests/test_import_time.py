@@ -0,0 +1,13 @@
+import os
+
+from benchmarks.import_time import HEAVY_MODULES, measure
+
+# Generous enough for slow CI runners; override with APP_IMPORT_BUDGET_MS.
+IMPORT_BUDGET_MS = float(os.getenv("APP_IMPORT_BUDGET_MS", "1500"))
+
+
+def test_app_import_stays_lazy_and_within_budget():
+    totals = min((measure("app.main") for _ in range(2)), key=lambda t: t["app.main"])
+
+    assert [name for name in HEAVY_MODULES if name in totals] == []
+    assert totals["app.main"] / 1000 < IMPORT_BUDGET_MS
@@ -0,0 +1,102 @@
+import asyncio
+
+from app.core.cache import TTLCache
+from app.models import AttendanceInternalMarkRequest
+from app.services.attendance_marking_service import AttendanceMarkingService
+
+
+class _SlowMarking:
+    def __init__(self, *, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    async def mark_attendance(self, **_):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise RuntimeError("provider down")
+
+
+def _service(marking, credentials):
+    return AttendanceMarkingService(
+        credentials_service=credentials,
+        marking_service=marking,
+        session_cache=TTLCache(maxsize=10, ttl=60),
+        results_cache=TTLCache(maxsize=10, ttl=86400),
+    )
+
+
+def test_concurrent_duplicates_share_one_provider_session(credentials):
+    marking = _SlowMarking()
+    service = _service(marking, credentials)
+
+    async def run():
+        first, second = await asyncio.gather(
+            service.mark_for_user(user_id="user-1", event_type="entry"),
+            service.mark_for_user(user_id="user-1", event_type="entry"),
+        )
+        replayed = await service.mark_for_user(user_id="user-1", event_type="entry")
+        await service.mark_for_user(user_id="user-1", event_type="exit")
+        return first, second, replayed
+
+    first, second, replayed = asyncio.run(run())
+
+    assert first is second is replayed
+    assert marking.calls == 2
+
+
+def test_supplied_key_scopes_the_mark_and_failures_are_not_cached(credentials):
+    marking = _SlowMarking(fail=True)
+    service = _service(marking, credentials)
+
+    async def mark(key):
+        try:
+            await service.mark_for_user(
+                user_id="user-1", event_type="entry", idempotency_key=key
+            )
+        except RuntimeError:
+            return False
+        return True
+
+    async def run():
+        return await asyncio.gather(mark("a"), mark("a"), mark("b"))
+
+    assert asyncio.run(run()) == [False, False, False]
+    assert marking.calls == 2
+
+    marking.fail = False
+    assert asyncio.run(mark("a")) is True
+    assert marking.calls == 3
+
+
+def test_supplied_key_is_scoped_by_event_type(credentials):
+    marking = _SlowMarking()
+    service = _service(marking, credentials)
+
+    async def run():
+        for event_type in ("entry", "exit", "entry"):
+            await service.mark_for_user(
+                user_id="user-1", event_type=event_type, idempotency_key="a"
+            )
+
+    asyncio.run(run())
+    assert marking.calls == 2
+
+
+def test_scheduled_and_manual_marks_share_the_day_key(credentials):
+    marking = _SlowMarking()
+    service = _service(marking, credentials)
+    # What the scheduler queues: no idempotency key.
+    scheduled = AttendanceInternalMarkRequest.model_validate(
+        {"userId": "user-1", "eventType": "entry"}
+    )
+
+    async def run():
+        results = [result async for result in await service.mark_batch([scheduled])]
+        manual = await service.mark_for_user(user_id="user-1", event_type="entry")
+        return results, manual
+
+    results, manual = asyncio.run(run())
+    assert [result.success for result in results] == [True]
+    assert manual.success
+    assert marking.calls == 1
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.exceptions import MarkingError, ProviderUnavailableError, ValidationError
+from app.models import AttendanceMarkResponse
+from app.services.marking_queue import (
+    FAILED,
+    QUEUED,
+    SUCCEEDED,
+    MarkingJobStore,
+    MarkingQueue,
+)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "max_retries", 3)
+    monkeypatch.setattr(settings, "marking_retry_base_delay", 0.01)
+    monkeypatch.setattr(settings, "marking_queue_poll_interval", 0.01)
+
+
+def _drain(store, runner):
+    async def run():
+        queue = MarkingQueue(store)
+        await queue.start(runner, workers=2)
+        job = await queue.enqueue(user_id="user-1", event_type="entry")
+        for _ in range(200):
+            current = await queue.get(job.id)
+            if current.status not in (QUEUED, "running"):
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return current
+
+    return asyncio.run(run())
+
+
+def test_retries_provider_errors_until_success(tmp_path):
+    calls = []
+
+    async def runner(*, user_id, event_type, on_step, **_):
+        calls.append(user_id)
+        if len(calls) < 3:
+            raise MarkingError("Failed to complete attendance marking at login page")
+        return AttendanceMarkResponse(
+            success=True, message="Attendance marked", event_type=event_type
+        )
+
+    job = _drain(MarkingJobStore(str(tmp_path / "jobs.sqlite3")), runner)
+
+    assert job.status == SUCCEEDED
+    assert job.attempts == 3
+    assert job.result["eventType"] == "entry"
+
+
+def test_validation_errors_are_not_retried(tmp_path):
+    async def runner(*, user_id, event_type, on_step, **_):
+        raise ValidationError("Attendance credentials are required")
+
+    job = _drain(MarkingJobStore(str(tmp_path / "jobs.sqlite3")), runner)
+
+    assert job.status == FAILED
+    assert job.attempts == 1
+    assert job.last_error == "Attendance credentials are required"
+
+
+def test_open_circuit_defers_without_consuming_attempts(tmp_path):
+    calls = []
+
+    async def runner(*, user_id, event_type, on_step, **_):
+        calls.append(user_id)
+        if len(calls) <= 5:
+            raise ProviderUnavailableError(
+                "Attendance provider is unavailable", retry_after=0.01
+            )
+        return AttendanceMarkResponse(
+            success=True, message="Attendance marked", event_type=event_type
+        )
+
+    job = _drain(MarkingJobStore(str(tmp_path / "jobs.sqlite3")), runner)
+
+    assert job.status == SUCCEEDED
+    assert job.attempts == 1
+    assert len(calls) == 6
+
+
+def test_only_jobs_with_expired_leases_are_requeued(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    live = MarkingJobStore(path)
+    running = live.enqueue(user_id="user-1", event_type="entry", max_attempts=4)
+    assert live.claim_next(lease=60).id == running.id
+
+    crashed = MarkingJobStore(path)
+    orphan = crashed.enqueue(user_id="user-2", event_type="exit", max_attempts=4)
+    assert crashed.claim_next(lease=0).id == orphan.id
+    crashed.close()
+
+    restarted = MarkingJobStore(path)
+    assert restarted.recover() == 1
+    assert restarted.get(orphan.id).status == QUEUED
+    assert restarted.get(running.id).status == "running"
+    assert live.renew(running.id, lease=60)
+    assert not restarted.renew(running.id, lease=60)
+
+
+def test_stop_is_not_lost_when_a_wakeup_lands_at_the_same_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "marking_queue_poll_interval", 10)
+
+    async def runner(**_):  # pragma: no cover - the queue stays empty
+        raise AssertionError("no job was queued")
+
+    async def run():
+        queue = MarkingQueue(MarkingJobStore(str(tmp_path / "jobs.sqlite3")))
+        await queue.start(runner, workers=1)
+        await asyncio.sleep(0.1)  # let the worker park on the empty queue
+        # The worker's wait finishes in the same tick it is cancelled.
+        queue._wakeup.set()
+        await asyncio.sleep(0)
+        await asyncio.wait_for(queue.stop(), 1)
+
+    asyncio.run(run())
@@ -0,0 +1,165 @@
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.exceptions import MarkingError
+from app.services.attendance_marking_service import AttendanceMarkingService
+from app.services.marking_service import Deadline, MarkingService
+from app.services.provider_guard import CircuitBreaker, ProviderGuard
+from app.services.provider_pool import ProviderPool
+from benchmarks.fake_provider import create_app
+from benchmarks.provider_pages import render_page
+
+NEXT_PAGE = {
+    "/": "login",
+    "/Default.aspx": "geo",
+    "/Geo.aspx": "assist",
+    "/Marca.aspx": "done",
+}
+
+
+def _run_mark(handler, event_type="entry", deadline=None, guard=None):
+    service = MarkingService(
+        pool=ProviderPool(transport=httpx.MockTransport(handler)), guard=guard
+    )
+    return asyncio.run(
+        service.mark_attendance(
+            company_id=7040,
+            user_id_number=1234,
+            password="secret",
+            latitude=-6.77,
+            longitude=-79.84,
+            event_type=event_type,
+            deadline=deadline,
+        )
+    )
+
+
+def test_mark_attendance_runs_the_postback_flow():
+    posted = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            form = parse_qs(request.content.decode())
+            posted.append((request.url.path, form["__EVENTTARGET"][0]))
+        page = render_page(NEXT_PAGE[request.url.path])
+        return httpx.Response(200, text=page)
+
+    _run_mark(handler, event_type="exit")
+
+    assert posted == [
+        ("/Default.aspx", "lnk_ingreso"),
+        ("/Geo.aspx", "lnk_proceso"),
+        ("/Marca.aspx", "lnk_salida"),
+    ]
+
+
+def test_mark_attendance_reports_failed_step():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/Geo.aspx":
+            return httpx.Response(500)
+        return httpx.Response(200, text=render_page(NEXT_PAGE[request.url.path]))
+
+    with pytest.raises(MarkingError, match="geo submit"):
+        _run_mark(handler)
+
+
+def test_mark_attendance_stops_at_the_deadline():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/Geo.aspx":
+            await asyncio.sleep(5)
+        return httpx.Response(200, text=render_page(NEXT_PAGE[request.url.path]))
+
+    with pytest.raises(MarkingError, match="deadline exceeded") as excinfo:
+        _run_mark(handler, deadline=Deadline(0.2))
+    assert excinfo.value.step == "geo submit"
+
+
+def test_rate_limit_waits_do_not_spend_the_deadline():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text=render_page(NEXT_PAGE[request.url.path]))
+
+    # Three of the four requests wait 0.1s for a token: 0.3s against a 0.2s
+    # deadline that only covers provider time.
+    _run_mark(handler, deadline=Deadline(0.2), guard=ProviderGuard(rate=10, burst=1))
+
+
+def test_provider_hangs_count_as_breaker_failures():
+    async def hanging_body():
+        yield b"<html>"
+        await asyncio.sleep(5)
+
+    async def hang_headers(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/Geo.aspx":
+            await asyncio.sleep(5)
+        return httpx.Response(200, text=render_page(NEXT_PAGE[request.url.path]))
+
+    def hang_body(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/Geo.aspx":
+            return httpx.Response(200, content=hanging_body())
+        return httpx.Response(200, text=render_page(NEXT_PAGE[request.url.path]))
+
+    for handler in (hang_headers, hang_body):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        with pytest.raises(MarkingError, match="deadline exceeded"):
+            _run_mark(
+                handler, deadline=Deadline(0.2), guard=ProviderGuard(breaker=breaker)
+            )
+        assert breaker.state == "open"
+
+
+def test_mark_attendance_against_the_fake_provider(monkeypatch):
+    provider = create_app()
+    monkeypatch.setattr(settings, "marking_provider_url", "http://provider.test")
+    service = MarkingService(pool=ProviderPool(transport=httpx.ASGITransport(provider)))
+
+    asyncio.run(
+        service.mark_attendance(
+            company_id=7040,
+            user_id_number=1234,
+            password="secret",
+            latitude=-6.77,
+            longitude=-79.84,
+            event_type="entry",
+        )
+    )
+
+    assert provider.state.provider.requests == 4
+    assert len(provider.state.provider.logged_in) == 1
+
+
+def test_debug_mode_attaches_step_timings(monkeypatch, credentials):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text=render_page(NEXT_PAGE[request.url.path]))
+
+    service = AttendanceMarkingService(
+        credentials_service=credentials,
+        marking_service=MarkingService(
+            pool=ProviderPool(transport=httpx.MockTransport(handler))
+        ),
+        session_cache=TTLCache(maxsize=1, ttl=1),
+        results_cache=TTLCache(maxsize=10, ttl=60),
+    )
+
+    def mark(event_type):
+        return asyncio.run(
+            service.mark_for_user(user_id="user-1", event_type=event_type)
+        ).model_dump(by_alias=True)
+
+    assert "timings" not in mark("entry")
+
+    monkeypatch.setattr(settings, "marking_debug_timings", True)
+    timings = mark("exit")["timings"]
+    assert [timing["step"] for timing in timings] == [
+        "login page",
+        "login submit",
+        "geo submit",
+        "attendance submit",
+    ]
+    assert all(timing["outcome"] == "ok" for timing in timings)
+    assert timings[2]["sizeBytes"] > 96_000
+    assert timings[2]["parseMs"] is not None
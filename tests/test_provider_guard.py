@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.exceptions import ProviderUnavailableError
+from app.services.provider_guard import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    ProviderGuard,
+    TokenBucket,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_fails_fast_and_closes_after_probe():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(ProviderUnavailableError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == 30
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call() is True
+    # Only one probe at a time while half-open.
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.metrics()["rejected"] == 2
+
+
+def test_token_bucket_throttles_past_burst():
+    clock = _Clock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+
+    assert bucket._take() == 0
+    assert bucket._take() == 0
+    assert bucket._take() == pytest.approx(0.1)
+    clock.now = 1
+    assert bucket._take() == 0
+
+
+def test_guard_limits_concurrent_requests():
+    guard = ProviderGuard(concurrency=2, rate=0)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with guard.request():
+            peak = max(peak, guard.metrics()["limiter"]["in_flight"])
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert guard.metrics()["limiter"]["saturated"] == 4
@@ -0,0 +1,43 @@
+import asyncio
+
+import httpcore
+import httpx
+
+from app.services import provider_pool
+from app.services.provider_pool import ProviderPool
+
+
+def _set_cookie(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200, headers={"Set-Cookie": f"ASP.NET_SessionId={request.url.path[1:]}"}
+    )
+
+
+def test_clients_share_transport_but_not_cookies():
+    pool = ProviderPool(transport=httpx.MockTransport(_set_cookie))
+
+    async def run():
+        async with pool.client() as first, pool.client() as second:
+            await first.get("https://provider.test/alice")
+            await second.get("https://provider.test/bob")
+            return dict(first.cookies), dict(second.cookies)
+
+    first_cookies, second_cookies = asyncio.run(run())
+    assert first_cookies == {"ASP.NET_SessionId": "alice"}
+    assert second_cookies == {"ASP.NET_SessionId": "bob"}
+
+
+def test_default_transport_builds_one_connection_pool(monkeypatch):
+    built = []
+
+    class _CountingPool(httpcore.AsyncConnectionPool):
+        def __init__(self, *args, **kwargs):
+            built.append(kwargs.get("network_backend"))
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(httpcore, "AsyncConnectionPool", _CountingPool)
+    pool = ProviderPool()
+
+    assert len(built) == 1
+    assert isinstance(built[0], provider_pool._CachingNetworkBackend)
+    asyncio.run(pool.aclose())
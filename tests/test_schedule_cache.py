@@ -0,0 +1,53 @@
+import asyncio
+
+from app.services.attendance_service import AttendanceService
+from app.services.schedule_cache import LocalInvalidationChannel, ScheduleCache
+
+USER = {"id": "user-1"}
+
+
+class _Repository:
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.reads = 0
+
+    async def fetch_schedule(self, *, user_id):
+        self.reads += 1
+        return self.schedule
+
+    async def upsert_schedule(self, **_):
+        return None
+
+
+def test_reads_are_cached_and_upserts_invalidate_every_worker(schedule):
+    channel = LocalInvalidationChannel()
+    repository = _Repository(schedule)
+    worker_a = AttendanceService(repository, ScheduleCache(channel=channel))
+    worker_b = AttendanceService(repository, ScheduleCache(channel=channel))
+
+    async def scenario():
+        await worker_a.get_attendance_schedule(current_user=USER)
+        await worker_a.get_attendance_schedule(current_user=USER)
+        await worker_b.get_attendance_schedule(current_user=USER)
+        assert repository.reads == 2
+
+        await worker_a.process_attendance(schedule, current_user=USER)
+        await worker_b.get_attendance_schedule(current_user=USER)
+        assert repository.reads == 3
+
+    asyncio.run(scenario())
+    assert worker_b._schedule_cache.metrics()["dropped"] == 1
+
+
+def test_load_racing_an_invalidation_is_not_stored(schedule):
+    cache = ScheduleCache()
+
+    async def scenario():
+        async def load():
+            await cache.invalidate("user-1")
+            return schedule
+
+        await cache.get("user-1", load)
+
+    asyncio.run(scenario())
+    assert cache.metrics()["size"] == 0
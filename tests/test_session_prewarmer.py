@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.core.cache import TTLCache
+from app.exceptions import ProviderSessionExpiredError
+from app.services.attendance_marking_service import AttendanceMarkingService
+from app.services.marking_service import ProviderSession
+from app.services.session_prewarmer import SessionPrewarmer, scheduled_fire_time
+
+# Monday 2026-10-19, 07:57 in Lima.
+NOW = datetime(2026, 10, 19, 12, 57, tzinfo=timezone.utc)
+CREDENTIALS = {"company_id": 1, "user_id_number": 2, "password": "x"}
+
+
+class _Schedules:
+    def __init__(self, schedule):
+        self.schedule = schedule
+
+    async def get_active_schedules(self):
+        return {"user-1": self.schedule}
+
+
+class _Marking:
+    def __init__(self, *, expired=False):
+        self.expired = expired
+        self.calls = []
+
+    async def login(self, **_):
+        self.calls.append("login")
+        return ProviderSession(cookies=None, geo_form=({}, "", "POST"))
+
+    async def submit(self, session, **_):
+        self.calls.append("submit")
+        if self.expired:
+            raise ProviderSessionExpiredError("Provider session has expired")
+
+    async def mark_attendance(self, **_):
+        self.calls.append("mark_attendance")
+
+
+def test_fire_time_matches_scheduler_offset(entry_schedule):
+    # The scheduler's hashString gives user-1:2026-10-19:entry an offset of -1.
+    fire_at = scheduled_fire_time(
+        user_id="user-1", schedule=entry_schedule, event_type="entry", now=NOW
+    )
+    assert fire_at == datetime(2026, 10, 19, 12, 59, tzinfo=timezone.utc)
+    assert (
+        scheduled_fire_time(
+            user_id="user-1", schedule=entry_schedule, event_type="exit", now=NOW
+        )
+        is None
+    )
+
+
+def test_prewarmer_caches_sessions_due_within_lead(entry_schedule, credentials):
+    cache = TTLCache(maxsize=10, ttl=600)
+    marking = _Marking()
+    prewarmer = SessionPrewarmer(
+        attendance_service=_Schedules(entry_schedule),
+        credentials_service=credentials,
+        marking_service=marking,
+        session_cache=cache,
+    )
+
+    assert asyncio.run(prewarmer.run_once(NOW)) == 1
+    assert "user-1" in cache
+    # Already warm, so the next pass leaves it alone.
+    assert asyncio.run(prewarmer.run_once(NOW)) == 0
+    assert marking.calls == ["login"]
+
+
+def test_mark_uses_cached_session_and_falls_back_when_expired(schedule, credentials):
+    for expired, expected in (
+        (False, ["submit"]),
+        (True, ["submit", "mark_attendance"]),
+    ):
+        cache = TTLCache(maxsize=10, ttl=600)
+        cache.set("user-1", ProviderSession(cookies=None, geo_form=({}, "", "POST")))
+        marking = _Marking(expired=expired)
+        service = AttendanceMarkingService(
+            credentials_service=credentials,
+            marking_service=marking,
+            session_cache=cache,
+        )
+        asyncio.run(
+            service._mark(
+                user_id="user-1",
+                credentials=CREDENTIALS,
+                location=schedule.location,
+                event_type="entry",
+            )
+        )
+        assert marking.calls == expected
+        assert "user-1" not in cache
@@ -0,0 +1,24 @@
+import asyncio
+
+from app.core.supabase_clients import SupabaseClients
+
+
+def test_each_role_reuses_one_pooled_client_until_closed():
+    async def scenario():
+        clients = SupabaseClients(
+            url="https://project.supabase.co", anon_key="anon", service_key="service"
+        )
+        await clients.warm_up()
+
+        assert clients.service is clients.service
+        assert clients.anon is not clients.service
+        assert clients.service.postgrest.session is clients._http["service_role"]
+        assert clients.service.supabase_key == "service"
+
+        http_clients = list(clients._http.values())
+        await clients.aclose()
+        assert all(http_client.is_closed for http_client in http_clients)
+        assert clients.anon is not None
+        await clients.aclose()
+
+    asyncio.run(scenario())
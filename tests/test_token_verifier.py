@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.exceptions import AuthenticationError
+from app.services.auth_service import AuthService
+from app.services.token_verifier import LocalTokenVerifier
+
+SECRET = "super-secret-jwt-token-with-at-least-32-characters"
+
+
+def _token(**claims):
+    payload = {
+        "sub": "user-1",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+    }
+    payload.update(claims)
+    return jwt.encode(payload, SECRET, algorithm="HS256")
+
+
+def test_local_verifier_checks_signature_expiry_audience_and_role():
+    verifier = LocalTokenVerifier(secret=SECRET)
+
+    assert verifier.verify(_token()) == {
+        "id": "user-1",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "audience": "authenticated",
+    }
+    for token in (
+        _token(aud="other"),
+        _token(exp=int(time.time()) - 60),
+        _token(role="anon"),
+        jwt.encode({"sub": "user-1"}, "wrong-secret-" * 4, algorithm="HS256"),
+    ):
+        with pytest.raises(AuthenticationError):
+            verifier.verify(token)
+
+
+def test_remote_fallback_is_used_only_when_configured(monkeypatch):
+    monkeypatch.setattr(settings, "auth_local_verification", True)
+    monkeypatch.setattr(settings, "supabase_jwt_secret", "")
+    monkeypatch.setattr("app.services.token_verifier._verifier", None)
+    remote = {"id": "user-1", "email": None, "role": "authenticated"}
+
+    async def verify_remote(token):
+        return remote
+
+    monkeypatch.setattr(AuthService, "_verify_remote", verify_remote)
+
+    monkeypatch.setattr(settings, "auth_remote_fallback", False)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(AuthService.verify_token(_token()))
+    assert excinfo.value.status_code == 503
+
+    monkeypatch.setattr(settings, "auth_remote_fallback", True)
+    assert asyncio.run(AuthService.verify_token(_token())) is remote
+
+
+def test_local_verification_runs_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(settings, "auth_local_verification", True)
+    threads = []
+
+    class _Verifier:
+        def verify(self, token):
+            # A JWKS fetch blocks here; it must not block the loop.
+            threads.append(threading.current_thread())
+            return {"id": "user-1"}
+
+    monkeypatch.setattr(
+        "app.services.auth_service.get_token_verifier", lambda: _Verifier()
+    )
+
+    assert asyncio.run(AuthService.verify_token("token")) == {"id": "user-1"}
+    assert threads[0] is not threading.main_thread()